@@ -0,0 +1,48 @@
+import os
+import time
+import weakref
+from dotenv import load_dotenv
+
+load_dotenv()
+
+# How long a page's verified account is trusted before the drawer is opened again
+VERIFIED_TTL_SECONDS = float(os.getenv("ACCOUNT_VERIFY_TTL", "300"))
+
+# page -> (username, account_id, url, verified_at); entries go away with their page
+_verified = weakref.WeakKeyDictionary()
+# Pages whose document loads already clear their entry
+_watched = weakref.WeakSet()
+
+
+def _watch(page):
+    # A document load (navigation or reload) restarts the app, so what it showed is no longer known
+    if page in _watched:
+        return
+    page.on("domcontentloaded", lambda _: _verified.pop(page, None))
+    _watched.add(page)
+
+
+def mark_account_verified(page, username: str, account_id: str):
+    """Records that `account_id` is the one selected on this page, as of now."""
+    _watch(page)
+    _verified[page] = (username, str(account_id), page.url, time.monotonic())
+
+
+def forget_verified_account(page):
+    """Drops the page's verified account, e.g. after a login or an account switch."""
+    _verified.pop(page, None)
+
+
+def is_account_verified(page, username: str, account_id: str) -> bool:
+    """
+    Whether `account_id` was verified on this page within VERIFIED_TTL_SECONDS,
+    with no document load or URL change since.
+    """
+    entry = _verified.get(page)
+    if not entry:
+        return False
+    verified_user, verified_account, url, verified_at = entry
+    if url != page.url or time.monotonic() - verified_at >= VERIFIED_TTL_SECONDS:
+        forget_verified_account(page)
+        return False
+    return verified_user == username and verified_account == str(account_id)
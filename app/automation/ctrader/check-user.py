@@ -1,21 +1,24 @@
-import random
-
-
-def random_delay(page, min_ms=800, max_ms=2500):
-    """Wait a random duration to appear more human-like."""
-    delay = random.randint(min_ms, max_ms)
-    page.wait_for_timeout(delay)
+from app.automation.toolkit import random_delay
+from app.helper.deadline import budget
+from app.automation.waits import wait_for_state
+from app.automation.account_cache import is_account_verified, mark_account_verified, forget_verified_account
 
 
 def check_user(page, username, account_id):
     """
     After login, click the account dropdown, verify the email matches,
     and select the correct account by account_id.
+    Skipped when this page already verified the same account recently.
     """
+    if is_account_verified(page, username, account_id):
+        print(f"Account {account_id} already selected on this page. Skipping account dropdown.")
+        return
+    forget_verified_account(page)
+
     random_delay(page, 1000, 2500)
 
     # Wait for the account dropdown area to be available
-    page.wait_for_selector('svg#ic_tree_expanded', state="attached", timeout=15000)
+    page.wait_for_selector('svg#ic_tree_expanded', state="attached", timeout=budget(15000))
     print("Account dropdown area found")
 
     # Click the parent container of the SVG arrow (the SVG itself is not reliably clickable)
@@ -46,10 +49,10 @@ def check_user(page, username, account_id):
         try:
             toast_close_btn = page.locator("#ic_cross").first
             # Fast check: wait just 1 second to see if it's there
-            if toast_close_btn.is_visible(timeout=1000):
+            if toast_close_btn.is_visible(timeout=budget(1000)):
                 print("  🧹 Blocking toast notification detected. Closing it...")
                 toast_close_btn.click()
-                page.wait_for_timeout(500) # Give the slide-out animation time to finish
+                wait_for_state(toast_close_btn, "hidden", replaces_ms=500) # Until the toast has slid out
         except Exception:
             pass # If no toast is there, silently proceed
             
@@ -62,4 +65,5 @@ def check_user(page, username, account_id):
         print(f"CRITICAL ERROR: {error_msg}")
         raise ValueError(error_msg)
 
-    random_delay(page, 800, 2000)
\ No newline at end of file
+    random_delay(page, 800, 2000)
+    mark_account_verified(page, username, account_id)
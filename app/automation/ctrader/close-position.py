@@ -1,10 +1,9 @@
-import random
-
-def random_delay(page, min_ms=500, max_ms=1500):
-    """Wait a random duration to appear more human-like."""
-    delay = random.randint(min_ms, max_ms)
-    page.wait_for_timeout(delay)
+from app.helper.tracing import traced
+from app.automation.dom_query import find_text_cell, find_row_icons
+from app.helper.deadline import budget
+from app.automation.waits import settle, wait_for_state
 
+@traced("close_position")
 def close_position(page, symbol: str) -> dict:
     """
     Closes an open position for a given symbol in the 'Positions' tab.
@@ -22,99 +21,75 @@ def close_position(page, symbol: str) -> dict:
         # Step 1: Ensure the 'Positions' tab is active
         try:
             positions_tab = page.locator('div:has-text("Positions")').first
-            if positions_tab.is_visible(timeout=500):
+            if positions_tab.is_visible(timeout=budget(500)):
                 positions_tab.click()
         except Exception:
             pass
             
         # Step 2: Find the symbol text in the POSITIONS panel (bottom of the page).
-        viewport_height = page.viewport_size["height"] if page.viewport_size else 768
-        min_y_for_positions = viewport_height * 0.55
-        
-        print(f"  > Searching for '{symbol}' text in positions panel (y > {min_y_for_positions:.0f})...")
-        
-        # Find all elements with the exact symbol text
-        symbol_elements = page.locator(f':text-is("{symbol}")').all()
-        
-        symbol_box = None
-        symbol_element = None
-        
-        for el in symbol_elements:
-            try:
-                if el.is_visible(timeout=300):
-                    box = el.bounding_box()
-                    if box and box["y"] > min_y_for_positions:
-                        symbol_box = box
-                        symbol_element = el
-                        print(f"  ✓ Found '{symbol}' in positions panel at y={box['y']:.0f}")
-                        break
-            except Exception:
-                continue
-        
-        if not symbol_box:
+        # One in-page query instead of an is_visible/bounding_box round-trip per match.
+        print(f"  > Searching for '{symbol}' text in positions panel (bottom 45% of the viewport)...")
+        symbol_cell = find_text_cell(page, symbol, min_y_ratio=0.55)
+
+        if not symbol_cell:
             print(f"  ✗ Could not find '{symbol}' text in the positions panel area.")
             return {"success": False, "reason": f"No active position found for {symbol}", "warning": "Position may be already closed or not exist"}
-        
+
+        symbol_element = symbol_cell["locator"]
+        min_y_for_positions = symbol_cell["min_y"]
+        print(f"  ✓ Found '{symbol}' in positions panel at y={symbol_cell['y']:.0f}")
+
         # Step 3: Hover over the row area to reveal the close (X) button.
-        row_y_center = symbol_box["y"] + symbol_box["height"] / 2
-        
+        row_y_center = symbol_cell["y"] + symbol_cell["height"] / 2
+
         # First, hover on the symbol itself
         print("  > Hovering on the position row...")
-        symbol_element.hover(timeout=1000)
-        page.wait_for_timeout(200) # Minimum wait for UI state change
-        
-        # Step 4: Find the close X button on the same row (same Y-level).
+        symbol_element.hover(timeout=budget(1000))
+        settle(page, replaces_ms=200) # Let the row's hover state render
+
+        # Step 4: Find the close X button on the same row (same Y-level), again in one query.
         target_close_btn = None
-        
-        all_crosses = page.locator('svg#ic_access_cross').all()
-        print(f"  > Found {len(all_crosses)} cross icon(s) total on page.")
-        
-        # Collect all crosses on the same row in the positions panel
-        row_candidates = []
-        
-        for cross in all_crosses:
-            try:
-                if cross.is_visible(timeout=300):
-                    cross_box = cross.bounding_box()
-                    if cross_box:
-                        cross_y_center = cross_box["y"] + cross_box["height"] / 2
-                        y_distance = abs(row_y_center - cross_y_center)
-                        cross_x = cross_box["x"]
-                        
-                        if y_distance < 25 and cross_box["y"] > min_y_for_positions:
-                            row_candidates.append((cross, cross_x, cross_box))
-                            print(f"    - Candidate cross at x={cross_x:.0f}, y={cross_box['y']:.0f}, y-dist={y_distance:.0f}")
-            except Exception:
-                continue
-        
-        print(f"  > {len(row_candidates)} candidate(s) on the position row. Checking tooltips...")
-        
-        # Hover each candidate and check for "Close Position" tooltip
-        for cross, cross_x, cross_box in row_candidates:
-            try:
-                parent = cross.locator("xpath=..")
-                parent.hover(timeout=1000)
-                page.wait_for_timeout(200)  # Wait for tooltip to appear
-                
-                tooltip = page.locator('text="Close Position"')
-                if tooltip.count() > 0 and tooltip.first.is_visible(timeout=300):
-                    target_close_btn = parent
-                    print(f"  ✓ Found the CORRECT Close Position button at x={cross_x:.0f} (tooltip confirmed!)")
-                    break
-            except Exception:
-                continue
-        
-        # Fallback to rightmost X if tooltip detection fails
-        if not target_close_btn and row_candidates:
-            row_candidates.sort(key=lambda item: item[1], reverse=True)
-            target_close_btn = row_candidates[0][0]
-            print(f"  ⚠ Tooltip detection failed. Falling back to rightmost X at x={row_candidates[0][1]:.0f}")
-        
+
+        row_candidates = find_row_icons(page, 'svg#ic_access_cross', row_y_center, min_y_for_positions, max_distance=25)
+        for candidate in row_candidates:
+            print(f"    - Candidate cross at x={candidate['x']:.0f}, y={candidate['y']:.0f}, y-dist={candidate['distance']:.0f}")
+
+        # Rightmost first: it is the close button on every layout seen so far
+        row_candidates.sort(key=lambda item: item["x"], reverse=True)
+        labelled = [candidate for candidate in row_candidates if candidate["labelled"]]
+
+        if labelled:
+            target_close_btn = labelled[0]["locator"]
+            print(f"  ✓ Found the Close Position button at x={labelled[0]['x']:.0f} (labelled in the DOM)")
+        elif len(row_candidates) == 1:
+            target_close_btn = row_candidates[0]["locator"]
+            print(f"  ✓ Single X on the position row at x={row_candidates[0]['x']:.0f}")
+        elif row_candidates:
+            print(f"  > {len(row_candidates)} candidate(s) on the position row. Checking tooltips...")
+
+            # Hover candidates (rightmost first) until one shows the "Close Position" tooltip
+            tooltip = page.locator('text="Close Position"').first
+            for candidate in row_candidates:
+                try:
+                    candidate["locator"].hover(timeout=budget(1000))
+                    page.wait_for_timeout(budget(200))  # Wait for tooltip to appear
+                    if tooltip.is_visible():
+                        target_close_btn = candidate["locator"]
+                        print(f"  ✓ Found the CORRECT Close Position button at x={candidate['x']:.0f} (tooltip confirmed!)")
+                        break
+                except Exception:
+                    continue
+
+            # Fallback to rightmost X if tooltip detection fails
+            if not target_close_btn:
+                target_close_btn = row_candidates[0]["locator"]
+                print(f"  ⚠ Tooltip detection failed. Falling back to rightmost X at x={row_candidates[0]['x']:.0f}")
+
         # Last fallback
         if not target_close_btn:
             try:
                 close_pos_btn = page.locator('[title="Close Position"], [aria-label="Close Position"]').first
-                if close_pos_btn.is_visible(timeout=500):
+                if close_pos_btn.is_visible(timeout=budget(500)):
                     target_close_btn = close_pos_btn
                     print("  ✓ Found 'Close Position' button by title/aria-label")
             except Exception:
@@ -122,15 +97,15 @@ def close_position(page, symbol: str) -> dict:
 
         if target_close_btn:
             print(f"  > Clicking the close button for {symbol}...")
-            target_close_btn.click(timeout=1000)
+            target_close_btn.click(timeout=budget(1000))
             print(f"  ✓ Clicked the close button.")
             
             # Step 5: Handle confirmation dialog if it appears
             try:
                 confirm_btn = page.locator('button:has-text("Confirm")').first
-                if confirm_btn.is_visible(timeout=500):
+                if confirm_btn.is_visible(timeout=budget(500)):
                     print("  ⚠ Confirmation dialog detected. Clicking Confirm...")
-                    confirm_btn.click(timeout=1000)
+                    confirm_btn.click(timeout=budget(1000))
             except Exception:
                 pass
             
@@ -142,12 +117,12 @@ def close_position(page, symbol: str) -> dict:
             print(f"  > Last resort: trying to right-click the position row...")
             
             try:
-                symbol_element.click(button="right", timeout=1000)
-                page.wait_for_timeout(200)
-                
+                symbol_element.click(button="right", timeout=budget(1000))
+
                 close_menu_item = page.locator('text="Close Position"').first
-                if close_menu_item.is_visible(timeout=1000):
-                    close_menu_item.click(timeout=1000)
+                wait_for_state(close_menu_item, "visible", replaces_ms=200)
+                if close_menu_item.is_visible(timeout=budget(1000)):
+                    close_menu_item.click(timeout=budget(1000))
                     print(f"  ✓ Closed position via right-click context menu.")
                     return {"success": True, "reason": None, "warning": None}
             except Exception:
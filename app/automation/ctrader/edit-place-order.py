@@ -1,16 +1,13 @@
-import random
 import importlib
+from app.helper.tracing import traced
+from app.automation.toolkit import random_delay
+from app.helper.deadline import budget
 
 input_order_module = importlib.import_module("app.automation.ctrader.input-order")
 input_order = input_order_module.input_order
 
 
-def random_delay(page, min_ms=800, max_ms=2500):
-    """Wait a random duration to appear more human-like."""
-    delay = random.randint(min_ms, max_ms)
-    page.wait_for_timeout(delay)
-
-
+@traced("edit_place_order")
 def edit_place_order(page, purchase_type, order_amount, symbol, take_profit, stop_loss):
     """
     Edits an existing pending order by modifying the order form fields
@@ -50,7 +47,7 @@ def edit_place_order(page, purchase_type, order_amount, symbol, take_profit, sto
         try:
             print("Waiting for modify confirmation...")
             confirmation = page.locator('text=/Modified|Confirmed|Success/i').first
-            confirmation.wait_for(state="visible", timeout=8000)
+            confirmation.wait_for(state="visible", timeout=budget(8000))
             print("Modification confirmation detected in UI.")
             return True
         except:
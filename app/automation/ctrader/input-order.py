@@ -1,10 +1,8 @@
-import random
 import re
-
-def random_delay(page, min_ms=800, max_ms=2500):
-    """Wait a random duration to appear more human-like."""
-    delay = random.randint(min_ms, max_ms)
-    page.wait_for_timeout(delay)
+from app.helper.tracing import traced
+from app.automation.toolkit import random_delay, type_keys, click_at
+from app.helper.deadline import budget
+from app.automation.waits import settle
 
 def _find_nearest_input(page, label_box):
     """Find the visible text input closest to and just below the given label."""
@@ -152,21 +150,22 @@ def _find_price_input(page, label_box):
     return same_column[0][2]
 
 
+@traced("fill_field")
 def _ensure_field_enabled_and_fill(page, label_text, value, timeout=5000):
     """Locates the input using geometric proximity to the label text."""
     label_locator = page.get_by_text(label_text, exact=True).first
 
     def _try_fill(inp):
-        inp.click(timeout=1000)
+        inp.click(timeout=budget(1000))
         page.keyboard.press("Control+A")
         page.keyboard.press("Backspace")
         inp.fill(str(value))
 
     def _try_fill_via_click_target(click_target):
-        click_target.click(timeout=1500)
+        click_target.click(timeout=budget(1500))
         page.keyboard.press("Control+A")
         page.keyboard.press("Backspace")
-        page.keyboard.type(str(value), delay=20)
+        type_keys(page, str(value), 10, 30)
 
     # --- Attempt 0: Use explicit codegen selectors for Profit inputs ---
     # These are more reliable than geometric proximity for the TP/SL panel.
@@ -176,7 +175,7 @@ def _ensure_field_enabled_and_fill(page, label_text, value, timeout=5000):
                 "div:nth-child(5) > .root_x.root_eu.root_di.root_do.root_co > .root_gb.root_x > "
                 ".root_di.root_x.root_ef.root_eg > .root_-4 > .root_di.root_do"
             ).first
-            if sl_profit_click.is_visible(timeout=800):
+            if sl_profit_click.is_visible(timeout=budget(800)):
                 _try_fill_via_click_target(sl_profit_click)
                 print(f"  ✓ {label_text} (Profit) filled via explicit locator with {value}")
                 return True
@@ -185,7 +184,7 @@ def _ensure_field_enabled_and_fill(page, label_text, value, timeout=5000):
                 "div:nth-child(3) > div:nth-child(5) > .root_x.root_eu.root_di.root_do.root_co > "
                 ".root_gb.root_x > .root_di.root_x.root_ef.root_eg > .root_-4 > .root_di.root_do"
             ).first
-            if tp_profit_click.is_visible(timeout=800):
+            if tp_profit_click.is_visible(timeout=budget(800)):
                 _try_fill_via_click_target(tp_profit_click)
                 print(f"  ✓ {label_text} (Profit) filled via explicit locator with {value}")
                 return True
@@ -195,7 +194,7 @@ def _ensure_field_enabled_and_fill(page, label_text, value, timeout=5000):
 
     # --- Attempt 1: Field is already visible ---
     try:
-        label_locator.wait_for(state="visible", timeout=2000)
+        label_locator.wait_for(state="visible", timeout=budget(2000))
         label_box = label_locator.bounding_box()
         if label_box:
             # Prefer the explicit "Price" row input rather than the Pips row.
@@ -210,7 +209,7 @@ def _ensure_field_enabled_and_fill(page, label_text, value, timeout=5000):
     # --- Attempt 2: Click label to expand/enable, then find input ---
     print(f"  ⏳ {label_text} field hidden — clicking text label to enable...")
     try:
-        label_locator.wait_for(state="visible", timeout=timeout)
+        label_locator.wait_for(state="visible", timeout=budget(timeout))
         label_locator.click()
         print(f"  ✓ Clicked '{label_text}' label")
     except Exception as e:
@@ -234,6 +233,7 @@ def _ensure_field_enabled_and_fill(page, label_text, value, timeout=5000):
         print(f"  ✗ {label_text} input did not become visible after toggle: {e}")
         return False
 
+@traced("input_order")
 def input_order(page, purchase_type, order_amount, symbol, take_profit, stop_loss):
     """Fills in the order form fields using Geometric Layout Anchoring."""
     try:
@@ -242,15 +242,15 @@ def input_order(page, purchase_type, order_amount, symbol, take_profit, stop_los
         # --- 0. OBLITERATE THE ACCOUNT MENU ---
         print("Ensuring account menu and overlays are closed...")
         # Click the safe, blank app header bar at the top (X=500, Y=15)
-        page.mouse.click(500, 15)
-        page.wait_for_timeout(300)
+        click_at(page, 500, 15)
+        settle(page, replaces_ms=300)
         page.keyboard.press("Escape")
-        page.wait_for_timeout(500)
+        settle(page, replaces_ms=500)
 
         # --- 1. FIND THE GEOMETRIC ANCHOR (THE SELL BUTTON) ---
         try:
             anchor_btn = page.get_by_text(re.compile(r"^Sell\s*\d", re.IGNORECASE)).first
-            anchor_btn.wait_for(state="visible", timeout=5000)
+            anchor_btn.wait_for(state="visible", timeout=budget(5000))
             anchor_box = anchor_btn.bounding_box()
             if not anchor_box:
                 raise Exception("Anchor button has no physical dimensions.")
@@ -281,7 +281,7 @@ def input_order(page, purchase_type, order_amount, symbol, take_profit, stop_los
                 print("  ⏳ Geometric logic missed. Using Visual Fallback (DoM tab offset)...")
                 dom_tab = page.get_by_text("DoM", exact=True).first
                 db = dom_tab.bounding_box()
-                page.mouse.click(db['x'] + 10, db['y'] + 40)
+                click_at(page, db['x'] + 10, db['y'] + 40)
                 print("  ✓ Clicked dropdown area using Visual Fallback")
 
             random_delay(page, 500, 1000)
@@ -289,17 +289,17 @@ def input_order(page, purchase_type, order_amount, symbol, take_profit, stop_los
             # --- NEW FIX: Clear the existing text before typing ---
             page.keyboard.press("Control+A")
             page.keyboard.press("Backspace")
-            page.wait_for_timeout(200)
+            settle(page, replaces_ms=200)
 
             # Blind type the symbol into the cleared, auto-focused search box
-            page.keyboard.type(symbol, delay=150)
+            type_keys(page, symbol, 100, 200)
             print(f"  ✓ Cleared input and typed '{symbol}' into search")
             
             random_delay(page, 1000, 1500)
 
             # Select the exact text match from the dropdown list
             search_result = page.get_by_text(symbol, exact=True).last
-            search_result.wait_for(state="visible", timeout=5000)
+            search_result.wait_for(state="visible", timeout=budget(5000))
             search_result.click(force=True)
             print(f"  ✓ Successfully clicked and selected: {symbol}")
             
@@ -315,12 +315,12 @@ def input_order(page, purchase_type, order_amount, symbol, take_profit, stop_los
             target_action = purchase_type.lower()
             if target_action == "buy":
                 buy_btn = page.get_by_text(re.compile(r"^Buy\s*\d", re.IGNORECASE)).first
-                buy_btn.wait_for(state="visible", timeout=5000)
+                buy_btn.wait_for(state="visible", timeout=budget(5000))
                 buy_btn.click()
                 print("  ✓ Selected direction: Buy")
             elif target_action == "sell":
                 sell_btn = page.get_by_text(re.compile(r"^Sell\s*\d", re.IGNORECASE)).first
-                sell_btn.wait_for(state="visible", timeout=5000)
+                sell_btn.wait_for(state="visible", timeout=budget(5000))
                 sell_btn.click()
                 print("  ✓ Selected direction: Sell")
             else:
@@ -368,7 +368,7 @@ def input_order(page, purchase_type, order_amount, symbol, take_profit, stop_los
         try:
             # Look specifically for the red warning banner below the Place Order button
             warning_el = page.locator(':text("The market is closed"), :text("Only pending orders are accepted"), :text("not available for trading"), :text("Insufficient funds")').first
-            if warning_el.is_visible(timeout=1500):
+            if warning_el.is_visible(timeout=budget(1500)):
                 warning_text = warning_el.inner_text().strip()
                 print(f"  ⚠ Warning detected: {warning_text}")
         except Exception:
@@ -0,0 +1,107 @@
+import os
+import time
+import weakref
+from dotenv import load_dotenv
+from app.helper.deadline import budget
+
+load_dotenv()
+
+LOGGED_IN = "logged_in"
+LOGGED_OUT = "logged_out"
+UNKNOWN = "unknown"
+
+# How long a logged-in result is reused for the same context and URL
+STATE_TTL_SECONDS = float(os.getenv("CTRADER_LOGIN_STATE_TTL", "30"))
+# Optional name of cTrader's auth cookie; when set, a missing or expired cookie
+# means logged out without looking at the page
+AUTH_COOKIE = os.getenv("CTRADER_AUTH_COOKIE")
+# How often the probe re-checks a page that shows neither marker yet
+POLL_MS = 50
+# Elements only the logged-in workspace renders: the account selector and the
+# close icon on a positions table row
+WORKSPACE_SELECTOR = 'svg#ic_tree_expanded, svg#ic_access_cross'
+# The login form's password field
+LOGIN_FORM_SELECTOR = 'input[type="password"], input[placeholder="Enter password"]'
+
+# context -> (state, url, checked_at); entries go away with their context
+_cache = weakref.WeakKeyDictionary()
+
+# Polls the page until it is clearly in one state. Logged out: the login form
+# or its "Log in" button is visible. Logged in: an element only the trading
+# workspace has (the account selector, or a row of the positions table) is
+# visible and no login form is. Text such as "Positions" is not enough, since
+# the logged-out landing page can show it too. Resolves null if neither holds.
+_PROBE_JS = """
+([timeoutMs, pollMs, workspaceSelector, loginFormSelector]) => new Promise((resolve) => {
+    const visible = (el) => {
+        if (!el) return false;
+        const rect = el.getBoundingClientRect();
+        if (rect.width === 0 || rect.height === 0) return false;
+        const style = getComputedStyle(el);
+        return style.visibility !== 'hidden' && style.display !== 'none';
+    };
+    const anyVisible = (selector) => Array.from(document.querySelectorAll(selector)).some(visible);
+    const loginShown = () => {
+        if (anyVisible(loginFormSelector)) return true;
+        for (const button of document.querySelectorAll('button')) {
+            if (/log in/i.test(button.textContent) && visible(button)) return true;
+        }
+        return false;
+    };
+    const check = () => {
+        if (!document.body) return null;
+        if (loginShown()) return 'logged_out';
+        return anyVisible(workspaceSelector) ? 'logged_in' : null;
+    };
+    const started = Date.now();
+    const poll = () => {
+        const state = check();
+        if (state || Date.now() - started >= timeoutMs) return resolve(state);
+        setTimeout(poll, pollMs);
+    };
+    poll();
+})
+"""
+
+
+def _cookie_expired(context) -> bool:
+    """Whether AUTH_COOKIE is configured and missing or past its expiry."""
+    if not AUTH_COOKIE:
+        return False
+    try:
+        cookies = [c for c in context.cookies() if c.get("name") == AUTH_COOKIE]
+    except Exception:
+        return False
+    if not cookies:
+        return True
+    # Session cookies report expires -1
+    return all(0 < c.get("expires", -1) < time.time() for c in cookies)
+
+
+def forget_login_state(context):
+    """Drops the cached state, e.g. after logging in or out."""
+    _cache.pop(context, None)
+
+
+def probe_login_state(page, timeout_ms: float = 5000):
+    """
+    Returns (state, source): LOGGED_IN, LOGGED_OUT or UNKNOWN (neither marker
+    appeared within `timeout_ms`), and where it came from ("cache", "cookie" or
+    "page"). Only logged-in results are cached, for STATE_TTL_SECONDS and only
+    while the page stays on the same URL.
+    """
+    context = page.context
+    cached = _cache.get(context)
+    if cached:
+        state, url, checked_at = cached
+        if url == page.url and time.monotonic() - checked_at < STATE_TTL_SECONDS:
+            return state, "cache"
+        forget_login_state(context)
+
+    if _cookie_expired(context):
+        return LOGGED_OUT, "cookie"
+
+    state = page.evaluate(_PROBE_JS, [budget(timeout_ms), POLL_MS, WORKSPACE_SELECTOR, LOGIN_FORM_SELECTOR]) or UNKNOWN
+    if state == LOGGED_IN:
+        _cache[context] = (state, page.url, time.monotonic())
+    return state, "page"
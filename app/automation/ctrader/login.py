@@ -1,10 +1,6 @@
-import random
-
-
-def random_delay(page, min_ms=800, max_ms=2500):
-    """Wait a random duration to appear more human-like."""
-    delay = random.randint(min_ms, max_ms)
-    page.wait_for_timeout(delay)
+from app.automation.toolkit import random_delay
+from app.helper.deadline import budget
+from app.automation.waits import wait_for_state
 
 
 def login(page, username, password):
@@ -17,7 +13,7 @@ def login(page, username, password):
     print("Clicked Log in button")
 
     # Wait for the login/signup panel tabs to appear
-    page.wait_for_selector('[data-smoke-id="signup-tab"]', state="visible", timeout=10000)
+    page.wait_for_selector('[data-smoke-id="signup-tab"]', state="visible", timeout=budget(10000))
     print("Login/Signup panel visible")
 
     random_delay(page, 400, 1200)
@@ -31,7 +27,7 @@ def login(page, username, password):
     print("Clicked 'Log in' tab")
 
     # Wait for the email input to appear after switching tabs
-    page.wait_for_selector('input[placeholder="Enter email or username"]', state="visible", timeout=10000)
+    page.wait_for_selector('input[placeholder="Enter email or username"]', state="visible", timeout=budget(10000))
 
     random_delay(page, 500, 1500)
 
@@ -55,13 +51,15 @@ def login(page, username, password):
     try:
         error = page.wait_for_selector(
             'text=/invalid|incorrect|error|wrong|failed/i',
-            timeout=5000
+            timeout=budget(5000)
         )
         if error:
             print(f"Login error: {error.inner_text()}")
     except:
         print("No error detected — login likely successful!")
 
-    # Wait for the main dashboard to load after login
+    # Wait for the main dashboard to load after login: up to the 6s the old
+    # 3-6s sleep could take, credited against its 4.5s average
     print("Waiting for dashboard to load...")
-    page.wait_for_timeout(random.randint(3000, 6000))
\ No newline at end of file
+    workspace = page.locator(':text("Positions"), :text("Orders")').first
+    wait_for_state(workspace, "visible", replaces_ms=4500, timeout_ms=6000)
\ No newline at end of file
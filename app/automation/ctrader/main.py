@@ -3,6 +3,12 @@ import json
 import os
 import threading
 from pathlib import Path
+from app.helper.metrics import BROWSER_CONTEXTS
+from app.helper.tracing import trace_step
+from app.automation.toolkit import driver_platform
+from app.automation.account_cache import forget_verified_account
+from app.helper.humanization import with_humanization
+from app.helper.deadline import budget, with_deadline, apply_default_timeout, BudgetExhausted, PLAYWRIGHT_DEFAULT_TIMEOUT_MS
 
 # --- Module Imports ---
 check_user_module = importlib.import_module("app.automation.ctrader.check-user")
@@ -24,11 +30,19 @@ terminate_trade = trade_terminator_module.terminate_trade
 close_position_module = importlib.import_module("app.automation.ctrader.close-position")
 close_position = close_position_module.close_position
 
+login_state_module = importlib.import_module("app.automation.ctrader.login-state")
+probe_login_state = login_state_module.probe_login_state
+forget_login_state = login_state_module.forget_login_state
+LOGGED_OUT = login_state_module.LOGGED_OUT
+UNKNOWN = login_state_module.UNKNOWN
+
 _playwright = None
 _user_contexts = {}  # Map username -> persistent context
 _user_pages = {}     # Map username -> active page
 _lock = threading.Lock()
 
+BROWSER_CONTEXTS.set_function(lambda: len(_user_contexts), platform="ctrader")
+
 def get_playwright():
     """Starts the playwright instance if not already started."""
     global _playwright
@@ -161,11 +175,11 @@ def ensure_ctrader_loaded(page, url="https://app.ctrader.com"):
     
     # --- ATTEMPT 1: Standard Navigation ---
     try:
-        page.goto(url, wait_until="domcontentloaded", timeout=60000)
+        page.goto(url, wait_until="domcontentloaded", timeout=budget(60000))
         print("Waiting for cTrader to render (checking for Login screen or Workspace)...")
         # Use a broad selector: login button OR any sign of the trading workspace
         indicator = page.locator('button:has-text("Log in"), :text("Positions"), :text("Orders")')
-        indicator.first.wait_for(state="visible", timeout=30000)
+        indicator.first.wait_for(state="visible", timeout=budget(30000))
         print("  ✓ cTrader UI loaded successfully on the first try.")
         return True
     except Exception:
@@ -173,9 +187,9 @@ def ensure_ctrader_loaded(page, url="https://app.ctrader.com"):
 
     # --- ATTEMPT 2: Playwright API Reload ---
     try:
-        page.reload(wait_until="domcontentloaded", timeout=45000)
+        page.reload(wait_until="domcontentloaded", timeout=budget(45000))
         indicator = page.locator('button:has-text("Log in"), :text("Positions"), :text("Orders")')
-        indicator.first.wait_for(state="visible", timeout=30000)
+        indicator.first.wait_for(state="visible", timeout=budget(30000))
         print("  ✓ cTrader UI loaded successfully after API reload.")
         return True
     except Exception:
@@ -185,14 +199,14 @@ def ensure_ctrader_loaded(page, url="https://app.ctrader.com"):
     try:
         # Click the top-left corner to ensure the web page has OS-level focus
         page.mouse.click(10, 10)
-        page.wait_for_timeout(500)
+        page.wait_for_timeout(budget(500))
         
         # Use Ctrl+Shift+R for a hard, cache-clearing refresh
         page.keyboard.press("Control+Shift+R")
         
         # Because we bypassed Playwright's navigation logic, we just wait for the element to appear
         indicator = page.locator('button:has-text("Log in"), :text("Positions"), :text("Orders")')
-        indicator.first.wait_for(state="visible", timeout=40000)
+        indicator.first.wait_for(state="visible", timeout=budget(40000))
         print("  ✓ cTrader UI loaded successfully after Ctrl+Shift+R force reload.")
         return True
     except Exception as e:
@@ -200,6 +214,9 @@ def ensure_ctrader_loaded(page, url="https://app.ctrader.com"):
         return False
 
 
+@with_deadline
+@with_humanization
+@driver_platform("ctrader")
 def run(
     username: str,
     operation: str,
@@ -217,7 +234,8 @@ def run(
     with _lock:
         try:
             # 1. Get the persistent context for this user
-            context = get_user_context(username)
+            with trace_step("ctrader", "context"):
+                context = get_user_context(username)
             
             # 2. Check if we already have an active page, or find one in the context
             page = _user_pages.get(username)
@@ -258,90 +276,118 @@ def run(
                 else:
                     raise e
             
+            # Waits that don't pass a timeout get Playwright's default, clamped to the budget
+            apply_default_timeout(page)
+
             # Only navigate if we aren't already on cTrader or if we are on a blank page
             current_url = page.url
             if "ctrader.com" not in current_url:
                 print(f"Navigating to cTrader for {username}...")
                 # --- NEW SMART LOAD LOGIC ---
-                if not ensure_ctrader_loaded(page):
+                with trace_step("ctrader", "load"):
+                    loaded = ensure_ctrader_loaded(page)
+                if not loaded:
                     raise Exception("cTrader failed to load properly after multiple attempts.")
             else:
                 print(f"Already on cTrader for {username}. Reusing current page state.")
 
             # 4. Check login status
             # If we are in a persistent context, we might already be logged in
-            login_button = page.locator('button:has-text("Log in")')
-            
-            try:
-                # Wait briefly to see if login button appears (meaning we are NOT logged in)
-                login_button.wait_for(state="visible", timeout=5000)
+            with trace_step("ctrader", "login_check") as step:
+                # Returns as soon as the login button or the workspace shows;
+                # only when neither does within 5s do we assume a session
+                try:
+                    state, source = probe_login_state(page, timeout_ms=5000)
+                except BudgetExhausted:
+                    raise
+                except Exception:
+                    state, source = UNKNOWN, "error"
+                needs_login = state == LOGGED_OUT
+                step.attributes["logged_in"] = not needs_login
+                step.attributes["login_state"] = state
+                step.attributes["login_state_source"] = source
+
+            if needs_login:
                 print("Not logged in. Starting login flow...")
+                forget_login_state(page.context)
+                forget_verified_account(page)
                 
                 from app.automation.ctrader.login import login as login_flow
-                login_flow(page, username, password)
-                
-                # Wait for navigation/dashboard
-                page.wait_for_load_state("networkidle")
+                with trace_step("ctrader", "login"):
+                    login_flow(page, username, password)
+                    
+                    # Wait for navigation/dashboard
+                    page.wait_for_load_state("networkidle", timeout=budget(PLAYWRIGHT_DEFAULT_TIMEOUT_MS))
+                    
+                    # Don't carry on into check_user on a page that is still logged out
+                    state, _ = probe_login_state(page, timeout_ms=5000)
+                    if state == LOGGED_OUT:
+                        raise Exception("cTrader login failed: the login form is still shown after submitting it")
                 print("Login flow completed.")
-            except Exception:
-                # If timeout or not visible, assume we are logged in
-                print("No login button detected. Assuming already logged in via persistent session.")
+            elif state == UNKNOWN:
+                print("Neither the login form nor the workspace showed. Assuming already logged in via persistent session.")
+            else:
+                print(f"Already logged in (checked via {source}).")
 
             # 5. Verify the user and select the correct account
-            check_user(page, username, account_id)
+            apply_default_timeout(page)
+            with trace_step("ctrader", "check_user"):
+                check_user(page, username, account_id)
 
             # 6. Route to the correct operation
             result = None
-            match operation:
-                case "place-order":
-                    result = place_order_click(page)
-                case "auto-place-order":
-                    result = full_place_order(page, purchase_type, order_amount, symbol, take_profit, stop_loss)
-                case "auto-place-and-terminate":
-                    print(f"Operation: auto-place-and-terminate. Placing order then monitoring {symbol}...")
-                    place_result = full_place_order(page, purchase_type, order_amount, symbol, take_profit, stop_loss)
+            apply_default_timeout(page)
+            with trace_step("ctrader", operation):
+                match operation:
+                    case "place-order":
+                        result = place_order_click(page)
+                    case "auto-place-order":
+                        result = full_place_order(page, purchase_type, order_amount, symbol, take_profit, stop_loss)
+                    case "auto-place-and-terminate":
+                        print(f"Operation: auto-place-and-terminate. Placing order then monitoring {symbol}...")
+                        place_result = full_place_order(page, purchase_type, order_amount, symbol, take_profit, stop_loss)
                     
-                    # Check success properly
-                    is_success = False
-                    if isinstance(place_result, dict):
-                        is_success = place_result.get("success", False)
-                    elif isinstance(place_result, bool):
-                        is_success = place_result
+                        # Check success properly
+                        is_success = False
+                        if isinstance(place_result, dict):
+                            is_success = place_result.get("success", False)
+                        elif isinstance(place_result, bool):
+                            is_success = place_result
                         
-                    if is_success:
-                        print("Order placed successfully! Handing over to trade-terminator...")
-                        result = terminate_trade(page, symbol, account_id, db_account_id)
-                    else:
-                        print("Order placement failed, skipping terminator.")
-                        result = place_result
-                case "place-and-terminate":
-                    print(f"Operation: place-and-terminate. Clicking Place Order then monitoring {symbol}...")
-                    place_result = place_order_click(page)
+                        if is_success:
+                            print("Order placed successfully! Handing over to trade-terminator...")
+                            result = terminate_trade(page, symbol, account_id, db_account_id)
+                        else:
+                            print("Order placement failed, skipping terminator.")
+                            result = place_result
+                    case "place-and-terminate":
+                        print(f"Operation: place-and-terminate. Clicking Place Order then monitoring {symbol}...")
+                        place_result = place_order_click(page)
                     
-                    # Check success properly
-                    is_success = False
-                    if isinstance(place_result, dict):
-                        is_success = place_result.get("success", False)
-                    elif isinstance(place_result, bool):
-                        is_success = place_result
+                        # Check success properly
+                        is_success = False
+                        if isinstance(place_result, dict):
+                            is_success = place_result.get("success", False)
+                        elif isinstance(place_result, bool):
+                            is_success = place_result
                         
-                    if is_success:
-                        print("Order placed successfully! Handing over to trade-terminator...")
+                        if is_success:
+                            print("Order placed successfully! Handing over to trade-terminator...")
+                            result = terminate_trade(page, symbol, account_id, db_account_id)
+                        else:
+                            print("Order placement failed, skipping terminator.")
+                            result = place_result
+                    case "edit-place-order":
+                        result = edit_place_order(page, purchase_type, order_amount, symbol, take_profit, stop_loss)
+                    case "input-order":
+                        result = input_order(page, purchase_type, order_amount, symbol, take_profit, stop_loss)
+                    case "trade-terminator":
                         result = terminate_trade(page, symbol, account_id, db_account_id)
-                    else:
-                        print("Order placement failed, skipping terminator.")
-                        result = place_result
-                case "edit-place-order":
-                    result = edit_place_order(page, purchase_type, order_amount, symbol, take_profit, stop_loss)
-                case "input-order":
-                    result = input_order(page, purchase_type, order_amount, symbol, take_profit, stop_loss)
-                case "trade-terminator":
-                    result = terminate_trade(page, symbol, account_id, db_account_id)
-                case "close-position":
-                    result = close_position(page, symbol)
-                case "default" | "1" | _:
-                    print(f"Operation: {operation} (Default). Running input_order...")
-                    result = input_order(page, purchase_type, order_amount, symbol, take_profit, stop_loss)
+                    case "close-position":
+                        result = close_position(page, symbol)
+                    case "default" | "1" | _:
+                        print(f"Operation: {operation} (Default). Running input_order...")
+                        result = input_order(page, purchase_type, order_amount, symbol, take_profit, stop_loss)
 
             # Normalize result to dict format
             if isinstance(result, bool):
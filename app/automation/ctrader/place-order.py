@@ -1,17 +1,14 @@
 import re
-import random
 import importlib
+from app.helper.tracing import traced
+from app.automation.toolkit import random_delay
+from app.helper.deadline import budget
 
 input_order_module = importlib.import_module("app.automation.ctrader.input-order")
 input_order = input_order_module.input_order
 
 
-def random_delay(page, min_ms=800, max_ms=2500):
-    """Wait a random duration to appear more human-like."""
-    delay = random.randint(min_ms, max_ms)
-    page.wait_for_timeout(delay)
-
-
+@traced("place_order")
 def place_order(page):
     """
     Clicks the 'Place order' button to execute the order that was previously filled.
@@ -23,7 +20,7 @@ def place_order(page):
         warning_text = None
         try:
             warning_el = page.locator(':text("The market is closed"), :text("Only pending orders are accepted"), :text("not available for trading"), :text("Insufficient funds")').first
-            if warning_el.is_visible(timeout=1500):
+            if warning_el.is_visible(timeout=budget(1500)):
                 warning_text = warning_el.inner_text().strip()
                 print(f"  ⚠ Warning detected: {warning_text}")
         except Exception:
@@ -35,7 +32,7 @@ def place_order(page):
         execute_button = None
         try:
             dynamic_btn = page.get_by_role("button", name=re.compile(r"^(SELL|BUY)\s", re.IGNORECASE)).first
-            if dynamic_btn.is_visible(timeout=1500):
+            if dynamic_btn.is_visible(timeout=budget(1500)):
                 execute_button = dynamic_btn
                 print(f"  ✓ Found dynamic execute button: '{dynamic_btn.inner_text().strip()}'")
         except Exception:
@@ -90,7 +87,7 @@ def place_order(page):
                 return {"success": False, "reason": reason, "warning": warning_text}
 
             print(f"Found execution button: {execute_button.inner_text()}")
-            execute_button.click(timeout=5000)
+            execute_button.click(timeout=budget(5000))
             print("Clicked Place Order button.")
             
             random_delay(page, 1000, 2000)
@@ -98,7 +95,7 @@ def place_order(page):
             # Verification logic
             try:
                 success_notification = page.locator('text=/Order|Position|Executed|Success/i').first
-                success_notification.wait_for(state="visible", timeout=10000)
+                success_notification.wait_for(state="visible", timeout=budget(10000))
                 print("Order confirmation detected in UI.")
                 return {"success": True, "reason": None, "warning": warning_text}
             except:
@@ -117,6 +114,7 @@ def place_order(page):
 
 
 
+@traced("full_place_order")
 def full_place_order(page, purchase_type, order_amount, symbol, take_profit, stop_loss):
     """
     Places a new order by filling in the order form and clicking the submit button.
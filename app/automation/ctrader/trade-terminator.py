@@ -2,6 +2,11 @@ import re
 import time
 import importlib
 from app.core.supabase import get_supabase
+from app.helper.metrics import TERMINATOR_TICK_SECONDS
+from app.helper.tracing import traced
+from app.automation.dom_query import find_text_cell
+from app.helper.deadline import budget, unbounded, apply_default_timeout
+from app.helper.humanization import use_profile
 
 close_position_module = importlib.import_module("app.automation.ctrader.close-position")
 close_position = close_position_module.close_position
@@ -38,30 +43,23 @@ def _resolve_db_account_id(supabase, platform_id: str) -> str:
         print(f"  ⚠ Error resolving DB account ID: {e}")
         return None
 
+@traced("terminate_trade")
+@unbounded
 def terminate_trade(page, symbol: str, account_id: str = None, db_account_id: str = None):
     print(f"\n👀 Monitoring started for {symbol} on account {account_id} / DB {db_account_id}...")
+    # Monitoring is open-ended: restore the full default timeout the operation budget had clamped
+    apply_default_timeout(page)
 
     def _position_row_exists() -> bool:
         """
         Best-effort check that a position row for `symbol` exists in the cTrader UI.
         We reuse the same heuristic as `close-position`: find exact symbol text in the
-        lower (positions) panel area of the viewport.
+        lower (positions) panel area of the viewport, in one in-page query.
         """
         try:
-            viewport_height = page.viewport_size["height"] if page.viewport_size else 768
-            min_y_for_positions = viewport_height * 0.55
-            symbol_elements = page.locator(f':text-is("{symbol}")').all()
-            for el in symbol_elements:
-                try:
-                    if el.is_visible(timeout=250):
-                        box = el.bounding_box()
-                        if box and box.get("y", 0) > min_y_for_positions:
-                            return True
-                except Exception:
-                    continue
+            return find_text_cell(page, symbol, min_y_ratio=0.55) is not None
         except Exception:
             return False
-        return False
 
     saw_position_row = False
 
@@ -145,7 +143,7 @@ def terminate_trade(page, symbol: str, account_id: str = None, db_account_id: st
         
         for loc in locs:
             try:
-                if loc.is_visible(timeout=1000):
+                if loc.is_visible(timeout=budget(1000)):
                     text = loc.inner_text()
                     if parse_balance(text) > 0:
                         return loc
@@ -199,9 +197,14 @@ def terminate_trade(page, symbol: str, account_id: str = None, db_account_id: st
             print(f"  ⚠ No db_account_id provided for platform ID '{account_id}'")
 
         # 2. Poll for balance changes AND database signals
+        last_tick = None
         while True:
+            # Record how long the previous polling iteration took end to end
+            if last_tick is not None:
+                TERMINATOR_TICK_SECONDS.observe(time.perf_counter() - last_tick, platform="ctrader")
+            last_tick = time.perf_counter()
             # Wait 200ms between checks for near-instant reaction
-            page.wait_for_timeout(200)
+            page.wait_for_timeout(budget(200))
             
             # --- Check Database Signal ---
             if paired_record_id:
@@ -217,14 +220,16 @@ def terminate_trade(page, symbol: str, account_id: str = None, db_account_id: st
                             print(f"\n📡 [{role}] RECEIVED exit signal '{db_signal}' from partner (triggered by {trigger})")
                             print(f"🤖 [{role}] This device is closing position via AUTOMATION (partner triggered)")
                             print("🔪 Executing 'close-position' to terminate paired trade...")
-                            close_result = close_position(page, symbol)
+                            # Partner close is latency-critical: no artificial pauses or mouse paths
+                            with use_profile("off"):
+                                close_result = close_position(page, symbol)
                             
                             # Wait for balance to update after closing, then read it
                             final_balance_received = None
                             try:
                                 print(f"⏳ Waiting for balance to update from {initial_balance}...")
                                 for attempt in range(50):  # 50 x 200ms = 10 seconds max
-                                    page.wait_for_timeout(200)
+                                    page.wait_for_timeout(budget(200))
                                     final_text = balance_locator.inner_text()
                                     final_balance_received = parse_balance(final_text)
                                     if final_balance_received != initial_balance and final_balance_received > 0:
@@ -0,0 +1,93 @@
+import uuid
+from typing import List, Optional
+
+# Attribute the in-page queries stamp on the elements they pick, so Python can
+# address them with an ordinary locator (and keep Playwright's auto-waiting)
+TARGET_ATTRIBUTE = "data-harmony-target"
+
+_VISIBLE_RECT_JS = """
+const visibleRect = (el) => {
+    const rect = el.getBoundingClientRect();
+    if (rect.width === 0 || rect.height === 0) return null;
+    const style = getComputedStyle(el);
+    if (style.visibility === 'hidden' || style.display === 'none') return null;
+    return rect;
+};
+const normalize = (text) => (text || '').replace(/\\s+/g, ' ').trim();
+"""
+
+_FIND_TEXT_CELL_JS = """
+([text, minYRatio, attribute, token]) => {
+""" + _VISIBLE_RECT_JS + """
+    document.querySelectorAll(`[${attribute}]`).forEach((el) => el.removeAttribute(attribute));
+    const minY = window.innerHeight * minYRatio;
+    const walker = document.createTreeWalker(document.body, NodeFilter.SHOW_TEXT);
+    let node;
+    while ((node = walker.nextNode())) {
+        if (normalize(node.nodeValue) !== text) continue;
+        const el = node.parentElement;
+        if (!el || normalize(el.textContent) !== text) continue;
+        const rect = visibleRect(el);
+        if (!rect || rect.y <= minY) continue;
+        el.setAttribute(attribute, token);
+        return {x: rect.x, y: rect.y, width: rect.width, height: rect.height, min_y: minY};
+    }
+    return null;
+}
+"""
+
+_FIND_ROW_ICONS_JS = """
+([selector, rowCenter, minY, maxDistance, labelPattern, attribute, token]) => {
+""" + _VISIBLE_RECT_JS + """
+    const label = new RegExp(labelPattern, 'i');
+    const found = [];
+    document.querySelectorAll(selector).forEach((icon) => {
+        const rect = visibleRect(icon);
+        if (!rect || rect.y <= minY) return;
+        const distance = Math.abs(rect.y + rect.height / 2 - rowCenter);
+        if (distance >= maxDistance) return;
+        const target = icon.parentElement || icon;
+        let labels = '';
+        for (let el = target, depth = 0; el && depth < 3; el = el.parentElement, depth++) {
+            labels += ' ' + ['title', 'aria-label', 'data-tooltip'].map((name) => el.getAttribute(name) || '').join(' ');
+        }
+        const index = found.length;
+        target.setAttribute(attribute, `${token}-${index}`);
+        found.push({index, x: rect.x, y: rect.y, width: rect.width, height: rect.height, distance, labelled: label.test(labels)});
+    });
+    return found;
+}
+"""
+
+
+def find_text_cell(page, text: str, min_y_ratio: float = 0.55) -> Optional[dict]:
+    """
+    Finds the first visible element whose whole text is `text` (like :text-is)
+    below `min_y_ratio` of the viewport, in one page.evaluate.
+    Returns its rect plus `min_y` and a `locator` for it, or None.
+    """
+    token = uuid.uuid4().hex[:12]
+    cell = page.evaluate(_FIND_TEXT_CELL_JS, [text, min_y_ratio, TARGET_ATTRIBUTE, token])
+    if not cell:
+        return None
+    cell["locator"] = page.locator(f'[{TARGET_ATTRIBUTE}="{token}"]')
+    return cell
+
+
+def find_row_icons(page, selector: str, row_center_y: float, min_y: float,
+                   max_distance: float = 25, label_pattern: str = "close position") -> List[dict]:
+    """
+    Collects visible icons matching a CSS `selector` whose vertical centre is
+    within `max_distance` px of `row_center_y`, in one page.evaluate.
+    Each entry has the icon's rect, its distance from the row, whether its
+    clickable parent is labelled (title/aria-label/data-tooltip) as
+    `label_pattern`, and a `locator` for that parent.
+    """
+    token = uuid.uuid4().hex[:12]
+    icons = page.evaluate(
+        _FIND_ROW_ICONS_JS,
+        [selector, row_center_y, min_y, max_distance, label_pattern, TARGET_ATTRIBUTE, token]
+    )
+    for icon in icons:
+        icon["locator"] = page.locator(f'[{TARGET_ATTRIBUTE}="{token}-{icon["index"]}"]')
+    return icons
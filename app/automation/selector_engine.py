@@ -0,0 +1,93 @@
+import time
+import logging
+from typing import List, Optional
+from playwright.sync_api import TimeoutError as PlaywrightTimeoutError
+from app.helper.deadline import budget
+
+logger = logging.getLogger(__name__)
+
+
+class SelectorMatch:
+    """The candidate that won a lookup: its locator, selector string and position in the list passed to resolve."""
+
+    __slots__ = ("locator", "selector", "index")
+
+    def __init__(self, locator, selector: str, index: int):
+        self.locator = locator
+        self.selector = selector
+        self.index = index
+
+
+def _probe(scope, selectors: List[str]) -> Optional[SelectorMatch]:
+    """Returns the first candidate, in list order, that is visible right now (no waiting)."""
+    for index, selector in enumerate(selectors):
+        try:
+            locator = scope.locator(selector).filter(visible=True).first
+            if locator.is_visible():
+                return SelectorMatch(locator, selector, index)
+        except Exception:
+            continue
+    return None
+
+
+def _wait_any(scope, selectors: List[str], timeout: float):
+    """Waits until any of `selectors` is visible, in one wait on their union locator."""
+    union = None
+    for selector in selectors:
+        locator = scope.locator(selector)
+        union = locator if union is None else union.or_(locator)
+    union.filter(visible=True).first.wait_for(state="visible", timeout=timeout)
+
+
+def _usable(scope, selectors: List[str]) -> List[str]:
+    """Drops the candidates Playwright rejects (e.g. a selector it can't parse), with a warning."""
+    usable = []
+    for selector in selectors:
+        try:
+            scope.locator(selector).first.is_visible()
+        except Exception as e:
+            logger.warning(f"Ignoring selector {selector!r}: {e}")
+            continue
+        usable.append(selector)
+    return usable
+
+
+def resolve(scope, selectors: List[str], timeout: float = 3000) -> Optional[SelectorMatch]:
+    """
+    Finds the first visible element among candidate selectors.
+
+    All candidates are raced in a single wait (one union locator), so a lookup
+    costs at most one `timeout` however many candidates there are. Once any of
+    them is visible, the earliest candidate in the list that is visible wins,
+    so list order still expresses preference. `timeout=0` only checks what is
+    visible right now, for optional elements such as overlays. A candidate
+    Playwright rejects is logged and left out; the others are still waited for.
+    `scope` may be a page, frame or locator.
+    """
+    candidates = [selector for selector in selectors if selector]
+    if not candidates:
+        return None
+
+    if timeout and timeout > 0:
+        deadline = time.monotonic() + budget(timeout) / 1000
+        try:
+            _wait_any(scope, candidates, (deadline - time.monotonic()) * 1000)
+        except PlaywrightTimeoutError:
+            return None
+        except Exception:
+            # Some candidate broke the union; wait on the rest for what is left of the timeout
+            candidates = _usable(scope, candidates)
+            if not candidates:
+                return None
+            remaining = (deadline - time.monotonic()) * 1000
+            if remaining > 0:
+                try:
+                    _wait_any(scope, candidates, remaining)
+                except PlaywrightTimeoutError:
+                    return None
+
+    match = _probe(scope, candidates)
+    if match:
+        # Position in the caller's list, empty entries included
+        match.index = selectors.index(match.selector)
+    return match
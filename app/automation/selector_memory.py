@@ -0,0 +1,183 @@
+import os
+import json
+import uuid
+import threading
+from pathlib import Path
+from typing import Callable, Dict, List, Optional, Tuple
+from dotenv import load_dotenv
+from app.automation.selector_engine import resolve as resolve_selectors, SelectorMatch
+
+load_dotenv()
+
+# A remembered winner that misses this many lookups in a row (with nothing else winning) is dropped
+DEMOTE_AFTER = int(os.getenv("SELECTOR_MEMORY_DEMOTE_AFTER", "2"))
+# Counters are flushed to disk at least this often even when no winner changed
+SAVE_EVERY = 20
+
+
+def _memory_folder() -> Path:
+    folder = os.getenv("SELECTOR_MEMORY_FOLDER")
+    if folder:
+        return Path(folder)
+    return Path(__file__).resolve().parent.parent.parent / "selector_memory"
+
+
+class SelectorMemory:
+    """
+    Remembers, per logical UI element, which selector or strategy found it last
+    time, so the next lookup tries that one first. A winner that stops working
+    is replaced by whatever wins instead, dropped after DEMOTE_AFTER misses, or
+    dropped at once when the element it found could not be clicked.
+    Persisted per platform as JSON so it survives restarts.
+    """
+
+    def __init__(self, platform: str):
+        self.platform = platform
+        self.path = _memory_folder() / f"{platform}.json"
+        self._lock = threading.Lock()
+        self._elements: Dict[str, dict] = {}
+        self._dirty = 0
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                self._elements = json.load(f).get("elements", {})
+        except FileNotFoundError:
+            pass
+        except Exception as e:
+            print(f"[selector-memory] Ignoring unreadable {self.path}: {e}")
+
+    def _entry(self, element: str) -> dict:
+        return self._elements.setdefault(element, {
+            "winner": None, "winner_misses": 0,
+            "lookups": 0, "first_hits": 0, "fallback_hits": 0, "misses": 0,
+        })
+
+    def winner(self, element: str) -> Optional[str]:
+        with self._lock:
+            entry = self._elements.get(element)
+            return entry["winner"] if entry else None
+
+    def ranked(self, element: str, candidates: List[str]) -> List[str]:
+        """Candidates with the remembered winner moved to the front; otherwise unchanged."""
+        winner = self.winner(element)
+        if winner in candidates:
+            return [winner] + [name for name in candidates if name != winner]
+        return list(candidates)
+
+    def record(self, element: str, winner: Optional[str], first_tried: Optional[str]):
+        """Records a lookup's outcome: `winner` is what worked (None if nothing did)."""
+        with self._lock:
+            entry = self._entry(element)
+            entry["lookups"] += 1
+            changed = False
+            if winner is None:
+                entry["misses"] += 1
+                if entry["winner"] and entry["winner"] == first_tried:
+                    entry["winner_misses"] += 1
+                    if entry["winner_misses"] >= DEMOTE_AFTER:
+                        print(f"[selector-memory] {self.platform}/{element}: dropping '{entry['winner']}' after {entry['winner_misses']} misses")
+                        entry["winner"] = None
+                        entry["winner_misses"] = 0
+                    changed = True
+            else:
+                entry["first_hits" if winner == first_tried else "fallback_hits"] += 1
+                if entry["winner"] != winner or entry["winner_misses"]:
+                    entry["winner"] = winner
+                    entry["winner_misses"] = 0
+                    changed = True
+            self._dirty += 1
+            if changed or self._dirty >= SAVE_EVERY:
+                self._save()
+
+    def demote(self, element: str):
+        """Forgets the remembered winner, e.g. because the element it found could not be clicked."""
+        with self._lock:
+            entry = self._elements.get(element)
+            if not entry or not entry["winner"]:
+                return
+            print(f"[selector-memory] {self.platform}/{element}: dropping '{entry['winner']}' after a failed action")
+            entry["winner"] = None
+            entry["winner_misses"] = 0
+            self._save()
+
+    def _save(self):
+        """Writes the memory atomically. Caller holds the lock."""
+        try:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            temp_path = self.path.with_name(f".{self.path.name}.{uuid.uuid4().hex}.tmp")
+            with open(temp_path, "w", encoding="utf-8") as f:
+                json.dump({"platform": self.platform, "elements": self._elements}, f, indent=2)
+            os.replace(temp_path, self.path)
+            self._dirty = 0
+        except Exception as e:
+            print(f"[selector-memory] Could not save {self.path}: {e}")
+
+    def resolve(self, scope, element: str, selectors: List[str], timeout: float = 3000) -> Optional[SelectorMatch]:
+        """
+        Selector lookup with memory. All candidates are still raced in one wait;
+        memory only decides which one wins when several are visible. The first
+        selector is the explicit (codegen) one and always keeps precedence; the
+        remembered winner is ranked right after it, ahead of the other fallbacks.
+        """
+        candidates = [selector for selector in selectors if selector]
+        if not candidates:
+            return None
+        explicit = candidates[0]
+        ranked = [explicit] + self.ranked(element, candidates[1:])
+        remembered = self.winner(element)
+        match = resolve_selectors(scope, ranked, timeout=timeout)
+        self.record(element, match.selector if match else None, remembered if remembered in candidates else explicit)
+        if match:
+            match.index = selectors.index(match.selector)
+        return match
+
+    def attempt(self, element: str, strategies: List[Tuple[str, Callable[[], object]]]):
+        """
+        Runs named strategies in remembered order until one returns something
+        truthy, and returns that. Returns False if none worked.
+        """
+        by_name = dict(strategies)
+        ranked = self.ranked(element, [name for name, _ in strategies])
+        for name in ranked:
+            try:
+                result = by_name[name]()
+            except Exception as e:
+                print(f"[selector-memory] {self.platform}/{element}: strategy '{name}' failed: {e}")
+                result = None
+            if result:
+                self.record(element, name, ranked[0])
+                return result
+        self.record(element, None, ranked[0] if ranked else None)
+        return False
+
+    def stats(self) -> dict:
+        with self._lock:
+            elements = {name: dict(entry) for name, entry in self._elements.items()}
+        lookups = first_hits = 0
+        for entry in elements.values():
+            entry["hit_rate"] = round(entry["first_hits"] / entry["lookups"], 3) if entry["lookups"] else None
+            lookups += entry["lookups"]
+            first_hits += entry["first_hits"]
+        return {
+            "lookups": lookups,
+            "hit_rate": round(first_hits / lookups, 3) if lookups else None,
+            "elements": elements,
+        }
+
+
+_memories: Dict[str, SelectorMemory] = {}
+_memories_lock = threading.Lock()
+
+
+def get_selector_memory(platform: str) -> SelectorMemory:
+    with _memories_lock:
+        memory = _memories.get(platform)
+        if memory is None:
+            memory = _memories[platform] = SelectorMemory(platform)
+        return memory
+
+
+def selector_memory_stats() -> dict:
+    """Hit rates per platform: how often the remembered winner was right on the first try."""
+    with _memories_lock:
+        memories = dict(_memories)
+    return {platform: memory.stats() for platform, memory in memories.items()}
@@ -0,0 +1,202 @@
+import os
+import time
+import weakref
+import importlib
+import contextvars
+import functools
+from typing import List, Optional
+from dotenv import load_dotenv
+from app.helper.metrics import UI_ACTION_SECONDS, UI_DELAY_SECONDS
+from app.helper.deadline import budget
+from app.helper.humanization import current_profile
+from app.automation.selector_engine import resolve
+from app.automation.selector_memory import get_selector_memory
+
+load_dotenv()
+
+Human = importlib.import_module("app.helper.humanize-automation-helper").Human
+
+# Default timeouts (ms) shared by both drivers, so a step only passes one when it
+# deliberately differs. UI_TIMEOUT_SCALE stretches them all on a slow machine.
+LOOKUP_TIMEOUT_MS = 3000
+CLICK_TIMEOUT_MS = 2000
+FILL_CLICK_TIMEOUT_MS = 3000
+SCROLL_TIMEOUT_MS = 2000
+TIMEOUT_SCALE = float(os.getenv("UI_TIMEOUT_SCALE", "1"))
+# Longest wait for an optional element (a banner, one strategy of several). These
+# are usually absent, and a miss shouldn't cost the full lookup timeout.
+OPTIONAL_PROBE_MS = float(os.getenv("UI_OPTIONAL_PROBE_MS", "300"))
+
+# A click that fails (element detached by a re-render, covered by an animation)
+# is retried this many times, re-resolving the element first
+CLICK_RETRIES = 1
+RETRY_DELAY_MS = 250
+
+# The platform whose driver is running on this thread; labels metrics and picks the selector memory
+_platform: contextvars.ContextVar[Optional[str]] = contextvars.ContextVar("ui_platform", default=None)
+
+# page -> Human, so each page keeps its own mouse position; entries go away with their page
+_humans = weakref.WeakKeyDictionary()
+
+
+def driver_platform(name: str):
+    """Decorator for a driver's run(): helpers called inside it are attributed to `name`."""
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            token = _platform.set(name)
+            try:
+                return func(*args, **kwargs)
+            finally:
+                _platform.reset(token)
+        return wrapper
+    return decorator
+
+
+def current_platform() -> Optional[str]:
+    return _platform.get()
+
+
+def ui_timeout(ms: Optional[float]) -> float:
+    """
+    The effective timeout for a UI wait: `ms` scaled by UI_TIMEOUT_SCALE and
+    clamped to the operation's remaining budget (0 stays 0).
+    """
+    if not ms or ms <= 0:
+        return 0
+    return budget(ms * TIMEOUT_SCALE)
+
+
+def optional_timeout(ms: Optional[float]) -> float:
+    """ui_timeout() for an optional element: `ms` capped at OPTIONAL_PROBE_MS."""
+    return ui_timeout(min(ms or 0, OPTIONAL_PROBE_MS))
+
+
+def _observe(action: str, platform: Optional[str], started: float, outcome: str):
+    UI_ACTION_SECONDS.observe(time.perf_counter() - started, platform=platform or _platform.get() or "", action=action, outcome=outcome)
+
+
+def random_delay(page, min_ms: int = 800, max_ms: int = 2500):
+    """Wait a random duration to appear more human-like, scaled by the humanization profile."""
+    delay = current_profile().delay_ms(min_ms, max_ms)
+    if delay <= 0:
+        return
+    delay = budget(delay)
+    UI_DELAY_SECONDS.inc(delay / 1000)
+    page.wait_for_timeout(delay)
+
+
+def human(page):
+    """The page's Human helper. It follows the humanization profile of whichever run uses it."""
+    helper = _humans.get(page)
+    if helper is None:
+        helper = _humans[page] = Human(page)
+    return helper
+
+
+def type_keys(page, text: str, min_ms: int, max_ms: int):
+    """Types into the focused element with the profile's keystroke cadence (one go when keystrokes are off)."""
+    human(page).type_keys(text, min_ms, max_ms)
+
+
+def click_at(page, x: float, y: float):
+    """Clicks page coordinates, reaching them along a profile-shaped mouse path."""
+    human(page).click_at(x, y, move_first=current_profile().mouse_scale > 0)
+
+
+def _approach(locator):
+    # Under a profile with mouse movement, glide to the element before clicking it
+    if current_profile().mouse_scale <= 0:
+        return
+    try:
+        human(locator.page).move_to_element(locator)
+    except Exception:
+        pass
+
+
+def first_visible(scope, selectors: List[str], timeout: float = LOOKUP_TIMEOUT_MS,
+                  element: str = None, platform: str = None, optional: bool = False):
+    """
+    Returns the first visible locator among candidate selectors, or None.
+    With `element`, the lookup goes through the platform's selector memory, so
+    the selector that found `element` last time is tried first. `platform`
+    defaults to the driver currently running. `optional` caps the wait at
+    OPTIONAL_PROBE_MS, for elements that are often legitimately absent.
+    """
+    started = time.perf_counter()
+    platform = platform or _platform.get()
+    timeout = optional_timeout(timeout) if optional else ui_timeout(timeout)
+    try:
+        if element and platform:
+            match = get_selector_memory(platform).resolve(scope, element, selectors, timeout=timeout)
+        else:
+            match = resolve(scope, selectors, timeout=timeout)
+    except Exception:
+        _observe("lookup", platform, started, "error")
+        raise
+    _observe("lookup", platform, started, "hit" if match else "miss")
+    return match.locator if match else None
+
+
+def click_first(scope, selectors: List[str], timeout: float = LOOKUP_TIMEOUT_MS,
+                click_timeout: float = CLICK_TIMEOUT_MS, element: str = None, platform: str = None,
+                optional: bool = False) -> bool:
+    """
+    Clicks the first visible element among selectors. A failed click is retried
+    after resolving the element again. Returns whether a click landed.
+    """
+    started = time.perf_counter()
+    target = first_visible(scope, selectors, timeout=timeout, element=element, platform=platform, optional=optional)
+    if not target:
+        return False
+
+    _approach(target)
+    for attempt in range(CLICK_RETRIES + 1):
+        try:
+            target.click(timeout=ui_timeout(click_timeout))
+            _observe("click", platform, started, "hit")
+            return True
+        except Exception:
+            if attempt == CLICK_RETRIES:
+                break
+            # The element may have been re-rendered; look it up again right now
+            time.sleep(RETRY_DELAY_MS / 1000)
+            target = first_visible(scope, selectors, timeout=0, platform=platform) or target
+    _observe("click", platform, started, "error")
+    if element and (platform or _platform.get()):
+        # Whatever the memory ranked up found something unclickable; don't prefer it next time
+        get_selector_memory(platform or _platform.get()).demote(element)
+    return False
+
+
+def clear_and_fill(locator, page, value, click_timeout: float = FILL_CLICK_TIMEOUT_MS, platform: str = None):
+    """Clear an input and fill with value."""
+    started = time.perf_counter()
+    try:
+        try:
+            locator.scroll_into_view_if_needed(timeout=ui_timeout(SCROLL_TIMEOUT_MS))
+        except Exception:
+            pass
+        locator.click(timeout=ui_timeout(click_timeout))
+        page.keyboard.press("Control+A")
+        page.keyboard.press("Backspace")
+        locator.fill(str(value))
+    except Exception:
+        _observe("fill", platform, started, "error")
+        raise
+    _observe("fill", platform, started, "hit")
+
+
+def get_text_if_visible(locator, timeout: float = 0) -> Optional[str]:
+    """
+    The element's stripped inner text if it is visible, else None. By default
+    only checks what is on screen now; a positive `timeout` waits for it.
+    """
+    try:
+        if timeout and timeout > 0:
+            locator.wait_for(state="visible", timeout=ui_timeout(timeout))
+        elif not locator.is_visible():
+            return None
+        return (locator.inner_text() or "").strip()
+    except Exception:
+        return None
@@ -1,37 +1,7 @@
-import random
-
-
-def random_delay(page, min_ms=800, max_ms=2500):
-    delay = random.randint(min_ms, max_ms)
-    page.wait_for_timeout(delay)
-
-
-# ---------------------------------------------------------------------------
-# UI helpers (inlined – no _ui.py dependency)
-# ---------------------------------------------------------------------------
-
-def first_visible(page, selectors, timeout=3000):
-    """Return the first visible locator from candidate selectors."""
-    for selector in selectors:
-        try:
-            loc = page.locator(selector).first
-            if loc.is_visible(timeout=timeout):
-                return loc
-        except Exception:
-            continue
-    return None
-
-
-def click_first(page, selectors, timeout=3000, click_timeout=2000):
-    """Click the first visible element from selectors."""
-    target = first_visible(page, selectors, timeout=timeout)
-    if not target:
-        return False
-    try:
-        target.click(timeout=click_timeout)
-        return True
-    except Exception:
-        return False
+from app.automation.toolkit import random_delay, click_first, click_at
+from app.helper.deadline import budget
+from app.automation.waits import settle
+from app.automation.account_cache import is_account_verified, mark_account_verified, forget_verified_account
 
 
 # ---------------------------------------------------------------------------
@@ -54,16 +24,16 @@ def _open_bottom_left_profile(page):
         'button:has-text("Account")',
     ]
 
-    opened = click_first(page, selectors, timeout=2000, click_timeout=2000)
+    opened = click_first(page, selectors, timeout=2000, element="profile_button")
     if opened:
-        page.wait_for_timeout(400)
+        settle(page, replaces_ms=400)
         return True
 
     # Last-resort: click the very bottom-left corner where the avatar lives.
     # This is intentionally limited to a tight region (not timezone or other UI).
     try:
-        page.mouse.click(26, 690)
-        page.wait_for_timeout(400)
+        click_at(page, 26, 690)
+        settle(page, replaces_ms=400)
         return True
     except Exception:
         return False
@@ -73,14 +43,14 @@ def _close_drawer(page):
     """Close the account drawer by pressing Escape, then clicking into the chart."""
     try:
         page.keyboard.press("Escape")
-        page.wait_for_timeout(300)
+        settle(page, replaces_ms=300)
     except Exception:
         pass
 
     # Click into the chart canvas area to dismiss any remaining overlay.
     try:
-        page.mouse.click(350, 200)
-        page.wait_for_timeout(200)
+        click_at(page, 350, 200)
+        settle(page, replaces_ms=200)
     except Exception:
         pass
 
@@ -96,11 +66,17 @@ def check_user(page, username, account_id):
 
     Does NOT switch accounts — just confirms presence.
     Logs a warning (does NOT raise) if the account cannot be found.
+    Skipped when this page already verified the same account recently.
     """
     if not account_id:
         print("WARNING: No account_id provided – skipping account check.")
         return
 
+    if is_account_verified(page, username, account_id):
+        print(f"TradeLocker account #{str(account_id).strip().lstrip('#')} already verified on this page. Skipping drawer.")
+        return
+    forget_verified_account(page)
+
     random_delay(page, 400, 800)
 
     opened = _open_bottom_left_profile(page)
@@ -123,7 +99,7 @@ def check_user(page, username, account_id):
     ]:
         try:
             el = page.locator(selector).first
-            if el.is_visible(timeout=1500):
+            if el.is_visible(timeout=budget(1500)):
                 found = True
                 break
         except Exception:
@@ -137,6 +113,9 @@ def check_user(page, username, account_id):
 
     # Close the drawer – click outside, do NOT click any account row.
     _close_drawer(page)
-    
-    # Wait 3 seconds (3000ms) after clicking outside to ensure the drawer is fully closed
-    page.wait_for_timeout(3000)
+
+    # The drawer is closed once its slide-out animation has ended
+    settle(page, replaces_ms=3000)
+
+    if found:
+        mark_account_verified(page, username, account_id)
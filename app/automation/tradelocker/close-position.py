@@ -1,3 +1,8 @@
+from app.helper.tracing import traced
+from app.helper.deadline import budget
+
+
+@traced("close_position")
 def close_position(page, symbol: str) -> dict:
     """
     Attempts to close an open position for the provided symbol.
@@ -15,8 +20,8 @@ def close_position(page, symbol: str) -> dict:
         ]:
             try:
                 tab = page.locator(selector).first
-                if tab.is_visible(timeout=800):
-                    tab.click(timeout=1500)
+                if tab.is_visible(timeout=budget(800)):
+                    tab.click(timeout=budget(1500))
                     break
             except Exception:
                 continue
@@ -28,7 +33,7 @@ def close_position(page, symbol: str) -> dict:
 
         row = None
         try:
-            if positions_panel.is_visible(timeout=1000):
+            if positions_panel.is_visible(timeout=budget(1000)):
                 row = positions_panel.locator(
                     f'tr:has-text("{symbol_text}"), div[role="row"]:has-text("{symbol_text}"), div:has-text("{symbol_text}")'
                 ).first
@@ -39,7 +44,7 @@ def close_position(page, symbol: str) -> dict:
             row = page.locator(
                 f'tr:has-text("{symbol_text}"), div[role="row"]:has-text("{symbol_text}"), div:has-text("{symbol_text}")'
             ).first
-        if not row.is_visible(timeout=3000):
+        if not row.is_visible(timeout=budget(3000)):
             return {
                 "success": False,
                 "reason": f"No active TradeLocker position found for {symbol}",
@@ -54,8 +59,8 @@ def close_position(page, symbol: str) -> dict:
         # Strategy 1: The exact button name seen in codegen
         try:
             btn = row.get_by_role("button", name="Close position", exact=True).first
-            if btn.is_visible(timeout=1000):
-                btn.click(timeout=2000)
+            if btn.is_visible(timeout=budget(1000)):
+                btn.click(timeout=budget(2000))
                 clicked = True
                 print(f"[close-position] Clicked exact 'Close position' button.")
         except Exception:
@@ -67,8 +72,8 @@ def close_position(page, symbol: str) -> dict:
                 candidate = row.locator(
                     'button:has-text("Close"), [aria-label*="close" i], [title*="close" i], [data-testid*="close" i], [data-testid*="remove" i], [data-testid*="x" i]'
                 ).first
-                if candidate.is_visible(timeout=1000):
-                    candidate.click(timeout=2000)
+                if candidate.is_visible(timeout=budget(1000)):
+                    candidate.click(timeout=budget(2000))
                     clicked = True
                     print(f"[close-position] Clicked heuristic close button.")
             except Exception:
@@ -80,7 +85,7 @@ def close_position(page, symbol: str) -> dict:
                 action_buttons = row.locator("button")
                 count = action_buttons.count()
                 if count > 0:
-                    action_buttons.nth(count - 1).click(timeout=1800)
+                    action_buttons.nth(count - 1).click(timeout=budget(1800))
                     clicked = True
                     print(f"[close-position] Clicked last button in row as fallback.")
             except Exception:
@@ -89,8 +94,8 @@ def close_position(page, symbol: str) -> dict:
         # Final fallback: use global Close All flow.
         if not clicked:
             close_all = page.locator('button:has-text("Close All"), [data-testid*="close-all" i]').first
-            if close_all.is_visible(timeout=1200):
-                close_all.click(timeout=1500)
+            if close_all.is_visible(timeout=budget(1200)):
+                close_all.click(timeout=budget(1500))
                 clicked = True
 
         if not clicked:
@@ -98,8 +103,8 @@ def close_position(page, symbol: str) -> dict:
 
         confirm_btn = page.locator('button:has-text("Confirm"), button:has-text("Close"), button:has-text("Yes"), button:has-text("OK")').first
         try:
-            if confirm_btn.is_visible(timeout=1200):
-                confirm_btn.click(timeout=1500)
+            if confirm_btn.is_visible(timeout=budget(1200)):
+                confirm_btn.click(timeout=budget(1500))
         except Exception:
             pass
 
@@ -1,4 +1,5 @@
 import importlib
+from app.helper.tracing import traced
 
 input_order_module = importlib.import_module("app.automation.tradelocker.input-order")
 input_order = input_order_module.input_order
@@ -7,6 +8,7 @@ place_order_module = importlib.import_module("app.automation.tradelocker.place-o
 place_order = place_order_module.place_order
 
 
+@traced("edit_place_order")
 def edit_place_order(page, purchase_type, order_amount, symbol, take_profit, stop_loss):
     """
     TradeLocker fallback implementation: update order fields and submit.
@@ -1,125 +1,62 @@
-import random
+from app.helper.tracing import traced
+from app.automation.selector_memory import get_selector_memory
+from app.automation.toolkit import random_delay, first_visible, clear_and_fill, get_text_if_visible, optional_timeout
+from app.helper.deadline import budget
+from app.automation.waits import settle, wait_for_state
 
 
 # ---------------------------------------------------------------------------
-# UI helpers (inlined – no _ui.py dependency)
+# Helpers
 # ---------------------------------------------------------------------------
 
-def first_visible(page, selectors, timeout=3000):
-    """Return the first visible locator from candidate selectors."""
-    for selector in selectors:
-        try:
-            loc = page.locator(selector).first
-            if loc.is_visible(timeout=timeout):
-                return loc
-        except Exception:
-            continue
-    return None
-
-
-def clear_and_fill(locator, page, value):
-    """Clear an input and fill with value."""
-    try:
-        locator.scroll_into_view_if_needed(timeout=2000)
-    except Exception:
-        pass
-    locator.click(timeout=4000)
-    page.keyboard.press("Control+A")
-    page.keyboard.press("Backspace")
-    locator.fill(str(value))
-
-
-def get_text_if_visible(locator, timeout=1000):
+# Expand chevron candidates, in order of preference: the exact codegen class,
+# aria/title/testid attributes, then buttons whose SVG or icon-font glyph has an
+# expand-like class (TradeLocker uses class names like 'icon-expand-arrows').
+_EXPAND_ICON_CLASSES = [
+    "expand", "maximize", "fullscreen", "arrow-up-right",
+    "enlarge", "open", "external", "arrows",
+]
+_EXPAND_SELECTORS = [
+    ".chakra-button.css-qbgzru",
+    'button[aria-label*="expand" i]',
+    'button[title*="expand" i]',
+    '[data-testid*="expand" i]',
+    'button[aria-label*="full" i]',
+    'button[title*="full" i]',
+] + [
+    selector
+    for icon_cls in _EXPAND_ICON_CLASSES
+    for selector in (f"button:has(svg[class*='{icon_cls}' i])", f"button:has(i[class*='{icon_cls}' i])")
+]
+
+
+def _expand_via_selectors(page):
+    """Strategies 1-2: race every known expand-button selector, remembered winner first."""
+    match = get_selector_memory("tradelocker").resolve(page, "instrument_expand_button", _EXPAND_SELECTORS, timeout=optional_timeout(1000))
+    if not match:
+        return False
+    label = match.locator.get_attribute("aria-label") or ""
+    print(f"[expand] Selector hit: sel='{match.selector}' label='{label}'")
     try:
-        if locator.is_visible(timeout=timeout):
-            return (locator.inner_text() or "").strip()
+        match.locator.click(timeout=budget(2000))
     except Exception:
-        pass
-    return None
-
-
-# ---------------------------------------------------------------------------
-# Helpers
-# ---------------------------------------------------------------------------
-
-def random_delay(page, min_ms=700, max_ms=1800):
-    delay = random.randint(min_ms, max_ms)
-    page.wait_for_timeout(delay)
+        get_selector_memory("tradelocker").demote("instrument_expand_button")
+        raise
+    settle(page, replaces_ms=500)
+    return True
 
 
-def _click_instrument_expandable(page):
+def _expand_via_dom_sibling(page):
     """
-    Click the expand chevron at the far-right of the mini order panel header.
-    Codegen-recorded selector: page.locator('.chakra-button.css-qbgzru').click()
+    Strategy 3: Codegen-style DOM traversal — find the MARKET/LIMIT button,
+    get its PARENT container element, then pick the LAST button child of that
+    container. This avoids page-wide coordinate math entirely.
     """
-
-    # Strategy 1: Exact codegen selector (highest priority).
-    try:
-        btn = page.locator(".chakra-button.css-qbgzru").first
-        if btn.is_visible(timeout=3000):
-            print("[expand] Codegen selector hit: .chakra-button.css-qbgzru")
-            btn.click(timeout=2000)
-            page.wait_for_timeout(500)
-            return True
-    except Exception as e:
-        print(f"[expand] Codegen selector failed: {e}")
-
-    # Strategy 2: aria / testid / title attributes.
-    for sel in [
-        'button[aria-label*="expand" i]',
-        'button[title*="expand" i]',
-        '[data-testid*="expand" i]',
-        'button[aria-label*="full" i]',
-        'button[title*="full" i]',
-    ]:
-        try:
-            btn = page.locator(sel).first
-            if btn.is_visible(timeout=600):
-                label = btn.get_attribute("aria-label") or ""
-                print(f"[expand] aria/title selector hit: sel='{sel}' label='{label}'")
-                btn.click(timeout=1000)
-                page.wait_for_timeout(500)
-                return True
-        except Exception:
-            continue
-
-    # Strategy 2: Codegen-style — button containing an SVG icon whose class
-    # includes "expand", "maximize", "fullscreen", or "arrow" (TradeLocker uses
-    # icon font / inline SVG with class names like 'icon-expand-arrows').
-    for icon_cls in [
-        "expand", "maximize", "fullscreen", "arrow-up-right",
-        "enlarge", "open", "external", "arrows",
-    ]:
-        try:
-            # Matches: <button><svg class="...expand..."/></button>
-            btn = page.locator(f"button:has(svg[class*='{icon_cls}' i])").first
-            if btn.is_visible(timeout=600):
-                print(f"[expand] SVG icon class hit: '{icon_cls}'")
-                btn.click(timeout=1000)
-                page.wait_for_timeout(500)
-                return True
-        except Exception:
-            continue
-
-        try:
-            # Matches: <button><i class="icon-expand"/></button>  (icon fonts)
-            btn = page.locator(f"button:has(i[class*='{icon_cls}' i])").first
-            if btn.is_visible(timeout=600):
-                print(f"[expand] <i> icon class hit: '{icon_cls}'")
-                btn.click(timeout=1000)
-                page.wait_for_timeout(500)
-                return True
-        except Exception:
-            continue
-
-    # Strategy 3: Codegen-style DOM traversal — find the MARKET/LIMIT button,
-    # get its PARENT container element, then pick the LAST button child of that
-    # container. This avoids page-wide coordinate math entirely.
     try:
         market_btn = page.locator(
             'button:has-text("MARKET"), button:has-text("LIMIT")'
         ).first
-        if not market_btn.is_visible(timeout=3000):
+        if not market_btn.is_visible(timeout=budget(3000)):
             raise Exception("MARKET button not visible")
 
         # Go up to the immediate parent, then find all direct button children.
@@ -130,7 +67,7 @@ def _click_instrument_expandable(page):
         visible_btns = []
         for b in sibling_btns:
             try:
-                if b.is_visible(timeout=300):
+                if b.is_visible(timeout=budget(300)):
                     txt = ""
                     try:
                         txt = b.inner_text()[:30].strip()
@@ -148,7 +85,7 @@ def _click_instrument_expandable(page):
             sibling_btns = grandparent.locator("button").all()
             for b in sibling_btns:
                 try:
-                    if b.is_visible(timeout=300):
+                    if b.is_visible(timeout=budget(300)):
                         visible_btns.append(b)
                 except Exception:
                     continue
@@ -163,13 +100,29 @@ def _click_instrument_expandable(page):
             target = non_market[-1] if non_market else visible_btns[-1]
             lbl = target.get_attribute("aria-label") or ""
             print(f"[expand] Clicking last sibling button: aria-label='{lbl}'")
-            target.click(timeout=1500)
-            page.wait_for_timeout(500)
+            target.click(timeout=budget(1500))
+            settle(page, replaces_ms=500)
             return True
 
     except Exception as e:
         print(f"[expand] Strategy 3 (DOM sibling) failed: {e}")
 
+    return False
+
+
+def _click_instrument_expandable(page):
+    """
+    Click the expand chevron at the far-right of the mini order panel header.
+    Codegen-recorded selector: page.locator('.chakra-button.css-qbgzru').click()
+    Whichever strategy worked last time is tried first.
+    """
+    expanded = get_selector_memory("tradelocker").attempt("instrument_expand", [
+        ("selectors", lambda: _expand_via_selectors(page)),
+        ("dom_sibling", lambda: _expand_via_dom_sibling(page)),
+    ])
+    if expanded:
+        return True
+
     print("[expand] WARNING: Could not click expand button. Order form may already be open.")
     return False
 
@@ -193,15 +146,15 @@ def _click_instrument_selector(page, symbol_text):
         ).all()
         
         for btn in candidates:
-            if btn.is_visible(timeout=500):
+            if btn.is_visible(timeout=budget(500)):
                 bb = btn.bounding_box()
                 if bb:
                     # The main order panel is almost always on the right half of the screen
                     viewport = page.viewport_size
                     if viewport and bb["x"] > (viewport["width"] * 0.4):
                         print(f"[instrument-selector] Found valid main panel button via Regex: bounds={bb}")
-                        btn.click(timeout=3000, force=True)
-                        page.wait_for_timeout(600)
+                        btn.click(timeout=budget(3000), force=True)
+                        settle(page, replaces_ms=600)
                         return True
     except Exception as e:
         print(f"[instrument-selector] Strategy 1 (Regex) failed: {e}")
@@ -210,7 +163,7 @@ def _click_instrument_selector(page, symbol_text):
     # The instrument selector is always sitting above the MARKET/LIMIT row in the order panel.
     try:
         market_btn = page.locator('button:has-text("MARKET"), button:has-text("LIMIT")').first
-        if market_btn.is_visible(timeout=2000):
+        if market_btn.is_visible(timeout=budget(2000)):
             # Go up 4-5 levels to the main order card container
             card = market_btn.locator("xpath=../../../..")
             
@@ -221,13 +174,13 @@ def _click_instrument_selector(page, symbol_text):
                 'button:has([class*="flag" i])',
                 'button:has([data-testid*="flag" i])',
                 'button:has([class*="currency" i])',
-            ], timeout=1000)
+            ], timeout=1000, optional=True)
             
             if selector_btn:
                 bb = selector_btn.bounding_box()
                 print(f"[instrument-selector] Found via Structural DOM (inside order card): bounds={bb}")
-                selector_btn.click(timeout=3000, force=True)
-                page.wait_for_timeout(600)
+                selector_btn.click(timeout=budget(3000), force=True)
+                settle(page, replaces_ms=600)
                 return True
     except Exception as e:
         print(f"[instrument-selector] Strategy 2 (Structural) failed: {e}")
@@ -242,13 +195,13 @@ def _click_instrument_selector(page, symbol_text):
         try:
             elements = page.locator(sel).all()
             for el in elements:
-                if el.is_visible(timeout=500):
+                if el.is_visible(timeout=budget(500)):
                     bb = el.bounding_box()
                     viewport = page.viewport_size
                     if bb and viewport and bb["x"] > (viewport["width"] * 0.4):
                         print(f"[instrument-selector] Fallback hit: sel='{sel}' bounds={bb}")
-                        el.click(timeout=2000, force=True)
-                        page.wait_for_timeout(600)
+                        el.click(timeout=budget(2000), force=True)
+                        settle(page, replaces_ms=600)
                         return True
         except Exception:
             continue
@@ -257,6 +210,7 @@ def _click_instrument_selector(page, symbol_text):
     return False
 
 
+@traced("select_symbol")
 def _search_and_select_symbol(page, symbol_text):
     """
     After the instrument search modal opens, type the symbol and click the result.
@@ -271,7 +225,17 @@ def _search_and_select_symbol(page, symbol_text):
         'input[placeholder*="symbol" i]',
         'input[placeholder*="instrument" i]',
         '[role="searchbox"]',
-    ], timeout=3000)
+    ], timeout=3000, element="symbol_search_input")
+
+    # Result rows matching the symbol, in order of preference.
+    result_selectors = [
+        f'button[name*="Currency Flag {symbol_text}"]',
+        f'button[aria-label*="{symbol_text}"]',
+        f'[role="option"]:has-text("{symbol_text}")',
+        f'[role="row"]:has-text("{symbol_text}")',
+        f'li:has-text("{symbol_text}")',
+        f'div[class*="option"]:has-text("{symbol_text}")',
+    ]
 
     if search_input:
         bb = search_input.bounding_box()
@@ -281,7 +245,7 @@ def _search_and_select_symbol(page, symbol_text):
         # FIX: The search input click is being intercepted by panels/sticky headers.
         # Use force=True to bypass Playwright's actionability checks, or just fill directly.
         try:
-            search_input.click(timeout=2000, force=True)
+            search_input.click(timeout=budget(2000), force=True)
             page.keyboard.press("Control+A")
             page.keyboard.press("Backspace")
             search_input.fill(symbol_text, force=True)
@@ -292,30 +256,21 @@ def _search_and_select_symbol(page, symbol_text):
             except Exception as e2:
                 print(f"[search] Direct fill also failed: {e2}")
 
-        # Explicitly wait up to 5 seconds for the search results to populate
-        page.wait_for_timeout(5000)
+        # Wait (up to the 5 seconds this used to sleep) for a matching result to render
+        wait_for_state(page.locator(", ".join(result_selectors)).first, "visible", replaces_ms=5000)
     else:
         print(f"[search] WARNING: No search input found after instrument selector click.")
 
     # Click the matching result row.
-    result_selectors = [
-        f'button[name*="Currency Flag {symbol_text}"]',
-        f'button[aria-label*="{symbol_text}"]',
-        f'[role="option"]:has-text("{symbol_text}")',
-        f'[role="row"]:has-text("{symbol_text}")',
-        f'li:has-text("{symbol_text}")',
-        f'div[class*="option"]:has-text("{symbol_text}")',
-    ]
-
     for selector in result_selectors:
         try:
             result = page.locator(selector).first
-            if result.is_visible(timeout=5000):
+            if result.is_visible(timeout=budget(5000)):
                 rbb = result.bounding_box()
                 print(f"[search] Result hit: sel='{selector}' bounds={rbb}")
                 # Force click on result too, in case sticky headers intercept
-                result.click(timeout=2000, force=True)
-                page.wait_for_timeout(400)
+                result.click(timeout=budget(2000), force=True)
+                settle(page, replaces_ms=400)
                 print(f"[search] Selected instrument: {symbol_text}")
                 return True
         except Exception:
@@ -324,7 +279,7 @@ def _search_and_select_symbol(page, symbol_text):
     # Last resort: press Enter.
     try:
         page.keyboard.press("Enter")
-        page.wait_for_timeout(300)
+        settle(page, replaces_ms=300)
         print(f"[search] Pressed Enter as last resort.")
         return True
     except Exception:
@@ -336,6 +291,7 @@ def _search_and_select_symbol(page, symbol_text):
 
 
 
+@traced("select_side")
 def _ensure_side_selected(page, side):
     """
     Click the Buy or Sell tab in the order form.
@@ -348,11 +304,11 @@ def _ensure_side_selected(page, side):
     # Primary: exact-text div filter (from codegen).
     try:
         btn = page.locator("div").filter(has_text=_re.compile(rf"^{side_name}$")).first
-        if btn.is_visible(timeout=4000):
+        if btn.is_visible(timeout=budget(4000)):
             bb = btn.bounding_box()
             print(f"[side] Clicking '{side_name}' div: bounds={bb}")
-            btn.click(timeout=2000)
-            page.wait_for_timeout(300)
+            btn.click(timeout=budget(2000))
+            settle(page, replaces_ms=300)
             return True
     except Exception as e:
         print(f"[side] div filter failed: {e}")
@@ -369,11 +325,11 @@ def _ensure_side_selected(page, side):
     for sel in fallbacks:
         try:
             el = page.locator(sel).first
-            if el.is_visible(timeout=1000):
+            if el.is_visible(timeout=budget(1000)):
                 bb = el.bounding_box()
                 print(f"[side] Fallback hit: sel='{sel}' bounds={bb}")
-                el.click(timeout=2000)
-                page.wait_for_timeout(300)
+                el.click(timeout=budget(2000))
+                settle(page, replaces_ms=300)
                 return True
         except Exception:
             continue
@@ -391,6 +347,7 @@ def _fill_first(page, selectors, value, field_name):
     return True
 
 
+@traced("set_amount")
 def _set_amount(page, value):
     """
     Set the order amount.
@@ -400,7 +357,7 @@ def _set_amount(page, value):
     try:
         # Codegen exact match pattern
         target = page.get_by_role("textbox", name=_re.compile(r"lots", _re.I)).first
-        if target.is_visible(timeout=3000):
+        if target.is_visible(timeout=budget(3000)):
             print(f"[amount] Found via get_by_role('textbox', name='lots')")
             clear_and_fill(target, page, value)
             print(f"Filled order amount: {value}")
@@ -421,6 +378,7 @@ def _set_amount(page, value):
     ], value, "order amount")
 
 
+@traced("toggle_and_fill")
 def _toggle_and_fill(page, label_text, value):
     """
     Turn on TP/SL if needed, then fill the P&L input (preferred).
@@ -433,21 +391,21 @@ def _toggle_and_fill(page, label_text, value):
     # 1. Click the toggle label if not already checked
     try:
         label_loc = page.locator("label").filter(has_text=_re.compile(rf"^{label_text}$")).first
-        if label_loc.is_visible(timeout=2000):
+        if label_loc.is_visible(timeout=budget(2000)):
             print(f"[{label_text}] Found toggle label via codegen filter")
             
             checkbox = label_loc.locator('input[type="checkbox"]').first
             is_checked = False
             try:
-                if checkbox.is_visible(timeout=500):
+                if checkbox.is_visible(timeout=budget(500)):
                     is_checked = checkbox.is_checked()
             except Exception:
                 pass
                 
             if not is_checked:
                 print(f"[{label_text}] Toggle is OFF, clicking to enable...")
-                label_loc.click(timeout=1500)
-                page.wait_for_timeout(400)
+                label_loc.click(timeout=budget(1500))
+                settle(page, replaces_ms=400)
             else:
                 print(f"[{label_text}] Toggle is already ON.")
                 
@@ -455,10 +413,10 @@ def _toggle_and_fill(page, label_text, value):
             toggle = first_visible(page, [
                 f'button:has-text("{label_text}")',
                 f'div[role="checkbox"]:has-text("{label_text}")',
-            ], timeout=1000)
+            ], timeout=1000, optional=True)
             if toggle:
-                toggle.click(timeout=1200)
-                page.wait_for_timeout(400)
+                toggle.click(timeout=budget(1200))
+                settle(page, replaces_ms=400)
     except Exception as e:
         print(f"[{label_text}] Toggle logic failed: {e}")
 
@@ -473,7 +431,7 @@ def _toggle_and_fill(page, label_text, value):
             _re.I,
         )
         target = page.get_by_role("textbox", name=pnl_name_rx).first
-        if target.is_visible(timeout=1200):
+        if target.is_visible(timeout=budget(1200)):
             print(f"[{label_text}] Found input via get_by_role('textbox', name=/{pnl_name_rx.pattern}/i)")
             clear_and_fill(target, page, value)
             print(f"Filled {label_text.lower()} (p&l): {value}")
@@ -487,7 +445,7 @@ def _toggle_and_fill(page, label_text, value):
         preferred_names = [f"{label_text} P&L", f"{label_text} P/L", f"{label_text} PL", f"{label_text} PNL"]
         for input_name in preferred_names:
             target = page.get_by_role("textbox", name=_re.compile(rf"^{_re.escape(input_name)}$", _re.I)).first
-            if target.is_visible(timeout=800):
+            if target.is_visible(timeout=budget(800)):
                 print(f"[{label_text}] Found input via get_by_role('textbox', name='{input_name}')")
                 clear_and_fill(target, page, value)
                 print(f"Filled {label_text.lower()} (p&l): {value}")
@@ -496,7 +454,7 @@ def _toggle_and_fill(page, label_text, value):
         # Backward-compatible fallback: older UI used a price textbox
         legacy_input_name = f"{label_text} price"
         target = page.get_by_role("textbox", name=_re.compile(rf"{legacy_input_name}", _re.I)).first
-        if target.is_visible(timeout=1200):
+        if target.is_visible(timeout=budget(1200)):
             print(f"[{label_text}] Found legacy input via get_by_role('textbox', name='{legacy_input_name}')")
             clear_and_fill(target, page, value)
             print(f"Filled {label_text.lower()} (price): {value}")
@@ -519,6 +477,7 @@ def _toggle_and_fill(page, label_text, value):
 # Main entry point
 # ---------------------------------------------------------------------------
 
+@traced("input_order")
 def input_order(page, purchase_type, order_amount, symbol, take_profit, stop_loss):
     try:
         if not symbol:
@@ -557,7 +516,7 @@ def input_order(page, purchase_type, order_amount, symbol, take_profit, stop_los
         amount_ok = _set_amount(page, order_amount)
         if not amount_ok:
             fallback = page.locator('input[type="text"]').first
-            if fallback.is_visible(timeout=1200):
+            if fallback.is_visible(timeout=budget(1200)):
                 clear_and_fill(fallback, page, order_amount)
             else:
                 return {"success": False, "reason": "Could not locate order amount input", "warning": None}
@@ -572,7 +531,7 @@ def input_order(page, purchase_type, order_amount, symbol, take_profit, stop_los
         warning_el = page.locator(
             ':text("market is closed"), :text("only pending"), :text("insufficient")'
         ).first
-        warning = get_text_if_visible(warning_el, timeout=1200)
+        warning = get_text_if_visible(warning_el)
 
         return {"success": True, "reason": None, "warning": warning}
 
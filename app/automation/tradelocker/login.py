@@ -1,53 +1,15 @@
-import random
 import os
 import re
-
-
-# ---------------------------------------------------------------------------
-# UI helpers (inlined – no _ui.py dependency)
-# ---------------------------------------------------------------------------
-
-def first_visible(page, selectors, timeout=3000):
-    """Return the first visible locator from candidate selectors."""
-    for selector in selectors:
-        try:
-            loc = page.locator(selector).first
-            if loc.is_visible(timeout=timeout):
-                return loc
-        except Exception:
-            continue
-    return None
-
-
-def click_first(page, selectors, timeout=3000, click_timeout=2000):
-    """Click the first visible element from selectors."""
-    target = first_visible(page, selectors, timeout=timeout)
-    if not target:
-        return False
-    try:
-        target.click(timeout=click_timeout)
-        return True
-    except Exception:
-        return False
-
-
-def clear_and_fill(locator, page, value):
-    """Clear an input and fill with value."""
-    locator.click(timeout=1500)
-    page.keyboard.press("Control+A")
-    page.keyboard.press("Backspace")
-    locator.fill(str(value))
+from app.automation.selector_engine import resolve
+from app.automation.toolkit import random_delay, first_visible, click_first, clear_and_fill, optional_timeout
+from app.helper.deadline import budget
+from app.automation.waits import settle
 
 
 # ---------------------------------------------------------------------------
 # Helpers
 # ---------------------------------------------------------------------------
 
-def random_delay(page, min_ms=800, max_ms=2500):
-    delay = random.randint(min_ms, max_ms)
-    page.wait_for_timeout(delay)
-
-
 def _handle_cookie_banner(page):
     """
     Handles TradeLocker cookie banner if present.
@@ -68,19 +30,22 @@ def _handle_cookie_banner(page):
         '[data-testid*="allow-all"]',
     ]
 
-    # Try preferred button first, then fallback to the other option.
+    # Preferred button first, then the other option; both are raced in one wait.
     preferred = allow_all if cookie_mode == "all" else allow_mandatory
     fallback = allow_mandatory if cookie_mode == "all" else allow_all
 
-    if click_first(page, preferred, timeout=2000, click_timeout=2000):
-        print(f"Cookie banner handled via mode='{cookie_mode}'.")
-        page.wait_for_timeout(300)
-        return
-
-    if click_first(page, fallback, timeout=1200, click_timeout=2000):
-        print("Cookie banner handled via fallback option.")
-        page.wait_for_timeout(300)
-        return
+    match = resolve(page, preferred + fallback, timeout=optional_timeout(2000))
+    if match:
+        try:
+            match.locator.click(timeout=budget(2000))
+            if match.index < len(preferred):
+                print(f"Cookie banner handled via mode='{cookie_mode}'.")
+            else:
+                print("Cookie banner handled via fallback option.")
+            settle(page, replaces_ms=300)
+            return
+        except Exception:
+            pass
 
     print("Cookie banner not detected or already dismissed.")
 
@@ -96,24 +61,24 @@ def _set_server(page, server):
         '[data-testid*="server"] input',
         'label:has-text("Server") + div input',
         'label:has-text("Server") ~ div input'
-    ], timeout=4000)
+    ], timeout=4000, element="login_server")
 
     if not server_input:
         return False
 
     clear_and_fill(server_input, page, server)
-    page.wait_for_timeout(400)
+    settle(page, replaces_ms=400)
 
     server_pick = first_visible(page, [
         f'text="{server}"',
         f':text-is("{server}")',
         f'[role="option"]:has-text("{server}")',
         f'[data-testid*="server"]:has-text("{server}")'
-    ], timeout=2000)
+    ], timeout=2000, optional=True)
 
     if server_pick:
         try:
-            server_pick.click(timeout=1500)
+            server_pick.click(timeout=budget(1500))
         except Exception:
             pass
 
@@ -121,7 +86,11 @@ def _set_server(page, server):
 
 
 def dismiss_post_login_overlays(page):
-    """Best-effort cleanup of TradeLocker overlays that can block automation."""
+    """
+    Best-effort cleanup of TradeLocker overlays that can block automation.
+    Runs before every operation and the overlays are usually absent, so it only
+    checks what is on screen instead of waiting for them.
+    """
     # Cookie/privacy consent modal inside authenticated workspace.
     if click_first(page, [
         'button:has-text("Accept")',
@@ -131,9 +100,9 @@ def dismiss_post_login_overlays(page):
         'button:has-text("Allow all")',
         '[role="dialog"] button:has-text("Accept")',
         '[aria-modal="true"] button:has-text("Accept")',
-    ], timeout=1600, click_timeout=1800):
+    ], timeout=0, click_timeout=1800):
         print("Closed cookie/privacy overlay.")
-        page.wait_for_timeout(300)
+        settle(page, replaces_ms=300)
 
     # Product update modal (e.g., "What's new").
     for _ in range(3):
@@ -144,16 +113,16 @@ def dismiss_post_login_overlays(page):
             '[role="dialog"] button[class*="close" i]',
             '[role="dialog"] [data-testid*="close" i]',
             '[aria-modal="true"] [data-testid*="close" i]',
-        ], timeout=1200, click_timeout=1500)
+        ], timeout=0, click_timeout=1500)
 
         if closed:
             print("Closed post-login update overlay.")
-            page.wait_for_timeout(250)
+            settle(page, replaces_ms=250)
             continue
 
         try:
             page.keyboard.press("Escape")
-            page.wait_for_timeout(180)
+            settle(page, replaces_ms=180)
         except Exception:
             pass
         break
@@ -176,7 +145,7 @@ def login(page, username, password, server=None):
         'button:has-text("Sign in")',
         'a:has-text("Log in")',
         'a:has-text("Sign in")'
-    ], timeout=4000)
+    ], timeout=4000, optional=True)
 
     user_input = first_visible(page, [
         '#email',
@@ -185,7 +154,7 @@ def login(page, username, password, server=None):
         'input[name="username"]',
         'input[placeholder*="email" i]',
         'input[placeholder*="username" i]'
-    ], timeout=12000)
+    ], timeout=12000, element="login_username")
 
     if not user_input:
         return {"success": False, "reason": "Could not find TradeLocker username/email input", "warning": None}
@@ -199,7 +168,7 @@ def login(page, username, password, server=None):
         'input[type="password"]',
         'input[name="password"]',
         'input[placeholder*="password" i]'
-    ], timeout=8000)
+    ], timeout=8000, element="login_password")
 
     if not pass_input:
         return {"success": False, "reason": "Could not find TradeLocker password input", "warning": None}
@@ -226,11 +195,11 @@ def login(page, username, password, server=None):
         'input[id*="login" i]',
         'input[name*="login" i]',
         '[data-testid*="login" i]'
-    ], timeout=6000)
+    ], timeout=6000, element="login_submit")
 
     if submit:
         try:
-            submit.click(timeout=5000)
+            submit.click(timeout=budget(5000))
             submitted = True
         except Exception:
             submitted = False
@@ -238,14 +207,14 @@ def login(page, username, password, server=None):
     if not submitted:
         try:
             role_submit = page.get_by_role("button", name=re.compile(r"^(log\s*in|sign\s*in)$", re.I)).first
-            role_submit.click(timeout=3000)
+            role_submit.click(timeout=budget(3000))
             submitted = True
         except Exception:
             submitted = False
 
     if not submitted:
         try:
-            pass_input.press("Enter", timeout=2000)
+            pass_input.press("Enter", timeout=budget(2000))
             submitted = True
         except Exception:
             submitted = False
@@ -256,7 +225,7 @@ def login(page, username, password, server=None):
     try:
         page.wait_for_selector(
             ':text("Positions"), :text("Orders"), :text("Portfolio"), :text("Account"), [data-testid*="positions"]',
-            timeout=20000
+            timeout=budget(20000)
         )
         dismiss_post_login_overlays(page)
         return {"success": True, "reason": None, "warning": None}
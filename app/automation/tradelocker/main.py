@@ -3,7 +3,14 @@ import json
 import os
 import threading
 from pathlib import Path
+from app.helper.metrics import BROWSER_CONTEXTS
+from app.helper.tracing import trace_step, traced
+from app.automation.toolkit import driver_platform
+from app.automation.waits import settle, wait_for_endpoint_idle
+from app.automation.account_cache import forget_verified_account
+from app.helper.humanization import with_humanization
 from app.automation.tradelocker.login import dismiss_post_login_overlays
+from app.helper.deadline import budget, with_deadline, apply_default_timeout, PLAYWRIGHT_DEFAULT_TIMEOUT_MS
 
 # --- Module Imports ---
 check_user_module = importlib.import_module("app.automation.tradelocker.check-user")
@@ -30,6 +37,11 @@ _user_contexts = {}
 _user_pages = {}
 _lock = threading.Lock()
 
+BROWSER_CONTEXTS.set_function(lambda: len(_user_contexts), platform="tradelocker")
+
+# TradeLocker's REST API; a fresh workspace has loaded its data once calls to it go quiet
+API_URL_PATTERN = os.getenv("TRADELOCKER_API_PATTERN", r"/backend-api/")
+
 
 def get_playwright():
     """Starts the playwright instance if not already started."""
@@ -160,16 +172,16 @@ def ensure_tradelocker_loaded(page, url: str):
     print(f"Navigating to {url}...")
 
     try:
-        page.goto(url, wait_until="domcontentloaded", timeout=60000)
-        readiness.first.wait_for(state="visible", timeout=45000)
+        page.goto(url, wait_until="domcontentloaded", timeout=budget(60000))
+        readiness.first.wait_for(state="visible", timeout=budget(45000))
         print("TradeLocker UI loaded on first try.")
         return True
     except Exception:
         print("Initial load failed. Trying API reload...")
 
     try:
-        page.reload(wait_until="domcontentloaded", timeout=45000)
-        readiness.first.wait_for(state="visible", timeout=30000)
+        page.reload(wait_until="domcontentloaded", timeout=budget(45000))
+        readiness.first.wait_for(state="visible", timeout=budget(30000))
         print("TradeLocker UI loaded after API reload.")
         return True
     except Exception:
@@ -177,9 +189,9 @@ def ensure_tradelocker_loaded(page, url: str):
 
     try:
         page.mouse.click(10, 10)
-        page.wait_for_timeout(500)
+        page.wait_for_timeout(budget(500))
         page.keyboard.press("Control+Shift+R")
-        readiness.first.wait_for(state="visible", timeout=40000)
+        readiness.first.wait_for(state="visible", timeout=budget(40000))
         print("TradeLocker UI loaded after hard refresh.")
         return True
     except Exception as e:
@@ -187,6 +199,7 @@ def ensure_tradelocker_loaded(page, url: str):
         return False
 
 
+@traced("login_check")
 def is_tradelocker_logged_in(page) -> bool:
     """Best-effort check that user is on authenticated TradeLocker workspace."""
     try:
@@ -194,7 +207,7 @@ def is_tradelocker_logged_in(page) -> bool:
         workspace = page.locator(
             ':text("Positions"), :text("Orders"), :text("Account"), [data-testid*="positions"], [data-testid*="orders"]'
         ).first
-        if workspace.is_visible(timeout=1500):
+        if workspace.is_visible(timeout=budget(1500)):
             return True
     except Exception:
         pass
@@ -202,7 +215,7 @@ def is_tradelocker_logged_in(page) -> bool:
     # If auth form is visible, we are definitely not logged in yet.
     try:
         auth_field = page.locator('#email, #password, #server').first
-        if auth_field.is_visible(timeout=800):
+        if auth_field.is_visible(timeout=budget(800)):
             return False
     except Exception:
         pass
@@ -226,11 +239,11 @@ def ensure_positions_tab(page):
     for selector in tab_selectors:
         try:
             tab = page.locator(selector).first
-            if not tab.is_visible(timeout=900):
+            if not tab.is_visible(timeout=budget(900)):
                 continue
 
-            tab.click(timeout=1500)
-            page.wait_for_timeout(200)
+            tab.click(timeout=budget(1500))
+            settle(page, replaces_ms=200)
             print("Ensured TradeLocker is on Positions tab.")
             return True
         except Exception:
@@ -239,6 +252,9 @@ def ensure_positions_tab(page):
     return False
 
 
+@with_deadline
+@with_humanization
+@driver_platform("tradelocker")
 def run(
     username: str,
     operation: str,
@@ -256,7 +272,8 @@ def run(
 
     with _lock:
         try:
-            context = get_user_context(username)
+            with trace_step("tradelocker", "context"):
+                context = get_user_context(username)
             page = _user_pages.get(username)
 
             if page and page.is_closed():
@@ -291,6 +308,8 @@ def run(
                 else:
                     raise e
 
+            # Waits that don't pass a timeout get Playwright's default, clamped to the budget
+            apply_default_timeout(page)
             maximize_browser_window(page)
 
             current_url = page.url or ""
@@ -300,7 +319,9 @@ def run(
             if "tradelocker" not in current_url.lower() or "auth.tradelocker.com" in current_url.lower():
                 if "auth.tradelocker.com" in current_url.lower():
                     print(f"Stuck on auth page for {username}. Navigating to trade URL...")
-                if not ensure_tradelocker_loaded(page, platform_url):
+                with trace_step("tradelocker", "load"):
+                    loaded = ensure_tradelocker_loaded(page, platform_url)
+                if not loaded:
                     raise Exception("TradeLocker failed to load properly after multiple attempts.")
             else:
                 print(f"Already on TradeLocker for {username}. Reusing current page state.")
@@ -331,7 +352,9 @@ def run(
                         "reason": "TradeLocker already logged in",
                     }
 
-                login_result = login_flow(page, username, password, server)
+                forget_verified_account(page)
+                with trace_step("tradelocker", "login"):
+                    login_result = login_flow(page, username, password, server)
                 if isinstance(login_result, dict) and not login_result.get("success", False):
                     return {
                         "status": "failed",
@@ -350,7 +373,7 @@ def run(
                         "warning": login_result.get("warning"),
                     }
 
-                page.wait_for_timeout(1500)
+                wait_for_endpoint_idle(page, API_URL_PATTERN, replaces_ms=1500)
                 if not is_tradelocker_logged_in(page):
                     return {
                         "status": "failed",
@@ -391,7 +414,9 @@ def run(
             if not is_tradelocker_logged_in(page):
                 print("Not logged in. Starting TradeLocker login flow...")
                 from app.automation.tradelocker.login import login as login_flow
-                login_result = login_flow(page, username, password, server)
+                forget_verified_account(page)
+                with trace_step("tradelocker", "login"):
+                    login_result = login_flow(page, username, password, server)
                 if isinstance(login_result, dict) and not login_result.get("success", False):
                     return {
                         "status": "failed",
@@ -410,7 +435,7 @@ def run(
                         "warning": login_result.get("warning"),
                     }
 
-                page.wait_for_load_state("networkidle")
+                page.wait_for_load_state("networkidle", timeout=budget(PLAYWRIGHT_DEFAULT_TIMEOUT_MS))
                 print("TradeLocker login flow completed.")
             else:
                 print("Already authenticated. Skipping login.")
@@ -419,42 +444,46 @@ def run(
             dismiss_post_login_overlays(page)
             ensure_positions_tab(page)
 
-            check_user(page, username, account_id)
+            apply_default_timeout(page)
+            with trace_step("tradelocker", "check_user"):
+                check_user(page, username, account_id)
 
             result = None
-            match operation:
-                case "place-order":
-                    result = place_order_click(page)
-                case "auto-place-and-terminate" | "default" | "1":
-                    print(f"Operation: auto-place-and-terminate (Default). Placing order then monitoring {symbol}...")
-                    place_result = full_place_order(page, purchase_type, order_amount, symbol, take_profit, stop_loss)
-                    is_success = place_result.get("success", False) if isinstance(place_result, dict) else bool(place_result)
+            apply_default_timeout(page)
+            with trace_step("tradelocker", operation):
+                match operation:
+                    case "place-order":
+                        result = place_order_click(page)
+                    case "auto-place-and-terminate" | "default" | "1":
+                        print(f"Operation: auto-place-and-terminate (Default). Placing order then monitoring {symbol}...")
+                        place_result = full_place_order(page, purchase_type, order_amount, symbol, take_profit, stop_loss)
+                        is_success = place_result.get("success", False) if isinstance(place_result, dict) else bool(place_result)
                     
-                    if is_success:
-                        print("Order placed successfully! Handing over to trade-terminator...")
-                        result = terminate_trade(page, symbol, account_id, db_account_id)
-                    else:
-                        print("Order placement failed, skipping terminator.")
-                        result = place_result
-                case "place-and-terminate":
-                    print(f"Operation: place-and-terminate. Clicking Place Order then monitoring {symbol}...")
-                    place_result = place_order_click(page)
-                    is_success = place_result.get("success", False) if isinstance(place_result, dict) else bool(place_result)
+                        if is_success:
+                            print("Order placed successfully! Handing over to trade-terminator...")
+                            result = terminate_trade(page, symbol, account_id, db_account_id)
+                        else:
+                            print("Order placement failed, skipping terminator.")
+                            result = place_result
+                    case "place-and-terminate":
+                        print(f"Operation: place-and-terminate. Clicking Place Order then monitoring {symbol}...")
+                        place_result = place_order_click(page)
+                        is_success = place_result.get("success", False) if isinstance(place_result, dict) else bool(place_result)
                     
-                    if is_success:
-                        print("Order placed successfully! Handing over to trade-terminator...")
+                        if is_success:
+                            print("Order placed successfully! Handing over to trade-terminator...")
+                            result = terminate_trade(page, symbol, account_id, db_account_id)
+                        else:
+                            print("Order placement failed, skipping terminator.")
+                            result = place_result
+                    case "edit-place-order":
+                        result = edit_place_order(page, purchase_type, order_amount, symbol, take_profit, stop_loss)
+                    case "input-order":
+                        result = input_order(page, purchase_type, order_amount, symbol, take_profit, stop_loss)
+                    case "trade-terminator":
                         result = terminate_trade(page, symbol, account_id, db_account_id)
-                    else:
-                        print("Order placement failed, skipping terminator.")
-                        result = place_result
-                case "edit-place-order":
-                    result = edit_place_order(page, purchase_type, order_amount, symbol, take_profit, stop_loss)
-                case "input-order":
-                    result = input_order(page, purchase_type, order_amount, symbol, take_profit, stop_loss)
-                case "trade-terminator":
-                    result = terminate_trade(page, symbol, account_id, db_account_id)
-                case "close-position":
-                    result = close_position(page, symbol)
+                    case "close-position":
+                        result = close_position(page, symbol)
 
             if isinstance(result, bool):
                 success = result
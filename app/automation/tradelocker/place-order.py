@@ -1,45 +1,19 @@
 import importlib
-import random
+from app.helper.tracing import traced
+from app.automation.toolkit import random_delay, first_visible, get_text_if_visible
+from app.helper.deadline import budget
 
 
-# ---------------------------------------------------------------------------
-# UI helpers (inlined – no _ui.py dependency)
-# ---------------------------------------------------------------------------
-
-def first_visible(page, selectors, timeout=3000):
-    """Return the first visible locator from candidate selectors."""
-    for selector in selectors:
-        try:
-            loc = page.locator(selector).first
-            if loc.is_visible(timeout=timeout):
-                return loc
-        except Exception:
-            continue
-    return None
-
-
-def get_text_if_visible(locator, timeout=1000):
-    try:
-        if locator.is_visible(timeout=timeout):
-            return (locator.inner_text() or "").strip()
-    except Exception:
-        pass
-    return None
-
 input_order_module = importlib.import_module("app.automation.tradelocker.input-order")
 input_order = input_order_module.input_order
 
 
-def random_delay(page, min_ms=500, max_ms=1500):
-    delay = random.randint(min_ms, max_ms)
-    page.wait_for_timeout(delay)
-
-
+@traced("place_order")
 def place_order(page):
     print("------- ENTERING place_order (submit) -------")
     try:
         warning_el = page.locator(':text("market is closed"), :text("only pending"), :text("insufficient")').first
-        warning_text = get_text_if_visible(warning_el, timeout=1200)
+        warning_text = get_text_if_visible(warning_el)
         if warning_text:
             print(f"[submit-debug] Found warning text on page: {warning_text}")
 
@@ -53,7 +27,7 @@ def place_order(page):
             btn_pattern = _re.compile(r"(SELL|BUY).+@", _re.I)
             print(f"[submit-debug] Trying Strategy 1: get_by_role Regex '{btn_pattern.pattern}'")
             btn = page.get_by_role("button", name=btn_pattern).first
-            if btn.is_visible(timeout=3000):
+            if btn.is_visible(timeout=budget(3000)):
                 text = (btn.inner_text() or "").strip().replace('\n', ' ')
                 print(f"[submit-debug] get_by_role matched: '{text}'")
                 execute_button = btn
@@ -70,7 +44,7 @@ def place_order(page):
                 btn = page.locator('button:not([role="tab"])').filter(
                     has_text=_re.compile(r"(BUY|SELL)\s+[\d\.]+", _re.I)
                 ).first
-                if btn.is_visible(timeout=2000):
+                if btn.is_visible(timeout=budget(2000)):
                     bb = btn.bounding_box()
                     text = (btn.inner_text() or "").strip().replace('\n', ' ')
                     print(f"[submit-debug] filter matched: text='{text}' bounds={bb}")
@@ -91,7 +65,7 @@ def place_order(page):
                 'button:has-text("Submit")',
                 '[data-testid*="place-order"]',
             ]
-            execute_button = first_visible(page, candidates, timeout=1000)
+            execute_button = first_visible(page, candidates, timeout=1000, optional=True)
 
         if not execute_button:
             print("[submit-debug] FATAL: Could not find TradeLocker place/submit order action")
@@ -122,7 +96,7 @@ def place_order(page):
             return {"success": False, "reason": warning_text or "Place order button is disabled", "warning": warning_text}
 
         print("[submit-debug] CLICKING Execute Button now...")
-        execute_button.click(timeout=5000, force=True)
+        execute_button.click(timeout=budget(5000), force=True)
         print("[submit-debug] Click successful. Waiting for random delay...")
         random_delay(page, 600, 1400)
         
@@ -134,6 +108,7 @@ def place_order(page):
         return {"success": False, "reason": str(e), "warning": None}
 
 
+@traced("full_place_order")
 def full_place_order(page, purchase_type, order_amount, symbol, take_profit, stop_loss):
     print("======= ENTERING full_place_order =======")
     fill_result = input_order(page, purchase_type, order_amount, symbol, take_profit, stop_loss)
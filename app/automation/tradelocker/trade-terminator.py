@@ -3,6 +3,10 @@ import re
 import time
 import importlib
 from app.core.supabase import get_supabase
+from app.helper.metrics import TERMINATOR_TICK_SECONDS
+from app.helper.tracing import traced
+from app.helper.deadline import budget, unbounded, apply_default_timeout
+from app.helper.humanization import use_profile
 
 close_position_module = importlib.import_module("app.automation.tradelocker.close-position")
 close_position = close_position_module.close_position
@@ -54,7 +58,7 @@ def _position_row_exists(page, symbol: str) -> bool:
         ).first
         row = None
         try:
-            if positions_panel.is_visible(timeout=600):
+            if positions_panel.is_visible(timeout=budget(600)):
                 row = positions_panel.locator(
                     f'tr:has-text("{symbol_text}"), div[role="row"]:has-text("{symbol_text}"), div:has-text("{symbol_text}")'
                 ).first
@@ -66,7 +70,7 @@ def _position_row_exists(page, symbol: str) -> bool:
                 f'tr:has-text("{symbol_text}"), div[role="row"]:has-text("{symbol_text}"), div:has-text("{symbol_text}")'
             ).first
 
-        return row.is_visible(timeout=800)
+        return row.is_visible(timeout=budget(800))
     except Exception:
         return False
 
@@ -157,7 +161,7 @@ def _get_balance_locator(page):
     ]
     for loc in locators:
         try:
-            if loc.is_visible(timeout=800):
+            if loc.is_visible(timeout=budget(800)):
                 text = loc.inner_text()
                 if _parse_balance(text) > 0:
                     return loc
@@ -169,19 +173,23 @@ def _get_balance_locator(page):
 def _refresh_workspace(page):
     try:
         refresh = page.locator('button:has-text("Refresh"), [data-testid*="refresh" i]').first
-        if refresh.is_visible(timeout=600):
-            refresh.click(timeout=1000)
-            page.wait_for_timeout(200)
+        if refresh.is_visible(timeout=budget(600)):
+            refresh.click(timeout=budget(1000))
+            page.wait_for_timeout(budget(200))
             return
     except Exception:
         pass
 
 
+@traced("terminate_trade")
+@unbounded
 def terminate_trade(page, symbol: str, account_id: str = None, db_account_id: str = None):
     if not symbol:
         return {"success": False, "reason": "symbol is required for trade-terminator", "warning": None}
 
     print(f"\n👀 Monitoring started for {symbol} on account {account_id} / DB {db_account_id}...")
+    # Monitoring is open-ended: restore the full default timeout the operation budget had clamped
+    apply_default_timeout(page)
 
     timeout_seconds = int(os.getenv("TRADELOCKER_TERMINATOR_TIMEOUT_SEC", "3600"))
     start_ts = time.time()
@@ -269,7 +277,12 @@ def terminate_trade(page, symbol: str, account_id: str = None, db_account_id: st
         final_balance = None
         loop_i = 0
         
+        last_tick = None
         while True:
+            # Record how long the previous polling iteration took end to end
+            if last_tick is not None:
+                TERMINATOR_TICK_SECONDS.observe(time.perf_counter() - last_tick, platform="tradelocker")
+            last_tick = time.perf_counter()
             loop_i += 1
             if time.time() - start_ts > timeout_seconds:
                 return {
@@ -279,7 +292,7 @@ def terminate_trade(page, symbol: str, account_id: str = None, db_account_id: st
                 }
 
             _refresh_workspace(page)
-            page.wait_for_timeout(300)
+            page.wait_for_timeout(budget(300))
 
             # --- Try to attach to pairing if we didn't find it yet ---
             if (not paired_record_id) and db_account_id and (loop_i % 8 == 0):  # ~ every 2.4s
@@ -306,14 +319,16 @@ def terminate_trade(page, symbol: str, account_id: str = None, db_account_id: st
                             print(f"\n📡 [{role}] RECEIVED exit signal '{db_signal}' from partner (triggered by {trigger})")
                             print(f"🤖 [{role}] This device is closing position via AUTOMATION (partner triggered)")
                             print("🔪 Executing 'close-position' to terminate paired trade...")
-                            close_result = close_position(page, symbol)
+                            # Partner close is latency-critical: no artificial pauses or mouse paths
+                            with use_profile("off"):
+                                close_result = close_position(page, symbol)
                             
                             # Wait for balance to update after closing, then read it
                             final_balance_received = None
                             try:
                                 print(f"⏳ Waiting for balance to update from {initial_balance}...")
                                 for attempt in range(50):  # 50 x 300ms = 15 seconds max
-                                    page.wait_for_timeout(300)
+                                    page.wait_for_timeout(budget(300))
                                     final_text = balance_locator.inner_text()
                                     final_balance_received = _parse_balance(final_text)
                                     if final_balance_received != initial_balance and final_balance_received > 0:
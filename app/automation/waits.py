@@ -0,0 +1,186 @@
+import re
+import time
+from typing import Optional, Pattern, Union
+from app.helper.metrics import UI_WAIT_SECONDS, UI_WAIT_SAVED_SECONDS
+from app.helper.tracing import current_span
+from app.helper.deadline import budget
+from app.automation.toolkit import current_platform
+
+# Condition-based replacements for the fixed sleeps that only let the UI settle.
+# Each wait takes the sleep it replaces (`replaces_ms`) as its cap, so it is
+# never slower than the sleep was, and credits the time it did not need to the
+# current step. A wait whose condition is not met by the cap just returns False,
+# as the sleep would have carried on regardless.
+
+# How long the DOM (or an endpoint) must stay quiet to count as settled
+QUIET_MS = 150
+ENDPOINT_QUIET_MS = 300
+# Poll interval while watching an endpoint; requests are only seen between Playwright calls
+ENDPOINT_POLL_MS = 50
+
+_DOM_QUIET_JS = """
+([selector, quietMs, timeoutMs]) => new Promise((resolve) => {
+    const root = selector ? document.querySelector(selector) : document.body;
+    if (!root) return resolve(true);
+    let quietTimer, capTimer;
+    const observer = new MutationObserver(() => {
+        clearTimeout(quietTimer);
+        quietTimer = setTimeout(() => done(true), quietMs);
+    });
+    const done = (quiet) => {
+        observer.disconnect();
+        clearTimeout(quietTimer);
+        clearTimeout(capTimer);
+        resolve(quiet);
+    };
+    observer.observe(root, {childList: true, subtree: true, attributes: true, characterData: true});
+    quietTimer = setTimeout(() => done(true), quietMs);
+    capTimer = setTimeout(() => done(false), timeoutMs);
+})
+"""
+
+# Collected after two frames, so a transition the triggering click or key press
+# is about to start has started. Infinite animations (spinners, pulsing badges)
+# never finish, so only finite running ones are awaited.
+_ANIMATIONS_END_JS = """
+async ([selector, timeoutMs]) => {
+    await new Promise((resolve) => requestAnimationFrame(() => requestAnimationFrame(resolve)));
+    const root = selector ? document.querySelector(selector) : document;
+    if (!root) return true;
+    const animations = (root === document ? document.getAnimations() : root.getAnimations({subtree: true}))
+        .filter((a) => a.playState === 'running' && a.effect && isFinite(a.effect.getComputedTiming().endTime));
+    if (!animations.length) return true;
+    return Promise.race([
+        Promise.all(animations.map((a) => a.finished.catch(() => null))).then(() => true),
+        new Promise((resolve) => setTimeout(() => resolve(false), timeoutMs)),
+    ]);
+}
+"""
+
+
+def _record(condition: str, started: float, met: bool, replaces_ms: Optional[float]):
+    elapsed = time.perf_counter() - started
+    platform = current_platform() or ""
+    UI_WAIT_SECONDS.observe(elapsed, platform=platform, condition=condition, outcome="met" if met else "timeout")
+    if not replaces_ms:
+        return
+    saved = max(0.0, replaces_ms / 1000 - elapsed)
+    step = current_span()
+    UI_WAIT_SAVED_SECONDS.inc(saved, platform=platform, step=step.name if step else "unknown")
+    if step:
+        step.attributes["wait_saved_ms"] = round(step.attributes.get("wait_saved_ms", 0) + saved * 1000, 1)
+
+
+def _cap(replaces_ms: Optional[float], timeout_ms: Optional[float]) -> float:
+    return budget(timeout_ms if timeout_ms is not None else replaces_ms)
+
+
+def wait_for_state(locator, state: str = "visible", replaces_ms: float = None, timeout_ms: float = None) -> bool:
+    """
+    Waits for an element to reach `state` (visible, hidden, attached, detached).
+    Returns whether it did before the cap (`timeout_ms`, else `replaces_ms`).
+    """
+    started = time.perf_counter()
+    try:
+        locator.wait_for(state=state, timeout=_cap(replaces_ms, timeout_ms))
+        met = True
+    except Exception:
+        met = False
+    _record(f"element_{state}", started, met, replaces_ms)
+    return met
+
+
+def wait_for_dom_quiet(page, replaces_ms: float = None, timeout_ms: float = None,
+                       selector: str = None, quiet_ms: int = QUIET_MS) -> bool:
+    """
+    Waits until nothing under `selector` (default: the whole body) has changed
+    for `quiet_ms`, e.g. a panel that finished re-rendering after a click.
+    Scope it to that panel: streaming prices keep the rest of the page busy.
+    """
+    started = time.perf_counter()
+    cap = _cap(replaces_ms, timeout_ms)
+    try:
+        met = bool(page.evaluate(_DOM_QUIET_JS, [selector, quiet_ms, cap]))
+    except Exception:
+        met = False
+    _record("dom_quiet", started, met, replaces_ms)
+    return met
+
+
+def wait_for_animations(page, replaces_ms: float = None, timeout_ms: float = None, selector: str = None) -> bool:
+    """Waits for the CSS transitions/animations running under `selector` (default: the document) to end."""
+    started = time.perf_counter()
+    cap = _cap(replaces_ms, timeout_ms)
+    try:
+        met = bool(page.evaluate(_ANIMATIONS_END_JS, [selector, cap]))
+    except Exception:
+        met = False
+    _record("animation_end", started, met, replaces_ms)
+    return met
+
+
+def wait_for_endpoint_idle(page, url_pattern: Union[str, Pattern], replaces_ms: float = None,
+                           timeout_ms: float = None, quiet_ms: int = ENDPOINT_QUIET_MS) -> bool:
+    """
+    Waits until no request whose URL matches `url_pattern` has been in flight
+    for `quiet_ms`. Unlike the "networkidle" load state it ignores unrelated
+    traffic (analytics, websockets, chart feeds). Requests that started before
+    the call are not seen, so call it right after the action that triggers them.
+    """
+    pattern = re.compile(url_pattern) if isinstance(url_pattern, str) else url_pattern
+    started = time.perf_counter()
+    cap_seconds = _cap(replaces_ms, timeout_ms) / 1000
+    in_flight = set()
+    last_activity = [started]
+
+    def on_request(request):
+        if pattern.search(request.url):
+            in_flight.add(request)
+            last_activity[0] = time.perf_counter()
+
+    def on_done(request):
+        if request in in_flight:
+            in_flight.discard(request)
+            last_activity[0] = time.perf_counter()
+
+    page.on("request", on_request)
+    page.on("requestfinished", on_done)
+    page.on("requestfailed", on_done)
+    met = False
+    try:
+        while True:
+            now = time.perf_counter()
+            if not in_flight and now - last_activity[0] >= quiet_ms / 1000:
+                met = True
+                break
+            remaining = cap_seconds - (now - started)
+            if remaining <= 0:
+                break
+            page.wait_for_timeout(min(ENDPOINT_POLL_MS, remaining * 1000))
+    except Exception:
+        met = False
+    finally:
+        for event, handler in (("request", on_request), ("requestfinished", on_done), ("requestfailed", on_done)):
+            page.remove_listener(event, handler)
+    _record("endpoint_idle", started, met, replaces_ms)
+    return met
+
+
+def settle(page, replaces_ms: float, selector: str = None) -> bool:
+    """
+    The usual replacement for a post-click sleep: running animations end and,
+    when `selector` names the panel that changed, that panel's DOM goes quiet.
+    Both share the one `replaces_ms` cap. The whole page is never required to
+    be quiet, since live quotes keep mutating it.
+    """
+    started = time.perf_counter()
+    cap = _cap(replaces_ms, None)
+    try:
+        met = bool(page.evaluate(_ANIMATIONS_END_JS, [selector, cap]))
+        remaining = cap - (time.perf_counter() - started) * 1000
+        if met and selector:
+            met = remaining > 0 and bool(page.evaluate(_DOM_QUIET_JS, [selector, min(QUIET_MS, remaining), remaining]))
+    except Exception:
+        met = False
+    _record("settle", started, met, replaces_ms)
+    return met
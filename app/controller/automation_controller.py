@@ -1,18 +1,30 @@
 from datetime import datetime
-from typing import Optional, List, Dict, Any
+from typing import Optional, List, Dict, Any, Tuple
 from pydantic import BaseModel
+import asyncio
+import base64
+import json
 import os
-import re
 import aiofiles
 from dotenv import load_dotenv
 from fastapi import UploadFile, HTTPException
+from postgrest.exceptions import APIError
 from app.core.supabase import get_supabase
-from app.helper.uipath import run_uipath_automation
+from app.helper.executors import run_in, db_execute
+from app.helper.uipath import run_uipath_automation, stream_uipath_automation
+from app.helper.run_log import RunLog, create_run_log
+from app.helper.version import package_version
+from app.helper.package_store import get_package_store, discard
+from app.helper.storage_upload import upload_package, StorageUploadError
+from app.helper.package_sync import ensure_local_package, get_sync_status
+from app.helper.package_cache import prepare_package, validate_package, PackageValidationError
+from app.helper.automation_index import latest_automation, index_automation, is_missing_sha256_column
 
 # --- Pydantic Models based on Supabase table ---
 class AutomationBase(BaseModel):
     file_name: Optional[str] = None
     version: Optional[str] = None
+    sha256: Optional[str] = None
 
 class AutomationCreate(AutomationBase):
     pass
@@ -32,6 +44,8 @@ class RunResponse(BaseModel):
     stdout: Optional[str] = None
     stderr: Optional[str] = None
     exit_code: Optional[int] = None
+    log_file: Optional[str] = None
+    job_id: Optional[str] = None
 
 class ExecutionHistory(BaseModel):
     id: int
@@ -45,11 +59,67 @@ class ExecutionHistory(BaseModel):
     exit_code: Optional[int] = None
     message: Optional[str] = None
 
+class ExecutionOutput(BaseModel):
+    id: int
+    stdout: Optional[str] = None
+    stderr: Optional[str] = None
+
+# --- Execution History Paging ---
+# Large output blobs are left out of history pages unless explicitly requested.
+HISTORY_SUMMARY_COLUMNS = "id, created_at, automation_id, automation_name, input, status, exit_code, message"
+HISTORY_DEFAULT_LIMIT = 50
+HISTORY_MAX_LIMIT = 200
+# Streamed runs persist only this many trailing characters of each output stream
+HISTORY_OUTPUT_TAIL_CHARS = int(os.getenv("HISTORY_OUTPUT_TAIL_CHARS", "8000"))
+
+def encode_history_cursor(row: Dict[str, Any]) -> str:
+    """Encodes the (created_at, id) keyset position of a history row as an opaque cursor."""
+    payload = json.dumps({"created_at": row["created_at"], "id": row["id"]})
+    return base64.urlsafe_b64encode(payload.encode("utf-8")).decode("ascii")
+
+def decode_history_cursor(cursor: str) -> Tuple[str, int]:
+    """Decodes a cursor produced by encode_history_cursor."""
+    try:
+        payload = json.loads(base64.urlsafe_b64decode(cursor.encode("ascii")))
+        return str(payload["created_at"]), int(payload["id"])
+    except Exception:
+        raise HTTPException(status_code=400, detail="Invalid history cursor")
+
+# --- Content Hash Column ---
+# automations.sha256 is added by migrations/001_automations_sha256.sql. Until a
+# database has it, uploads fall back to the name-based path and store no hash.
+_sha256_column: Optional[bool] = None
+
+def _is_unique_violation(error: APIError) -> bool:
+    return error.code == "23505"
+
+def _note_missing_sha256_column():
+    global _sha256_column
+    if _sha256_column is not False:
+        print("automations.sha256 is missing; apply migrations/001_automations_sha256.sql. Only this unit's package index deduplicates uploads until then.")
+    _sha256_column = False
+
+async def _find_automation_by_sha256(sha256: str) -> Optional[Dict[str, Any]]:
+    """Returns the automations row with these bytes, or None (also when the column is missing)."""
+    global _sha256_column
+    if _sha256_column is False:
+        return None
+    supabase = get_supabase()
+    try:
+        response = await db_execute(supabase.table("automations").select("*").eq("sha256", sha256).limit(1))
+    except APIError as e:
+        if not is_missing_sha256_column(e):
+            raise
+        _note_missing_sha256_column()
+        return None
+    _sha256_column = True
+    return response.data[0] if response.data else None
+
 # --- Controller Functions ---
 
 async def get_all_automations():
     supabase = get_supabase()
-    response = supabase.table("automations").select("*").execute()
+    response = await db_execute(supabase.table("automations").select("*"))
     return response.data
 
 
@@ -72,82 +142,142 @@ async def create_new_automation(
 
     # Extract version if not provided
     if version is None:
-        # Regex to find version pattern like .1.0.5.nupkg at the end
-        match = re.search(r"\.(\d+\.\d+\.\d+(?:-[\w\.]*)?)\.nupkg$", file.filename)
-        if match:
-            version = match.group(1)
+        # Find version pattern like .1.0.5.nupkg at the end
+        version = package_version(file.filename)
+
+    # 1. Stream the upload to disk, hashing it on the way
+    store = get_package_store(publish_folder)
+    temp_location, sha256, size = await store.receive(file)
+
+    # Same bytes already published: nothing to write, upload or insert
+    existing = store.lookup(sha256)
+    if existing is not None:
+        discard(temp_location)
+        print(f"Package {file.filename} matches already published {existing.get('file_name')} ({sha256[:12]}). Skipping.")
+        return existing
+
+    async def adopt(existing: Dict[str, Any], location: str) -> Dict[str, Any]:
+        # Keep one local copy, under the name the existing row uses
+        existing_location = os.path.join(publish_folder, existing.get("file_name") or file.filename)
+        if os.path.abspath(location) != os.path.abspath(existing_location):
+            if os.path.exists(existing_location):
+                discard(location)
+            else:
+                os.replace(location, existing_location)
+        await run_in("io", store.remember, sha256, os.path.basename(existing_location), size, existing)
+        index_automation(existing)
+        return existing
 
-    # 1. Save the file locally
-    file_location = os.path.join(publish_folder, file.filename)
-    
-    # Save locally
-    async with aiofiles.open(file_location, 'wb') as out_file:
-        while content := await file.read(1024 * 1024):  # Read in 1MB chunks
-            await out_file.write(content)
-            
-    # 2. Upload to Supabase Storage if not exists
     supabase = get_supabase()
-    bucket_name = "automation"
-    
-    # Check if file exists in bucket
+    existing = await _find_automation_by_sha256(sha256)
+    if existing is not None:
+        # Published from another unit (or before the local index existed); adopt it
+        return await adopt(existing, temp_location)
+
     try:
-        # List files in bucket matching the filename
-        files_in_bucket = supabase.storage.from_(bucket_name).list(
-            path=None, 
-            options={"limit": 1, "search": file.filename}
-        )
-        file_exists_in_bucket = any(f['name'] == file.filename for f in files_in_bucket)
+        await run_in("io", validate_package, temp_location)
+    except PackageValidationError as e:
+        discard(temp_location)
+        raise HTTPException(status_code=400, detail=str(e))
+
+    file_location = os.path.join(publish_folder, file.filename)
+    os.replace(temp_location, file_location)
+
+    # Extract once now so runs don't pay for unpacking the package
+    try:
+        await run_in("io", prepare_package, file_location, sha256)
     except Exception as e:
-        print(f"Error checking storage: {e}")
-        file_exists_in_bucket = False
+        print(f"Failed to prepare extracted package for {file.filename}: {e}")
 
-    if not file_exists_in_bucket:
+    # 2. Upload to Supabase Storage unless these exact bytes are already there
+    bucket_name = "automation"
+    
+    if not store.is_stored(file.filename, sha256):
+        # A different package was stored under this name before: replace it
+        replace = store.stored_hash(file.filename) is not None
         try:
-            with open(file_location, "rb") as f:
-                file_content = f.read()
-                supabase.storage.from_(bucket_name).upload(
-                    path=file.filename,
-                    file=file_content,
-                    file_options={"content-type": "application/octet-stream"}
-                )
+            # Streamed from disk in a worker thread so large packages don't block the loop
+            await run_in(
+                "io",
+                upload_package,
+                file_location,
+                bucket_name,
+                file.filename,
+                upsert=replace
+            )
+            await run_in("io", store.mark_stored, file.filename, sha256)
+        except StorageUploadError as e:
+            if e.is_duplicate:
+                # Object was uploaded by another unit; keep it as before
+                await run_in("io", store.mark_stored, file.filename, sha256)
+            else:
+                print(f"Failed to upload to Supabase Storage: {e}")
         except Exception as e:
             print(f"Failed to upload to Supabase Storage: {e}")
             # We don't raise error here, as local save was successful
-            pass
 
     # 3. Insert record into Supabase tables
     
     # Data to insert
     data = {
         "file_name": file.filename,  # Storing absolute path might be better, or just filename if we always join with PUBLISH_AUTOMATION_FOLDER
-        "version": version
+        "version": version,
+        "sha256": sha256
     }
     
     # Clean up None values if any
     if version is None:
         del data["version"]
-        
-    response = supabase.table("automations").insert(data).execute()
+    if _sha256_column is False:
+        del data["sha256"]
+
+    try:
+        response = await db_execute(supabase.table("automations").insert(data))
+    except APIError as e:
+        if _is_unique_violation(e):
+            # A concurrent upload of the same bytes inserted first; its row wins
+            existing = await _find_automation_by_sha256(sha256)
+            if existing is None:
+                raise
+            return await adopt(existing, file_location)
+        if not is_missing_sha256_column(e):
+            raise
+        _note_missing_sha256_column()
+        del data["sha256"]
+        response = await db_execute(supabase.table("automations").insert(data))
     
     if not response.data:
         raise HTTPException(status_code=500, detail="Failed to create automation")
     
+    await run_in("io", store.remember, sha256, file.filename, size, response.data[0])
+    index_automation(response.data[0])
     return response.data[0]
 
 async def get_automation_by_id(automation_id: str):
     supabase = get_supabase()
-    response = supabase.table("automations").select("*").eq("id", automation_id).execute()
+    response = await db_execute(supabase.table("automations").select("*").eq("id", automation_id))
     
     if not response.data:
         raise HTTPException(status_code=404, detail="Automation not found")
     
     return response.data[0]
 
-async def run_automation_process(automation_id: str, arguments: Dict[str, Any]):
+async def _require_local_package(automation_data: Dict[str, Any]):
+    """Fetches the row's package if this unit doesn't have it; 503 if that fails."""
+    if not await ensure_local_package(automation_data):
+        file_name = automation_data.get("file_name")
+        reason = get_sync_status()["errors"].get(file_name, "not available")
+        raise HTTPException(
+            status_code=503,
+            detail=f"Package {file_name} could not be fetched to this unit: {reason}",
+            headers={"Retry-After": "30"}
+        )
+
+async def run_automation_process(automation_id: str, arguments: Dict[str, Any], priority: int = 0):
     supabase = get_supabase()
     
     # 1. Fetch automation details
-    response = supabase.table("automations").select("*").eq("id", automation_id).execute()
+    response = await db_execute(supabase.table("automations").select("*").eq("id", automation_id))
     if not response.data:
         raise HTTPException(status_code=404, detail="Automation not found")
     
@@ -157,28 +287,34 @@ async def run_automation_process(automation_id: str, arguments: Dict[str, Any]):
     if not file_name:
         raise HTTPException(status_code=400, detail="Automation record has no 'file_name'")
 
+    # Usually already prefetched by the sync agent; fetch now if this unit missed it
+    await _require_local_package(automation_data)
+
     # Run the automation
     result = await run_uipath_automation(
         process_name_or_path=file_name,
         arguments=arguments,
-        is_file=True 
+        is_file=True,
+        priority=priority
     )
     
     # 3. Save to automation_history
     try:
-        supabase.table("automation_history").insert({
+        await db_execute(supabase.table("automation_history").insert({
             "automation_id": automation_id,
             "input": arguments,
-            "status": result.get("status", "unknown")
-        }).execute()
+            "status": result.get("status", "unknown"),
+            "exit_code": result.get("exit_code"),
+            "message": result.get("message") if result.get("status") in ("timeout", "cancelled") else None
+        }))
     except Exception as e:
         print(f"Failed to save to automation_history: {e}")
     
     return result
 
-async def run_automation_by_identifier(identifier: str, arguments: Dict[str, Any]):
+async def find_automation_by_identifier(identifier: str):
     """
-    Run an automation identified by either its ID (UUID) or its file_name.
+    Finds an automation by either its ID (UUID) or its file_name.
     """
     supabase = get_supabase()
     
@@ -190,7 +326,7 @@ async def run_automation_by_identifier(identifier: str, arguments: Dict[str, Any
     
     # Try ID search
     try:
-        response = supabase.table("automations").select("*").eq("id", identifier).execute()
+        response = await db_execute(supabase.table("automations").select("*").eq("id", identifier))
         if response.data:
             automation_data = response.data[0]
     except Exception:
@@ -199,50 +335,131 @@ async def run_automation_by_identifier(identifier: str, arguments: Dict[str, Any
         
     # If not found by ID, try file_name search
     if not automation_data:
-        response = supabase.table("automations").select("*").eq("file_name", identifier).execute()
+        response = await db_execute(supabase.table("automations").select("*").eq("file_name", identifier))
         if response.data:
             automation_data = response.data[0]
             
     if not automation_data:
         # Try searching with .nupkg suffix if it's missing
         if not identifier.endswith(".nupkg"):
-            response = supabase.table("automations").select("*").eq("file_name", f"{identifier}.nupkg").execute()
+            response = await db_execute(supabase.table("automations").select("*").eq("file_name", f"{identifier}.nupkg"))
             if response.data:
                 automation_data = response.data[0]
 
     if not automation_data:
         raise HTTPException(status_code=404, detail=f"Automation with identifier '{identifier}' not found")
     
-    return await run_automation_process(automation_data.get("id"), arguments)
+    return automation_data
+
+async def run_automation_by_identifier(identifier: str, arguments: Dict[str, Any], priority: int = 0):
+    """
+    Run an automation identified by either its ID (UUID) or its file_name.
+    """
+    automation_data = await find_automation_by_identifier(identifier)
+    return await run_automation_process(automation_data.get("id"), arguments, priority=priority)
+
+def _output_tail(text: Optional[str]) -> Optional[str]:
+    if text and len(text) > HISTORY_OUTPUT_TAIL_CHARS:
+        return "…[truncated]\n" + text[-HISTORY_OUTPUT_TAIL_CHARS:]
+    return text
+
+async def start_automation_stream(identifier: str, arguments: Dict[str, Any], priority: int = 0) -> RunLog:
+    """
+    Starts an automation in streaming mode and returns its RunLog right away.
+    The run continues in the background even if no client is watching; its
+    history row stores only the output tail and a pointer to the full log file.
+    """
+    automation_data = await find_automation_by_identifier(identifier)
+    automation_id = automation_data.get("id")
+    file_name = automation_data.get("file_name")
+    
+    if not file_name:
+        raise HTTPException(status_code=400, detail="Automation record has no 'file_name'")
+    
+    await _require_local_package(automation_data)
+    run_log = create_run_log(label=file_name)
+    
+    async def _run_and_record():
+        result = await stream_uipath_automation(
+            run_log,
+            process_name_or_path=file_name,
+            arguments=arguments,
+            is_file=True,
+            priority=priority
+        )
+        try:
+            supabase = get_supabase()
+            await db_execute(supabase.table("automation_history").insert({
+                "automation_id": automation_id,
+                "input": arguments,
+                "status": result.get("status", "unknown"),
+                "stdout": _output_tail(result.get("stdout")),
+                "stderr": _output_tail(result.get("stderr")),
+                "exit_code": result.get("exit_code"),
+                "message": f"Full log: {run_log.log_path}"
+            }))
+        except Exception as e:
+            print(f"Failed to save to automation_history: {e}")
+    
+    # Keep a reference on the run log so the task isn't garbage collected mid-run
+    run_log.task = asyncio.create_task(_run_and_record())
+    return run_log
 
 async def get_latest_automation_by_name(base_name: str):
     """
     Finds the latest version of an automation starting with base_name.
     Expects format like 'CTraderAutomation' or 'CTraderAutomation.1.0.5.nupkg'
+    Versions are compared semantically (1.0.10 > 1.0.9) using the in-memory
+    latest-version index, which the package sync keeps loaded from Supabase.
     """
-    supabase = get_supabase()
-    
-    # Remove extension if provided to get the pure name
-    search_name = base_name.split('.')[0]
+    return await latest_automation(base_name)
+
+async def get_execution_history(
+    limit: int = HISTORY_DEFAULT_LIMIT,
+    cursor: Optional[str] = None,
+    automation_id: Optional[str] = None,
+    status: Optional[str] = None,
+    since: Optional[datetime] = None,
+    until: Optional[datetime] = None,
+    include_output: bool = False
+):
+    """
+    Returns one page of execution history, newest first, plus the cursor for the next page.
+    Pages are keyset-paginated on (created_at, id) so deep pages cost the same as the first.
+    """
+    limit = max(1, min(limit, HISTORY_MAX_LIMIT))
+    columns = "*" if include_output else HISTORY_SUMMARY_COLUMNS
     
-    # Fetch all automations matching the base name
-    # We use ilike to be flexible with the naming
-    response = supabase.table("automations").select("*").ilike("file_name", f"{search_name}%").execute()
+    supabase = get_supabase()
+    query = supabase.table("automation_history").select(columns)
     
-    if not response.data:
-        return None
+    if automation_id:
+        query = query.eq("automation_id", automation_id)
+    if status:
+        query = query.eq("status", status)
+    if since:
+        query = query.gte("created_at", since.isoformat())
+    if until:
+        query = query.lt("created_at", until.isoformat())
+    if cursor:
+        created_at, last_id = decode_history_cursor(cursor)
+        query = query.or_(
+            f'created_at.lt."{created_at}",and(created_at.eq."{created_at}",id.lt.{last_id})'
+        )
     
-    # Sort by version if available, otherwise by created_at
-    # Simple version sorting: might need more robust logic if versions are complex
-    sorted_automations = sorted(
-        response.data, 
-        key=lambda x: (x.get("version") or "", x.get("created_at")), 
-        reverse=True
-    )
+    # Fetch one extra row to know whether another page exists
+    response = await db_execute(query.order("created_at", desc=True).order("id", desc=True).limit(limit + 1))
+    rows = response.data or []
     
-    return sorted_automations[0]
+    next_cursor = encode_history_cursor(rows[limit - 1]) if len(rows) > limit else None
+    return rows[:limit], next_cursor
 
-async def get_execution_history():
+async def get_execution_output(execution_id: int):
+    """Fetches the stdout/stderr of a single execution, which history pages omit by default."""
     supabase = get_supabase()
-    response = supabase.table("automation_history").select("*").order("created_at", desc=True).limit(50).execute()
-    return response.data
+    response = await db_execute(supabase.table("automation_history").select("id, stdout, stderr").eq("id", execution_id))
+    
+    if not response.data:
+        raise HTTPException(status_code=404, detail="Execution not found")
+    
+    return response.data[0]
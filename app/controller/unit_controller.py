@@ -1,12 +1,12 @@
 from app.core.supabase import get_supabase
 from app.helper.system import get_machine_guid
+from app.helper.executors import run_in
 import socket
 import os
 from dotenv import load_dotenv
 
 load_dotenv()
 
-import anyio
 
 async def register_unit():
     """
@@ -53,4 +53,4 @@ async def register_unit():
             return None
 
     # Run the blocking logic in a thread to keep the event loop responsive
-    return await anyio.to_thread.run_sync(_sync_registration)
+    return await run_in("db", _sync_registration)
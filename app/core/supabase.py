@@ -1,6 +1,7 @@
 import os
 from supabase import create_client, Client
 from dotenv import load_dotenv
+from app.helper.metrics import instrument_supabase
 
 # Load environment variables from .env file
 load_dotenv()
@@ -15,6 +16,8 @@ if not supabase_url or not supabase_key:
 
 # Initialize the Supabase client
 supabase: Client = create_client(supabase_url, supabase_key)
+# Count and time every table call for /metrics
+instrument_supabase(supabase)
 
 def get_supabase() -> Client:
     """
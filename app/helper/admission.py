@@ -0,0 +1,189 @@
+import os
+import math
+import time
+import logging
+from collections import OrderedDict, defaultdict
+from typing import Optional
+from fastapi import HTTPException, Request
+from dotenv import load_dotenv
+from app.helper.executors import get_executor
+from app.helper.uipath_scheduler import scheduler
+
+load_dotenv()
+
+logger = logging.getLogger(__name__)
+
+# Off unless asked for: the limits below would refuse fan-outs that used to queue
+ADMISSION_ENABLED = os.getenv("ADMISSION_ENABLED", "false").lower() in ("1", "true", "yes")
+# Header carrying the caller's address; cloudflared sets CF-Connecting-IP on every request
+CLIENT_HEADER = os.getenv("ADMISSION_CLIENT_HEADER", "CF-Connecting-IP")
+# Peers allowed to set CLIENT_HEADER, comma separated (e.g. 127.0.0.1 for a local
+# cloudflared). From anyone else the header is ignored, so it can't be spoofed.
+TRUSTED_PROXIES = {
+    address.strip() for address in os.getenv("ADMISSION_TRUSTED_PROXIES", "").split(",") if address.strip()
+}
+CLIENT_RATE_PER_MIN = float(os.getenv("ADMISSION_CLIENT_RATE_PER_MIN", "60"))
+CLIENT_BURST = float(os.getenv("ADMISSION_CLIENT_BURST", "20"))
+ACCOUNT_RATE_PER_MIN = float(os.getenv("ADMISSION_ACCOUNT_RATE_PER_MIN", "12"))
+ACCOUNT_BURST = float(os.getenv("ADMISSION_ACCOUNT_BURST", "5"))
+# Trades allowed to wait for (or hold) a platform's browser thread before new ones are refused
+BROWSER_MAX_PENDING = int(os.getenv("ADMISSION_BROWSER_MAX_PENDING", "3"))
+# Runs allowed to wait in the UiRobot queue before new ones are refused
+RUNNER_MAX_QUEUED = int(os.getenv("ADMISSION_RUNNER_MAX_QUEUED", "10"))
+MAX_BUCKETS = 10000
+MAX_RETRY_AFTER_SEC = 120
+
+
+class TokenBucket:
+    """Refills `rate` tokens per second up to `burst`; each admitted request takes one."""
+
+    __slots__ = ("rate", "burst", "tokens", "updated_at")
+
+    def __init__(self, rate: float, burst: float):
+        self.rate = rate
+        self.burst = max(1.0, burst)
+        self.tokens = self.burst
+        self.updated_at = time.monotonic()
+
+    def _refill(self, now: float):
+        self.tokens = min(self.burst, self.tokens + (now - self.updated_at) * self.rate)
+        self.updated_at = now
+
+    def wait_time(self) -> float:
+        """Seconds until a token is available (0 if one is available now)."""
+        self._refill(time.monotonic())
+        if self.tokens >= 1:
+            return 0.0
+        return (1 - self.tokens) / self.rate if self.rate > 0 else float(MAX_RETRY_AFTER_SEC)
+
+    def take(self):
+        self._refill(time.monotonic())
+        self.tokens -= 1
+
+    @property
+    def full(self) -> bool:
+        self._refill(time.monotonic())
+        return self.tokens >= self.burst
+
+
+def _retry_after(seconds: float) -> str:
+    return str(min(MAX_RETRY_AFTER_SEC, max(1, math.ceil(seconds))))
+
+
+class AdmissionController:
+    """
+    Decides, before any work starts, whether a trade or robot run is accepted.
+
+    Capacity comes first: if the platform's browser thread (or the UiRobot queue)
+    already has as much pending work as it can get through, the request gets a
+    503 straight away instead of queueing behind it. Then the caller and the
+    account each need a token from their bucket, otherwise it is a 429.
+    Both answers carry Retry-After. Must be used from a single event loop.
+    """
+
+    def __init__(self):
+        self._buckets: "OrderedDict[tuple, TokenBucket]" = OrderedDict()
+        self.admitted = 0
+        self.rejected = defaultdict(int)
+
+    def _bucket(self, kind: str, key: str) -> TokenBucket:
+        bucket = self._buckets.get((kind, key))
+        if bucket is None:
+            if kind == "client":
+                bucket = TokenBucket(CLIENT_RATE_PER_MIN / 60.0, CLIENT_BURST)
+            else:
+                bucket = TokenBucket(ACCOUNT_RATE_PER_MIN / 60.0, ACCOUNT_BURST)
+            self._buckets[(kind, key)] = bucket
+            self._prune()
+        self._buckets.move_to_end((kind, key))
+        return bucket
+
+    def _prune(self):
+        """Drops the least recently used buckets that have refilled, i.e. hold no state."""
+        if len(self._buckets) <= MAX_BUCKETS:
+            return
+        for bucket_key in [k for k, b in self._buckets.items() if b.full]:
+            if len(self._buckets) <= MAX_BUCKETS:
+                break
+            self._buckets.pop(bucket_key)
+
+    def _refuse(self, status_code: int, reason: str, detail: str, retry_after: float):
+        self.rejected[reason] += 1
+        logger.warning(f"Refused request ({reason}): {detail}")
+        raise HTTPException(status_code=status_code, detail=detail, headers={"Retry-After": _retry_after(retry_after)})
+
+    def _check_capacity(self, capacity: str):
+        if capacity == "runner":
+            queue = scheduler.snapshot()
+            if queue["queued"] >= RUNNER_MAX_QUEUED:
+                self._refuse(
+                    503, "runner_capacity",
+                    f"Run queue already holds {queue['queued']} runs; try again later",
+                    queue["avg_wait_seconds"] or 30
+                )
+            return
+
+        stats = get_executor(capacity).snapshot()
+        pending = stats["active"] + stats["queued"]
+        if pending >= BROWSER_MAX_PENDING:
+            # Roughly how long until the backlog drains below the ceiling again
+            self._refuse(
+                503, "browser_capacity",
+                f"{capacity} is busy with {pending} trades; try again later",
+                (stats["avg_run_seconds"] or 5) * (pending - BROWSER_MAX_PENDING + 1)
+            )
+
+    def admit(self, client: str, account: Optional[str], capacity: str):
+        """
+        Admits one request or raises HTTPException (503 over capacity, 429 over a rate limit).
+        `capacity` is a browser executor name or 'runner'.
+        """
+        if not ADMISSION_ENABLED:
+            return
+
+        self._check_capacity(capacity)
+
+        buckets = [("client", client, self._bucket("client", client))]
+        if account:
+            buckets.append(("account", account, self._bucket("account", account)))
+        for kind, key, bucket in buckets:
+            wait = bucket.wait_time()
+            if wait > 0:
+                self._refuse(429, f"{kind}_rate", f"Too many requests for {kind} '{key}'", wait)
+
+        # Only spend tokens once every check has passed
+        for _, _, bucket in buckets:
+            bucket.take()
+        self.admitted += 1
+
+    def snapshot(self) -> dict:
+        return {
+            "enabled": ADMISSION_ENABLED,
+            "admitted": self.admitted,
+            "rejected": dict(self.rejected),
+            "buckets": len(self._buckets),
+            "limits": {
+                "client_rate_per_min": CLIENT_RATE_PER_MIN,
+                "client_burst": CLIENT_BURST,
+                "account_rate_per_min": ACCOUNT_RATE_PER_MIN,
+                "account_burst": ACCOUNT_BURST,
+                "browser_max_pending": BROWSER_MAX_PENDING,
+                "runner_max_queued": RUNNER_MAX_QUEUED,
+            },
+            "trusted_proxies": sorted(TRUSTED_PROXIES),
+        }
+
+
+admission = AdmissionController()
+
+
+def client_id(request: Request) -> str:
+    """
+    The caller's address: the socket peer, or the tunnel's client header when the
+    peer is one of ADMISSION_TRUSTED_PROXIES.
+    """
+    peer = request.client.host if request.client else "unknown"
+    forwarded = request.headers.get(CLIENT_HEADER)
+    if forwarded and peer in TRUSTED_PROXIES:
+        return forwarded.split(",")[0].strip()
+    return peer
@@ -0,0 +1,118 @@
+import os
+import time
+import asyncio
+import threading
+import logging
+from typing import Dict, Any, List, Optional
+from postgrest.exceptions import APIError
+from app.core.supabase import get_supabase
+from app.helper.executors import run_in
+from app.helper.version import package_base_name, package_version, version_sort_key
+
+logger = logging.getLogger(__name__)
+
+# The catalog columns anything reads from an automations row; large or unused
+# columns are left behind. Databases without migrations/001 have no sha256 yet.
+CATALOG_COLUMNS = "id, created_at, file_name, version, sha256"
+LEGACY_CATALOG_COLUMNS = "id, created_at, file_name, version"
+
+# The index is reloaded from the catalog once it is this old. The package sync
+# reloads it on every pass as well, so with the sync running this rarely fires.
+INDEX_TTL_SEC = float(os.getenv("AUTOMATION_INDEX_TTL_SEC", "300"))
+# A lookup that misses reloads the index, but not more often than this, so a
+# package published on another unit shows up without every miss hitting the database
+MISS_REFRESH_SEC = float(os.getenv("AUTOMATION_INDEX_MISS_REFRESH_SEC", "10"))
+
+# Lowercased package base name (e.g. 'ctraderautomation') -> newest automations row
+_index: Dict[str, Dict[str, Any]] = {}
+_loaded_at: Optional[float] = None
+_index_lock = threading.Lock()
+_refresh_lock: Optional[asyncio.Lock] = None
+
+
+def is_missing_sha256_column(error: APIError) -> bool:
+    """Whether a PostgREST error means automations.sha256 doesn't exist (42703 on filters, PGRST204 on inserts)."""
+    return error.code in ("42703", "PGRST204") and "sha256" in (error.message or "")
+
+
+def version_rank(row: Dict[str, Any]) -> tuple:
+    """Ranks an automation row by semantic version, then by creation time."""
+    version = row.get("version") or package_version(row.get("file_name"))
+    return (version_sort_key(version), row.get("created_at") or "")
+
+
+def latest_per_package(rows: List[Dict[str, Any]]) -> Dict[str, Dict[str, Any]]:
+    """The newest row of each package, keyed by lowercased base name."""
+    latest: Dict[str, Dict[str, Any]] = {}
+    for row in rows:
+        key = package_base_name(row.get("file_name")).lower()
+        if key and (key not in latest or version_rank(row) >= version_rank(latest[key])):
+            latest[key] = row
+    return latest
+
+
+def fetch_catalog() -> List[Dict[str, Any]]:
+    """All automations rows, CATALOG_COLUMNS only. Blocking."""
+    supabase = get_supabase()
+    try:
+        return supabase.table("automations").select(CATALOG_COLUMNS).execute().data or []
+    except APIError as e:
+        if not is_missing_sha256_column(e):
+            raise
+        return supabase.table("automations").select(LEGACY_CATALOG_COLUMNS).execute().data or []
+
+
+def load_catalog(rows: List[Dict[str, Any]]):
+    """Replaces the index with the newest of `rows`, a full catalog read."""
+    global _index, _loaded_at
+    latest = latest_per_package(rows)
+    with _index_lock:
+        _index = latest
+        _loaded_at = time.monotonic()
+
+
+def index_automation(row: Dict[str, Any]):
+    """Adds a row to the index if it outranks the current entry, e.g. after a publish."""
+    key = package_base_name(row.get("file_name")).lower()
+    if not key:
+        return
+    with _index_lock:
+        current = _index.get(key)
+        if current is None or version_rank(row) >= version_rank(current):
+            _index[key] = row
+
+
+def _lookup(search_name: str) -> Optional[Dict[str, Any]]:
+    with _index_lock:
+        latest = _index.get(search_name)
+        if latest is not None:
+            return latest
+        # No exact match: fall back to prefix matching, like ilike('file_name', 'name%')
+        candidates = [row for key, row in _index.items() if key.startswith(search_name)]
+    return max(candidates, key=version_rank) if candidates else None
+
+
+async def _refresh(max_age: float):
+    """Reloads the index unless it was loaded within `max_age` seconds; concurrent callers share one read."""
+    global _refresh_lock
+    if _refresh_lock is None:
+        _refresh_lock = asyncio.Lock()
+    async with _refresh_lock:
+        if _loaded_at is not None and time.monotonic() - _loaded_at < max_age:
+            return
+        load_catalog(await run_in("db", fetch_catalog))
+
+
+async def latest_automation(base_name: str) -> Optional[Dict[str, Any]]:
+    """
+    The newest automations row whose package name is `base_name` (or starts with
+    it), or None. Answered from the index; a stale index is reloaded first, and a
+    miss reloads it once more (at most every MISS_REFRESH_SEC) before giving up.
+    """
+    search_name = package_base_name(base_name).lower()
+    await _refresh(INDEX_TTL_SEC)
+    latest = _lookup(search_name)
+    if latest is None:
+        await _refresh(MISS_REFRESH_SEC)
+        latest = _lookup(search_name)
+    return latest
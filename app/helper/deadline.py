@@ -0,0 +1,107 @@
+import os
+import time
+import contextvars
+import functools
+from typing import Optional
+from dotenv import load_dotenv
+from app.helper.tracing import current_span
+
+load_dotenv()
+
+# Total time a trade request may take, from arrival to result, unless the request sets its own
+DEFAULT_BUDGET_SECONDS = float(os.getenv("TRADE_BUDGET_SECONDS", "180"))
+# Playwright's own default for waits that don't pass a timeout
+PLAYWRIGHT_DEFAULT_TIMEOUT_MS = 30000
+
+_deadline: contextvars.ContextVar[Optional["Deadline"]] = contextvars.ContextVar("deadline", default=None)
+
+
+class BudgetExhausted(Exception):
+    """Raised by a wait that starts after the operation's time budget ran out."""
+
+    def __init__(self, step: str, budget_seconds: float, elapsed_seconds: float):
+        self.step = step
+        self.budget_seconds = budget_seconds
+        self.elapsed_seconds = elapsed_seconds
+        super().__init__(f"budget exhausted at step {step} ({elapsed_seconds:.1f}s of {budget_seconds:g}s)")
+
+
+class Deadline:
+    """
+    A point in time an operation must finish by. Created when the request
+    arrives, so time spent queued for the browser counts against it.
+    """
+
+    def __init__(self, budget_seconds: float):
+        self.budget_seconds = budget_seconds
+        self.started = time.monotonic()
+        self.expires_at = self.started + budget_seconds
+        # The step that first ran out of budget; later failures are consequences of it
+        self.exhausted_at: Optional[str] = None
+
+    def remaining_ms(self) -> float:
+        return max(0.0, (self.expires_at - time.monotonic()) * 1000)
+
+    def exhausted(self, step: str) -> BudgetExhausted:
+        if self.exhausted_at is None:
+            self.exhausted_at = step
+        return BudgetExhausted(self.exhausted_at, self.budget_seconds, time.monotonic() - self.started)
+
+
+def current_deadline() -> Optional[Deadline]:
+    return _deadline.get()
+
+
+def _current_step() -> str:
+    current = current_span()
+    return current.name if current else "unknown"
+
+
+def budget(ms: float) -> float:
+    """
+    Clamps a wait of `ms` milliseconds to what is left of the current
+    operation's budget. Raises BudgetExhausted once less than 1 ms is left.
+    Never returns less than 1: Playwright takes a timeout of 0 as "no timeout".
+    Outside an operation with a deadline, returns `ms` unchanged.
+    """
+    deadline = _deadline.get()
+    if deadline is None:
+        return ms
+    remaining = deadline.remaining_ms()
+    if remaining < 1:
+        raise deadline.exhausted(_current_step())
+    return max(1.0, min(ms, remaining))
+
+
+def apply_default_timeout(page):
+    """Clamps the page's default timeout (for waits that don't pass one) to the remaining budget."""
+    page.set_default_timeout(budget(PLAYWRIGHT_DEFAULT_TIMEOUT_MS))
+
+
+def with_deadline(func):
+    """
+    Decorator for a driver's run(): accepts a `deadline` keyword (a Deadline,
+    or None for no limit) and makes it the budget every wait inside is clamped to.
+    """
+    @functools.wraps(func)
+    def wrapper(*args, deadline: Optional[Deadline] = None, **kwargs):
+        token = _deadline.set(deadline)
+        try:
+            if deadline is not None and deadline.remaining_ms() <= 0:
+                raise deadline.exhausted("queued")
+            return func(*args, **kwargs)
+        finally:
+            _deadline.reset(token)
+    return wrapper
+
+
+def unbounded(func):
+    """Decorator for steps meant to run open-ended (e.g. monitoring a trade until it closes)."""
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        token = _deadline.set(None)
+        try:
+            return func(*args, **kwargs)
+        finally:
+            _deadline.reset(token)
+    return wrapper
@@ -0,0 +1,133 @@
+import os
+import time
+import asyncio
+import threading
+import contextvars
+import functools
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict
+from dotenv import load_dotenv
+
+load_dotenv()
+
+
+class NamedExecutor:
+    """
+    A dedicated, fixed-size thread pool for one class of blocking work, with
+    counters for utilization and for how long calls waited for a free thread.
+    Keeping workloads on separate pools means a slow class (e.g. browser
+    sessions) can't take the threads another class (e.g. DB calls) needs.
+    """
+
+    def __init__(self, name: str, size: int):
+        self.name = name
+        self.size = max(1, size)
+        self._pool = ThreadPoolExecutor(max_workers=self.size, thread_name_prefix=f"exec-{name}")
+        self._lock = threading.Lock()
+        self._created_at = time.monotonic()
+        self._submitted = 0
+        self._active = 0
+        self._completed = 0
+        self._failed = 0
+        self._busy_seconds = 0.0
+        self._total_wait = 0.0
+        self._max_wait = 0.0
+
+    async def run(self, func, *args, **kwargs):
+        """Runs func(*args, **kwargs) on this pool, carrying the caller's contextvars over."""
+        context = contextvars.copy_context()
+        call = functools.partial(context.run, func, *args, **kwargs)
+        submitted_at = time.monotonic()
+        with self._lock:
+            self._submitted += 1
+
+        def _tracked():
+            started_at = time.monotonic()
+            waited = started_at - submitted_at
+            with self._lock:
+                self._active += 1
+                self._total_wait += waited
+                self._max_wait = max(self._max_wait, waited)
+            failed = False
+            try:
+                return call()
+            except BaseException:
+                failed = True
+                raise
+            finally:
+                with self._lock:
+                    self._active -= 1
+                    self._busy_seconds += time.monotonic() - started_at
+                    if failed:
+                        self._failed += 1
+                    else:
+                        self._completed += 1
+
+        return await asyncio.get_running_loop().run_in_executor(self._pool, _tracked)
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            finished = self._completed + self._failed
+            started = finished + self._active
+            uptime = time.monotonic() - self._created_at
+            return {
+                "size": self.size,
+                "active": self._active,
+                "queued": self._submitted - started,
+                "submitted": self._submitted,
+                "completed": self._completed,
+                "failed": self._failed,
+                # Share of thread-time spent working since start-up (finished calls only)
+                "utilization": round(self._busy_seconds / (uptime * self.size), 4) if uptime else 0.0,
+                "avg_run_seconds": round(self._busy_seconds / finished, 4) if finished else 0.0,
+                "avg_wait_seconds": round(self._total_wait / started, 4) if started else 0.0,
+                "max_wait_seconds": round(self._max_wait, 4),
+            }
+
+    def shutdown(self):
+        self._pool.shutdown(wait=False, cancel_futures=True)
+
+
+def _size(env_name: str, default: int) -> int:
+    return int(os.getenv(env_name, str(default)))
+
+
+# Sync Playwright is bound to the thread that started it, so each platform gets
+# exactly one browser thread; its drivers already serialize on their own lock.
+_executors: Dict[str, NamedExecutor] = {
+    "browser-ctrader": NamedExecutor("browser-ctrader", 1),
+    "browser-tradelocker": NamedExecutor("browser-tradelocker", 1),
+    # Buffered UiRobot runs hold a thread for the whole run; the scheduler caps those
+    # at UIROBOT_MAX_CONCURRENCY, and the headroom keeps kills/cleanup from queueing behind them
+    "subprocess": NamedExecutor(
+        "subprocess",
+        _size("EXECUTOR_SUBPROCESS_SIZE", int(os.getenv("UIROBOT_MAX_CONCURRENCY", "1")) + 4)
+    ),
+    # Supabase REST calls (the client is synchronous)
+    "db": NamedExecutor("db", _size("EXECUTOR_DB_SIZE", 8)),
+    # Package hashing, extraction and Storage transfers
+    "io": NamedExecutor("io", _size("EXECUTOR_IO_SIZE", 4)),
+}
+
+
+def get_executor(name: str) -> NamedExecutor:
+    return _executors[name]
+
+
+async def run_in(name: str, func, *args, **kwargs):
+    """Runs a blocking call on the named executor."""
+    return await _executors[name].run(func, *args, **kwargs)
+
+
+async def db_execute(query):
+    """Executes a Supabase query builder on the db executor instead of the event loop."""
+    return await _executors["db"].run(query.execute)
+
+
+def executor_stats() -> dict:
+    return {name: executor.snapshot() for name, executor in _executors.items()}
+
+
+def shutdown_executors():
+    for executor in _executors.values():
+        executor.shutdown()
@@ -0,0 +1,116 @@
+import os
+import random
+import contextlib
+import contextvars
+import functools
+from typing import Dict, Optional
+from dotenv import load_dotenv
+
+load_dotenv()
+
+
+class HumanizationProfile:
+    """
+    How human the drivers pretend to be. Each scale multiplies the matching
+    realistic behaviour: 1 keeps it, 0 removes it (no pauses, direct mouse
+    jumps, text entered in one go).
+    """
+
+    __slots__ = ("name", "delay_scale", "mouse_scale", "keystroke_scale")
+
+    def __init__(self, name: str, delay_scale: float, mouse_scale: float, keystroke_scale: float):
+        self.name = name
+        self.delay_scale = delay_scale
+        self.mouse_scale = mouse_scale
+        self.keystroke_scale = keystroke_scale
+
+    def delay_ms(self, min_ms: int, max_ms: int) -> int:
+        """A random pause in [min_ms, max_ms], scaled; 0 when pauses are off."""
+        if self.delay_scale <= 0:
+            return 0
+        return int(random.randint(min_ms, max_ms) * self.delay_scale)
+
+    def keystroke_ms(self, min_ms: int, max_ms: int) -> int:
+        if self.keystroke_scale <= 0:
+            return 0
+        return int(random.randint(min_ms, max_ms) * self.keystroke_scale)
+
+    def mouse_steps(self, min_steps: int, max_steps: int) -> int:
+        """Points on a mouse path; 1 means jump straight to the target."""
+        if self.mouse_scale <= 0:
+            return 1
+        return max(2, int(random.randint(min_steps, max_steps) * self.mouse_scale))
+
+
+PROFILES: Dict[str, HumanizationProfile] = {
+    "off": HumanizationProfile("off", delay_scale=0, mouse_scale=0, keystroke_scale=0),
+    "light": HumanizationProfile("light", delay_scale=0.25, mouse_scale=0.5, keystroke_scale=0.3),
+    "realistic": HumanizationProfile("realistic", delay_scale=1, mouse_scale=1, keystroke_scale=1),
+}
+
+DEFAULT_PROFILE = os.getenv("HUMANIZATION_PROFILE", "realistic").strip().lower()
+
+
+def _parse_account_profiles(raw: str) -> Dict[str, str]:
+    # "alice@example.com=light, 5752716=off" -> {"alice@example.com": "light", "5752716": "off"}
+    profiles = {}
+    for item in raw.split(","):
+        account, _, name = item.partition("=")
+        account, name = account.strip().lower(), name.strip().lower()
+        if account and name in PROFILES:
+            profiles[account] = name
+    return profiles
+
+
+# Per-account overrides, keyed by username or trading account ID
+ACCOUNT_PROFILES = _parse_account_profiles(os.getenv("HUMANIZATION_ACCOUNT_PROFILES", ""))
+
+_profile: contextvars.ContextVar[Optional[HumanizationProfile]] = contextvars.ContextVar("humanization_profile", default=None)
+
+
+def get_profile(name: str) -> HumanizationProfile:
+    profile = PROFILES.get((name or "").strip().lower())
+    if profile is None:
+        raise ValueError(f"Unknown humanization profile '{name}' (expected one of: {', '.join(PROFILES)})")
+    return profile
+
+
+def current_profile() -> HumanizationProfile:
+    """The profile in force on this thread: the run's, else HUMANIZATION_PROFILE."""
+    return _profile.get() or PROFILES.get(DEFAULT_PROFILE, PROFILES["realistic"])
+
+
+def resolve_profile_name(requested: Optional[str] = None, username: str = None, account_id: str = None) -> str:
+    """Request choice first, then the account's configured profile, then the default."""
+    if requested:
+        return get_profile(requested).name
+    for account in (username, account_id):
+        if account and str(account).lower() in ACCOUNT_PROFILES:
+            return ACCOUNT_PROFILES[str(account).lower()]
+    return current_profile().name
+
+
+@contextlib.contextmanager
+def use_profile(name: str):
+    """Runs the `with` block under the named profile, e.g. "off" for a latency-critical close."""
+    token = _profile.set(get_profile(name))
+    try:
+        yield
+    finally:
+        _profile.reset(token)
+
+
+def with_humanization(func):
+    """
+    Decorator for a driver's run(): accepts a `humanization` keyword (a profile
+    name, or None to use the account's or default profile) for the whole run.
+    """
+    @functools.wraps(func)
+    def wrapper(*args, humanization: Optional[str] = None, **kwargs):
+        name = resolve_profile_name(humanization, kwargs.get("username"), kwargs.get("account_id"))
+        token = _profile.set(get_profile(name))
+        try:
+            return func(*args, **kwargs)
+        finally:
+            _profile.reset(token)
+    return wrapper
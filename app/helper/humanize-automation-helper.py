@@ -7,26 +7,86 @@ by adding randomized delays, natural mouse movements, and realistic typing patte
 Usage:
     from app.helper.humanize_automation_helper import Human
 
-    human = Human(page)
+    human = Human(page)                 # follows the run's humanization profile
+    human = Human(page, profile="off")  # or pins one: no pauses, direct moves
     human.delay()
     human.move_to(selector)
     human.move_randomly()
     human.click(selector)
+    human.click_at(x, y)
     human.type(selector, "hello world")
+    human.type_keys("EURUSD", 100, 200)    # into whatever has focus
 """
 
 import random
-import math
+import functools
+import numpy as np
+from app.helper.humanization import current_profile, get_profile
+
+# Mouse paths are sent to Playwright in segments of this many points, with one
+# wait for the segment's pauses instead of one after every point
+POINTS_PER_SEGMENT = 6
+
+
+@functools.lru_cache(maxsize=128)
+def _path_shape(points):
+    """
+    The parts of a path that depend only on its point count: the bezier weights
+    of (start, control, target) at each point, and how much shorter the pause
+    after each point is (most in the middle, where a hand moves fastest).
+    """
+    t = np.linspace(0.0, 1.0, points + 1)[:, None]
+    weights = np.hstack(((1 - t) ** 2, 2 * (1 - t) * t, t ** 2))
+    speedup = (np.sin(t[:, 0] * np.pi) * 5).astype(int)
+    return weights, speedup
+
+
+def mouse_path(start, target, points, rng=None, curve_x=100, curve_y=80, tremor=1.5):
+    """
+    Computes a whole mouse trajectory at once: a quadratic bezier from `start`
+    to `target` through a random control point, with +/- `tremor` px of hand
+    jitter on every point. Returns the (points + 1, 2) positions and the pause
+    in ms after each one (longer at both ends, like a hand speeding up and
+    settling).
+    """
+    rng = rng or np.random.default_rng()
+    weights, speedup = _path_shape(points)
+    # One draw covers the control point, the tremor and the pauses
+    offset = rng.random(2)
+    noise = rng.random((points + 1, 3))
+
+    ctrl_x = (start[0] + target[0]) / 2 + np.floor(offset[0] * (2 * curve_x + 1)) - curve_x
+    ctrl_y = (start[1] + target[1]) / 2 + np.floor(offset[1] * (2 * curve_y + 1)) - curve_y
+    anchors = np.array(((start[0], start[1]), (ctrl_x, ctrl_y), (target[0], target[1])), dtype=float)
+    path = weights @ anchors
+    path += (noise[:, :2] * 2 - 1) * tremor
+
+    # 3-12 ms per point, minus up to 5 ms at full speed
+    pauses = np.maximum(1, 3 + (noise[:, 2] * 10).astype(int) - speedup)
+    return path, pauses
 
 
 class Human:
-    """Wraps a Playwright page with human-like interaction methods."""
+    """
+    Wraps a Playwright page with human-like interaction methods. Pauses, mouse
+    paths and typing cadence follow a humanization profile: the one given, or
+    whichever is in force for the current run.
+    """
 
-    def __init__(self, page):
+    def __init__(self, page, profile=None, point_density=None, points_per_segment=POINTS_PER_SEGMENT):
         self.page = page
+        self._profile = get_profile(profile) if profile else None
+        # Points per 100 px of travel; None keeps the classic 15-35 points per move
+        self.point_density = point_density
+        self.points_per_segment = max(1, points_per_segment)
+        self._rng = np.random.default_rng()
         self._last_x = random.randint(100, 800)
         self._last_y = random.randint(100, 500)
 
+    @property
+    def profile(self):
+        return self._profile or current_profile()
+
     # ------------------------------------------------------------------ #
     #  DELAY
     # ------------------------------------------------------------------ #
@@ -36,8 +96,9 @@ class Human:
         Wait a random amount of time between actions.
         Simulates the natural pause a human takes before doing something.
         """
-        duration = random.randint(min_ms, max_ms)
-        self.page.wait_for_timeout(duration)
+        duration = self.profile.delay_ms(min_ms, max_ms)
+        if duration > 0:
+            self.page.wait_for_timeout(duration)
         return duration
 
     def short_delay(self):
@@ -95,6 +156,10 @@ class Human:
 
         self._human_mouse_move(target_x, target_y)
 
+    def move_to_point(self, x, y):
+        """Move the mouse to page coordinates along a natural curve."""
+        self._human_mouse_move(x, y)
+
     def move_randomly(self):
         """
         Move the mouse to a random spot on the page, like a bored human
@@ -112,36 +177,40 @@ class Human:
 
         self._human_mouse_move(target_x, target_y)
 
+    def _path_points(self, target_x, target_y):
+        if self.point_density is None:
+            return self.profile.mouse_steps(15, 35)
+        if self.profile.mouse_scale <= 0:
+            return 1
+        distance = np.hypot(target_x - self._last_x, target_y - self._last_y)
+        return max(2, int(distance / 100 * self.point_density * self.profile.mouse_scale))
+
     def _human_mouse_move(self, target_x, target_y):
         """
         Internal: Move the mouse from current position to target using
         a bezier-ish curve with randomized intermediate points, so the
         path looks organic instead of a straight teleport.
+        The path is computed in one go; each point is one mouse.move, and
+        the pauses between points are waited out once per segment.
         """
-        steps = random.randint(15, 35)
-        start_x, start_y = self._last_x, self._last_y
-
-        # Create a random control point for a quadratic bezier curve
-        ctrl_x = (start_x + target_x) / 2 + random.randint(-100, 100)
-        ctrl_y = (start_y + target_y) / 2 + random.randint(-80, 80)
-
-        for i in range(steps + 1):
-            t = i / steps
-            # Quadratic bezier interpolation
-            x = (1 - t) ** 2 * start_x + 2 * (1 - t) * t * ctrl_x + t ** 2 * target_x
-            y = (1 - t) ** 2 * start_y + 2 * (1 - t) * t * ctrl_y + t ** 2 * target_y
-
-            # Add tiny per-step jitter for hand tremor
-            x += random.uniform(-1.5, 1.5)
-            y += random.uniform(-1.5, 1.5)
+        steps = self._path_points(target_x, target_y)
+        if steps <= 1:
+            self.page.mouse.move(target_x, target_y)
+            self._last_x = target_x
+            self._last_y = target_y
+            return
 
-            self.page.mouse.move(x, y)
+        path, pauses = mouse_path((self._last_x, self._last_y), (target_x, target_y), steps, self._rng)
+        points = path.tolist()
+        pauses = pauses.tolist()
 
-            # Variable speed — slow at start and end, faster in the middle
-            speed_factor = math.sin(t * math.pi)  # peaks at 0.5
-            step_delay = random.randint(3, 12) - int(speed_factor * 5)
-            step_delay = max(1, step_delay)
-            self.page.wait_for_timeout(step_delay)
+        # Every point on the curve is sent (a mouse.move with steps would cut
+        # straight across); the pauses are taken together once per segment
+        for start in range(1, steps + 1, self.points_per_segment):
+            end = min(start + self.points_per_segment, steps + 1)
+            for x, y in points[start:end]:
+                self.page.mouse.move(x, y)
+            self.page.wait_for_timeout(sum(pauses[start:end]))
 
         self._last_x = target_x
         self._last_y = target_y
@@ -173,6 +242,14 @@ class Human:
         locator.click()
         self.short_delay()
 
+    def click_at(self, x, y, move_first=True):
+        """Click page coordinates, moving there along a curve first."""
+        if move_first:
+            self.move_to_point(x, y)
+            self.short_delay()
+
+        self.page.mouse.click(x, y)
+
     def double_click(self, selector, move_first=True):
         """Double-click an element with human-like behavior."""
         if move_first:
@@ -186,6 +263,36 @@ class Human:
     #  TYPING
     # ------------------------------------------------------------------ #
 
+    def _keystroke_pause(self, char, min_ms=None, max_ms=None):
+        # Randomized keystroke delay — faster for common letters,
+        # slightly slower for numbers and special chars
+        if min_ms is not None:
+            delay = self.profile.keystroke_ms(min_ms, max_ms)
+        elif char in " \t\n":
+            delay = self.profile.keystroke_ms(50, 180)
+        elif char.isalpha():
+            delay = self.profile.keystroke_ms(30, 120)
+        else:
+            delay = self.profile.keystroke_ms(60, 200)
+        if delay > 0:
+            self.page.wait_for_timeout(delay)
+
+    def _type_text(self, text, min_ms=None, max_ms=None):
+        if self.profile.keystroke_scale <= 0:
+            self.page.keyboard.type(text)
+            return
+        for char in text:
+            self.page.keyboard.type(char)
+            self._keystroke_pause(char, min_ms, max_ms)
+
+    def type_keys(self, text, min_ms=None, max_ms=None):
+        """
+        Type into whatever has focus, one key at a time. The pause after each
+        key is random in [min_ms, max_ms] (by character class when not given),
+        scaled by the profile; with keystrokes off the text goes in at once.
+        """
+        self._type_text(text, min_ms, max_ms)
+
     def type(self, selector, text, clear_first=True):
         """
         Type text into an input field character by character with
@@ -198,17 +305,7 @@ class Human:
             self.page.keyboard.press("Backspace")
             self.short_delay()
 
-        for char in text:
-            self.page.keyboard.type(char)
-            # Randomized keystroke delay — faster for common letters,
-            # slightly slower for numbers and special chars
-            if char in " \t\n":
-                delay = random.randint(50, 180)
-            elif char.isalpha():
-                delay = random.randint(30, 120)
-            else:
-                delay = random.randint(60, 200)
-            self.page.wait_for_timeout(delay)
+        self._type_text(text)
 
     def type_element(self, locator, text, clear_first=True):
         """
@@ -224,15 +321,7 @@ class Human:
             self.page.keyboard.press("Backspace")
             self.short_delay()
 
-        for char in text:
-            self.page.keyboard.type(char)
-            if char in " \t\n":
-                delay = random.randint(50, 180)
-            elif char.isalpha():
-                delay = random.randint(30, 120)
-            else:
-                delay = random.randint(60, 200)
-            self.page.wait_for_timeout(delay)
+        self._type_text(text)
 
     def fill(self, selector, text):
         """
@@ -0,0 +1,134 @@
+import os
+import time
+import asyncio
+import hashlib
+import logging
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Optional
+from fastapi import HTTPException, Request
+from dotenv import load_dotenv
+
+load_dotenv()
+
+logger = logging.getLogger(__name__)
+
+IDEMPOTENCY_HEADER = "Idempotency-Key"
+REPLAYED_HEADER = "Idempotent-Replayed"
+# How long a finished result is replayed for retries of the same key
+IDEMPOTENCY_TTL_SEC = float(os.getenv("IDEMPOTENCY_TTL_SEC", "86400"))
+# Finished entries kept; in-flight entries are never evicted
+IDEMPOTENCY_MAX_KEYS = int(os.getenv("IDEMPOTENCY_MAX_KEYS", "1000"))
+MAX_KEY_LENGTH = 255
+
+
+# Refusals (rate limited, queue full) mean the work never started
+NOT_ADMITTED_STATUS_CODES = {429, 503}
+
+
+def _was_not_admitted(task: asyncio.Task) -> bool:
+    error = task.exception()
+    return isinstance(error, HTTPException) and error.status_code in NOT_ADMITTED_STATUS_CODES
+
+
+class _Entry:
+    __slots__ = ("fingerprint", "task", "created_at", "finished_at")
+
+    def __init__(self, fingerprint: str, task: asyncio.Task):
+        self.fingerprint = fingerprint
+        self.task = task
+        self.created_at = time.time()
+        self.finished_at: Optional[float] = None
+
+
+class IdempotencyCache:
+    """
+    Remembers the outcome of requests by Idempotency-Key.
+
+    The first request with a key runs; its work is a separate task, so it finishes
+    and is recorded even if the client disconnects. A retry with the same key
+    while it runs waits for that same task; a retry afterwards gets the stored
+    result (or the same HTTP error) replayed. The work never runs twice.
+    Must be used from a single event loop.
+    """
+
+    def __init__(self, max_entries: int, ttl: float):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._entries: "OrderedDict[str, _Entry]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def _prune(self):
+        now = time.time()
+        for scope in [s for s, e in self._entries.items() if e.finished_at and now - e.finished_at > self.ttl]:
+            self._entries.pop(scope)
+
+        finished = [s for s, e in self._entries.items() if e.finished_at]
+        while len(self._entries) > self.max_entries and finished:
+            self._entries.pop(finished.pop(0))
+
+    def _finished(self, scope: str, task: asyncio.Task):
+        entry = self._entries.get(scope)
+        if entry and entry.task is task:
+            entry.finished_at = time.time()
+            if task.cancelled() or _was_not_admitted(task):
+                # Nothing ran; let a retry try again instead of replaying the refusal
+                self._entries.pop(scope, None)
+
+    async def run(self, scope: str, fingerprint: str, work: Callable[[], Awaitable[Any]]):
+        """Returns (result, replayed). Raises the original HTTPException for failed work."""
+        self._prune()
+        entry = self._entries.get(scope)
+        if entry is not None:
+            if entry.fingerprint != fingerprint:
+                raise HTTPException(
+                    status_code=422,
+                    detail=f"{IDEMPOTENCY_HEADER} was already used with a different request body"
+                )
+            self.hits += 1
+            logger.info(f"Idempotent replay for {scope} ({'in flight' if not entry.task.done() else 'finished'})")
+            try:
+                return await asyncio.shield(entry.task), True
+            except HTTPException as e:
+                raise HTTPException(
+                    status_code=e.status_code,
+                    detail=e.detail,
+                    headers={**(e.headers or {}), REPLAYED_HEADER: "true"}
+                )
+
+        self.misses += 1
+        task = asyncio.create_task(work())
+        self._entries[scope] = _Entry(fingerprint, task)
+        task.add_done_callback(lambda t: self._finished(scope, t))
+        return await asyncio.shield(task), False
+
+    def snapshot(self) -> dict:
+        in_flight = sum(1 for e in self._entries.values() if not e.task.done())
+        return {
+            "entries": len(self._entries),
+            "in_flight": in_flight,
+            "hits": self.hits,
+            "misses": self.misses,
+            "max_entries": self.max_entries,
+            "ttl_seconds": self.ttl,
+        }
+
+
+idempotency_cache = IdempotencyCache(IDEMPOTENCY_MAX_KEYS, IDEMPOTENCY_TTL_SEC)
+
+
+async def run_idempotent(request: Request, key: Optional[str], work: Callable[[], Awaitable[Any]]):
+    """
+    Runs `work` at most once per Idempotency-Key for this endpoint.
+    Without a key the work simply runs. Returns (result, replayed).
+    The key is scoped by method and path; reusing it with a different body is a 422.
+    """
+    if not key:
+        return await work(), False
+    if len(key) > MAX_KEY_LENGTH:
+        raise HTTPException(status_code=400, detail=f"{IDEMPOTENCY_HEADER} must be at most {MAX_KEY_LENGTH} characters")
+
+    body = await request.body()
+    fingerprint = hashlib.sha256(request.url.query.encode("utf-8") + b"\n" + body).hexdigest()
+    scope = f"{request.method} {request.url.path}|{key}"
+    return await idempotency_cache.run(scope, fingerprint, work)
@@ -0,0 +1,313 @@
+import os
+import sys
+import time
+import math
+import threading
+import contextlib
+from typing import Callable, Dict, List, Optional, Tuple
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+INF_BUCKET = 'le="+Inf"'
+# Seconds; spans fast DB calls up to multi-minute trades and robot runs
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300, 600, 1800)
+
+_registry: List["_Metric"] = []
+_registry_lock = threading.Lock()
+
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(names: Tuple[str, ...], values: Tuple, extra: str = "") -> str:
+    parts = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        parts.append(extra)
+    return "{" + ",".join(parts) + "}" if parts else ""
+
+
+def _format_value(value: float) -> str:
+    if math.isinf(value):
+        return "+Inf" if value > 0 else "-Inf"
+    return repr(float(value)) if not float(value).is_integer() else str(int(value))
+
+
+class _Metric:
+    kind = ""
+
+    def __init__(self, name: str, documentation: str, labels: Tuple[str, ...] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.label_names = tuple(labels)
+        self._lock = threading.Lock()
+        with _registry_lock:
+            _registry.append(self)
+
+    def _key(self, labels: Dict[str, str]) -> Tuple:
+        return tuple(str(labels.get(name, "")) for name in self.label_names)
+
+    def _samples(self) -> List[str]:
+        raise NotImplementedError
+
+    def render(self) -> str:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"]
+        lines.extend(self._samples())
+        return "\n".join(lines)
+
+
+class Counter(_Metric):
+    """A value that only goes up, per label set."""
+
+    kind = "counter"
+
+    def __init__(self, name, documentation, labels=()):
+        super().__init__(name, documentation, labels)
+        self._values: Dict[Tuple, float] = {}
+
+    def inc(self, amount: float = 1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def _samples(self):
+        with self._lock:
+            values = dict(self._values)
+        return [f"{self.name}{_format_labels(self.label_names, k)} {_format_value(v)}" for k, v in values.items()]
+
+
+class Gauge(_Metric):
+    """
+    A value that can go up and down. Either set directly, or backed by a
+    function that is called when /metrics is scraped.
+    """
+
+    kind = "gauge"
+
+    def __init__(self, name, documentation, labels=()):
+        super().__init__(name, documentation, labels)
+        self._values: Dict[Tuple, float] = {}
+        self._functions: Dict[Tuple, Callable[[], float]] = {}
+
+    def set(self, value: float, **labels):
+        with self._lock:
+            self._values[self._key(labels)] = value
+
+    def set_function(self, function: Callable[[], float], **labels):
+        with self._lock:
+            self._functions[self._key(labels)] = function
+
+    def _samples(self):
+        with self._lock:
+            values = dict(self._values)
+            functions = dict(self._functions)
+        for key, function in functions.items():
+            try:
+                values[key] = function()
+            except Exception:
+                continue
+        return [
+            f"{self.name}{_format_labels(self.label_names, k)} {_format_value(v)}"
+            for k, v in values.items() if v is not None
+        ]
+
+
+class Histogram(_Metric):
+    """Counts observations (durations, in seconds) into cumulative buckets."""
+
+    kind = "histogram"
+
+    def __init__(self, name, documentation, labels=(), buckets=DEFAULT_BUCKETS):
+        super().__init__(name, documentation, labels)
+        self.buckets = tuple(sorted(buckets))
+        # label key -> [per-bucket counts..., +Inf count, sum]
+        self._values: Dict[Tuple, List[float]] = {}
+
+    def observe(self, value: float, **labels):
+        key = self._key(labels)
+        with self._lock:
+            state = self._values.get(key)
+            if state is None:
+                state = self._values[key] = [0] * (len(self.buckets) + 1) + [0.0]
+            for index, bound in enumerate(self.buckets):
+                if value <= bound:
+                    state[index] += 1
+            state[len(self.buckets)] += 1
+            state[-1] += value
+
+    @contextlib.contextmanager
+    def time(self, **labels):
+        """Observes how long the `with` block took, even if it raised."""
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - started, **labels)
+
+    def _samples(self):
+        with self._lock:
+            values = {key: list(state) for key, state in self._values.items()}
+        lines = []
+        for key, state in values.items():
+            for bound, count in zip(self.buckets, state):
+                le = f'le="{_format_value(bound)}"'
+                lines.append(f"{self.name}_bucket{_format_labels(self.label_names, key, le)} {count}")
+            total = state[len(self.buckets)]
+            lines.append(f"{self.name}_bucket{_format_labels(self.label_names, key, INF_BUCKET)} {total}")
+            lines.append(f"{self.name}_sum{_format_labels(self.label_names, key)} {_format_value(state[-1])}")
+            lines.append(f"{self.name}_count{_format_labels(self.label_names, key)} {total}")
+        return lines
+
+
+def render_metrics() -> str:
+    """All registered metrics in the Prometheus text exposition format."""
+    with _registry_lock:
+        metrics = list(_registry)
+    return "\n".join(metric.render() for metric in metrics) + "\n"
+
+
+def process_rss_bytes() -> Optional[int]:
+    """Resident memory of this process, without psutil."""
+    if sys.platform == "win32":
+        import ctypes
+        from ctypes import wintypes
+
+        class PROCESS_MEMORY_COUNTERS(ctypes.Structure):
+            _fields_ = [
+                ("cb", wintypes.DWORD),
+                ("PageFaultCount", wintypes.DWORD),
+                ("PeakWorkingSetSize", ctypes.c_size_t),
+                ("WorkingSetSize", ctypes.c_size_t),
+                ("QuotaPeakPagedPoolUsage", ctypes.c_size_t),
+                ("QuotaPagedPoolUsage", ctypes.c_size_t),
+                ("QuotaPeakNonPagedPoolUsage", ctypes.c_size_t),
+                ("QuotaNonPagedPoolUsage", ctypes.c_size_t),
+                ("PagefileUsage", ctypes.c_size_t),
+                ("PeakPagefileUsage", ctypes.c_size_t),
+            ]
+
+        counters = PROCESS_MEMORY_COUNTERS()
+        counters.cb = ctypes.sizeof(counters)
+        kernel32, psapi = ctypes.windll.kernel32, ctypes.windll.psapi
+        kernel32.GetCurrentProcess.restype = wintypes.HANDLE
+        psapi.GetProcessMemoryInfo.argtypes = [wintypes.HANDLE, ctypes.POINTER(PROCESS_MEMORY_COUNTERS), wintypes.DWORD]
+        if not psapi.GetProcessMemoryInfo(kernel32.GetCurrentProcess(), ctypes.byref(counters), counters.cb):
+            return None
+        return counters.WorkingSetSize
+
+    with open("/proc/self/statm", "r") as f:
+        return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+
+
+# --- Server metrics ---
+
+HTTP_REQUESTS = Counter(
+    "http_requests_total", "HTTP requests handled, by route template and status code.",
+    ("method", "route", "status")
+)
+HTTP_REQUEST_SECONDS = Histogram(
+    "http_request_duration_seconds", "Time to produce an HTTP response, by route template.",
+    ("method", "route")
+)
+DRIVER_STEP_SECONDS = Histogram(
+    "driver_step_duration_seconds", "Duration of each step of a trading driver run (context, load, login, check_user, operation).",
+    ("platform", "step")
+)
+BROWSER_CONTEXTS = Gauge(
+    "browser_contexts", "Persistent browser contexts currently open, per platform.",
+    ("platform",)
+)
+TERMINATOR_TICK_SECONDS = Histogram(
+    "terminator_tick_duration_seconds", "Duration of one trade-terminator polling iteration (DB signal check plus balance read).",
+    ("platform",), buckets=(0.05, 0.1, 0.2, 0.3, 0.5, 0.75, 1, 2, 5, 10)
+)
+DB_REQUESTS = Counter(
+    "db_requests_total", "Supabase REST requests, by table, HTTP method and status code.",
+    ("table", "method", "status")
+)
+DB_REQUEST_SECONDS = Histogram(
+    "db_request_duration_seconds", "Supabase REST request latency, by table and HTTP method.",
+    ("table", "method")
+)
+UI_ACTION_SECONDS = Histogram(
+    "ui_action_duration_seconds", "Duration of shared driver UI helpers (lookup, click, fill), by outcome.",
+    ("platform", "action", "outcome"), buckets=(0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2, 4, 8, 15)
+)
+UI_DELAY_SECONDS = Counter("ui_delay_seconds_total", "Time spent in deliberate human-like random delays.")
+UI_WAIT_SECONDS = Histogram(
+    "ui_wait_duration_seconds", "Duration of condition-based UI waits, by condition and whether it was met.",
+    ("platform", "condition", "outcome"), buckets=(0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2, 4, 8)
+)
+UI_WAIT_SAVED_SECONDS = Counter(
+    "ui_wait_saved_seconds_total", "Time saved by condition-based waits against the fixed sleeps they replaced, by step.",
+    ("platform", "step")
+)
+UIROBOT_RUN_SECONDS = Histogram(
+    "uirobot_run_duration_seconds", "Duration of UiRobot runs from admission to result, by final status.",
+    ("status",)
+)
+UIROBOT_JOBS = Gauge("uirobot_jobs", "UiRobot jobs in the run queue, by state.", ("state",))
+EXECUTOR_THREADS = Gauge("executor_threads", "Threads busy or calls waiting on each named executor.", ("executor", "state"))
+PROCESS_RSS = Gauge("process_resident_memory_bytes", "Resident memory size of the server process in bytes.")
+
+
+def _scheduler_value(field: str) -> Callable[[], float]:
+    def _read():
+        from app.helper.uipath_scheduler import scheduler
+        return scheduler.snapshot()[field]
+    return _read
+
+
+def _executor_value(name: str, field: str) -> Callable[[], float]:
+    def _read():
+        from app.helper.executors import get_executor
+        return get_executor(name).snapshot()[field]
+    return _read
+
+
+def register_server_gauges(executor_names):
+    """Backs the queue, executor and memory gauges with live readings at scrape time."""
+    UIROBOT_JOBS.set_function(_scheduler_value("running"), state="running")
+    UIROBOT_JOBS.set_function(_scheduler_value("queued"), state="queued")
+    for name in executor_names:
+        EXECUTOR_THREADS.set_function(_executor_value(name, "active"), executor=name, state="active")
+        EXECUTOR_THREADS.set_function(_executor_value(name, "queued"), executor=name, state="queued")
+    PROCESS_RSS.set_function(process_rss_bytes)
+
+
+# --- Supabase instrumentation ---
+
+def _db_request_started(request):
+    request.extensions["metrics_started_at"] = time.perf_counter()
+
+
+def _db_table(path: str) -> str:
+    # PostgREST paths look like /rest/v1/<table> or /rest/v1/rpc/<function>
+    parts = [part for part in path.split("/") if part]
+    if "v1" in parts:
+        parts = parts[parts.index("v1") + 1:]
+    return "/".join(parts[:2]) if parts[:1] == ["rpc"] else (parts[0] if parts else "")
+
+
+def _db_response_received(response):
+    request = response.request
+    started = request.extensions.get("metrics_started_at")
+    table = _db_table(request.url.path)
+    DB_REQUESTS.inc(table=table, method=request.method, status=response.status_code)
+    if started is not None:
+        DB_REQUEST_SECONDS.observe(time.perf_counter() - started, table=table, method=request.method)
+
+
+def instrument_supabase(client):
+    """
+    Hooks request counting and timing into the Supabase client's PostgREST
+    session, so every table call is measured, whichever thread makes it.
+    """
+    try:
+        session = client.postgrest.session
+    except Exception:
+        return
+    hooks = session.event_hooks
+    if _db_request_started not in hooks["request"]:
+        hooks["request"].append(_db_request_started)
+        hooks["response"].append(_db_response_received)
+        session.event_hooks = hooks
@@ -0,0 +1,218 @@
+import os
+import json
+import uuid
+import shutil
+import zipfile
+import threading
+import logging
+from datetime import datetime
+from typing import Optional, Dict, Any
+from dotenv import load_dotenv
+from app.helper.version import package_base_name, package_version
+from app.helper.package_store import get_package_store
+
+load_dotenv()
+
+logger = logging.getLogger(__name__)
+
+# Run the extracted project.json instead of the .nupkg (UiRobot then skips unpacking)
+RUN_EXTRACTED = os.getenv("UIROBOT_RUN_EXTRACTED", "false").lower() in ("1", "true", "yes")
+PREPARED_MARKER = ".prepared.json"
+
+
+class PackageValidationError(Exception):
+    """Raised when a .nupkg is not a usable UiPath package."""
+
+
+_stats = {"hits": 0, "misses": 0, "prepared": 0, "failures": 0}
+_stats_lock = threading.Lock()
+# Serializes extraction per cache directory so concurrent runs don't unpack twice
+_prepare_locks: Dict[str, threading.Lock] = {}
+# package path -> (size, mtime, prepared info), so warm lookups don't touch the zip
+_resolved: Dict[str, tuple] = {}
+
+
+def cache_folder() -> str:
+    folder = os.getenv("PACKAGE_CACHE_FOLDER") or os.path.join(
+        os.getenv("PUBLISH_AUTOMATION_FOLDER") or os.getcwd(), ".extracted"
+    )
+    os.makedirs(folder, exist_ok=True)
+    return folder
+
+
+def _count(stat: str):
+    with _stats_lock:
+        _stats[stat] += 1
+
+
+def get_cache_stats() -> dict:
+    """Cache counters and the number of extracted entries. Blocking (lists the cache folder)."""
+    with _stats_lock:
+        stats = dict(_stats)
+    lookups = stats["hits"] + stats["misses"]
+    stats["hit_rate"] = round(stats["hits"] / lookups, 3) if lookups else None
+    stats["run_extracted"] = RUN_EXTRACTED
+    folder = cache_folder()
+    stats["entries"] = sum(
+        len(os.listdir(os.path.join(folder, name)))
+        for name in os.listdir(folder)
+        if os.path.isdir(os.path.join(folder, name))
+    )
+    return stats
+
+
+def _remove_dir(path: str):
+    """
+    Removes a cache directory. It is renamed out of the way first, so an rmtree
+    that stops half-way never leaves a marker-less directory at a cache path.
+    """
+    doomed = f"{path}.{uuid.uuid4().hex}.removed"
+    try:
+        os.replace(path, doomed)
+    except FileNotFoundError:
+        return
+    shutil.rmtree(doomed, ignore_errors=True)
+
+
+def _cache_dir(file_name: str, sha256: str) -> str:
+    version = package_version(file_name) or "unversioned"
+    return os.path.join(cache_folder(), package_base_name(file_name), f"{version}-{sha256[:12]}")
+
+
+def _safe_extract(archive: zipfile.ZipFile, target: str):
+    """Extracts every member, refusing entries that would land outside `target`."""
+    root = os.path.realpath(target)
+    for member in archive.infolist():
+        destination = os.path.realpath(os.path.join(target, member.filename))
+        if os.path.commonpath([root, destination]) != root:
+            raise PackageValidationError(f"Unsafe path in package: {member.filename}")
+    archive.extractall(target)
+
+
+def _validate(target: str) -> Dict[str, Any]:
+    """Checks the extracted package has a .nuspec and a project.json whose main file exists."""
+    nuspecs = [name for name in os.listdir(target) if name.endswith(".nuspec")]
+    if not nuspecs:
+        raise PackageValidationError("Package has no .nuspec manifest")
+
+    projects = []
+    for directory, _, files in os.walk(target):
+        if "project.json" in files:
+            projects.append(os.path.join(directory, "project.json"))
+    if not projects:
+        raise PackageValidationError("Package has no project.json")
+    # Top-most project.json is the one the package was built from
+    project_json = min(projects, key=lambda path: path.count(os.sep))
+
+    try:
+        with open(project_json, "r", encoding="utf-8-sig") as f:
+            project = json.load(f)
+    except Exception as e:
+        raise PackageValidationError(f"project.json is not valid JSON: {e}")
+
+    main = project.get("main")
+    if not main or not os.path.exists(os.path.join(os.path.dirname(project_json), main)):
+        raise PackageValidationError(f"project.json entry point '{main}' is missing from the package")
+
+    return {
+        "nuspec": nuspecs[0],
+        "project_json": project_json,
+        "main": main,
+        "name": project.get("name"),
+    }
+
+
+def validate_package(package_path: str):
+    """Cheap publish-time check: the file must be a readable zip. Raises PackageValidationError."""
+    try:
+        with zipfile.ZipFile(package_path) as archive:
+            broken = archive.testzip()
+    except zipfile.BadZipFile as e:
+        raise PackageValidationError(f"Not a valid .nupkg archive: {e}")
+    if broken:
+        raise PackageValidationError(f"Corrupt entry in package: {broken}")
+
+
+def prepare_package(package_path: str, sha256: str) -> Dict[str, Any]:
+    """
+    Extracts and validates a package into its versioned cache directory, once.
+    Blocking. Returns the prepared info (including the project.json path).
+    Raises PackageValidationError if the package is unusable.
+    """
+    file_name = os.path.basename(package_path)
+    target = _cache_dir(file_name, sha256)
+    marker = os.path.join(target, PREPARED_MARKER)
+
+    with _stats_lock:
+        lock = _prepare_locks.setdefault(target, threading.Lock())
+
+    with lock:
+        if os.path.exists(marker):
+            with open(marker, "r", encoding="utf-8") as f:
+                return json.load(f)
+
+        validate_package(package_path)
+        os.makedirs(os.path.dirname(target), exist_ok=True)
+        staging = f"{target}.{uuid.uuid4().hex}.tmp"
+        try:
+            with zipfile.ZipFile(package_path) as archive:
+                _safe_extract(archive, staging)
+            info = _validate(staging)
+            # Store paths as they will be after the rename
+            info["project_json"] = os.path.join(target, os.path.relpath(info["project_json"], staging))
+            info.update({"package": file_name, "sha256": sha256, "prepared_at": datetime.now().isoformat()})
+            with open(os.path.join(staging, PREPARED_MARKER), "w", encoding="utf-8") as f:
+                json.dump(info, f, indent=2)
+            # Left over from an interrupted removal (no marker): os.replace can't overwrite it
+            _remove_dir(target)
+            os.replace(staging, target)
+        except Exception:
+            _count("failures")
+            shutil.rmtree(staging, ignore_errors=True)
+            raise
+
+    _count("prepared")
+    logger.info(f"Prepared {file_name} in {target}")
+    return info
+
+
+def resolve_run_target(package_path: str) -> str:
+    """
+    Returns what UiRobot should be given for a package: the prepared project.json
+    when UIROBOT_RUN_EXTRACTED is on and the package can be prepared, otherwise
+    the .nupkg itself. Blocking on a cache miss (the package is extracted).
+    """
+    if not RUN_EXTRACTED or not os.path.exists(package_path):
+        return package_path
+
+    stat = os.stat(package_path)
+    cached = _resolved.get(package_path)
+    if cached and cached[:2] == (stat.st_size, stat.st_mtime) and os.path.exists(cached[2]["project_json"]):
+        _count("hits")
+        return cached[2]["project_json"]
+
+    try:
+        store = get_package_store(os.path.dirname(package_path))
+        sha256 = store.local_hash(os.path.basename(package_path))
+        already_prepared = os.path.exists(os.path.join(_cache_dir(os.path.basename(package_path), sha256), PREPARED_MARKER))
+        _count("hits" if already_prepared else "misses")
+        info = prepare_package(package_path, sha256)
+    except Exception as e:
+        logger.error(f"Could not prepare {package_path}, running the package directly: {e}")
+        return package_path
+
+    _resolved[package_path] = (stat.st_size, stat.st_mtime, info)
+    return info["project_json"]
+
+
+def remove_prepared(file_name: str):
+    """Deletes every extracted copy of a package, e.g. after it was evicted."""
+    folder = os.path.join(cache_folder(), package_base_name(file_name))
+    prefix = f"{package_version(file_name) or 'unversioned'}-"
+    if not os.path.isdir(folder):
+        return
+    for name in os.listdir(folder):
+        if name.startswith(prefix):
+            _remove_dir(os.path.join(folder, name))
+    for path in [p for p in _resolved if os.path.basename(p) == file_name]:
+        _resolved.pop(path, None)
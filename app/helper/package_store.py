@@ -0,0 +1,163 @@
+import os
+import json
+import uuid
+import hashlib
+import threading
+import logging
+from datetime import datetime
+from typing import Optional, Tuple, Dict, Any
+import aiofiles
+
+logger = logging.getLogger(__name__)
+
+PACKAGE_CHUNK_SIZE = 1024 * 1024
+# Lives next to the packages so the cache follows the publish folder around
+PACKAGE_INDEX_FILE = ".package-index.json"
+
+
+class PackageStore:
+    """
+    Content-addressed view of the publish folder.
+
+    Packages are keyed by the SHA-256 of their bytes. A small JSON index in the
+    publish folder remembers, per hash, the automations row it produced, and per
+    file name, which hash was last uploaded to Supabase Storage. That lets a
+    repeated upload be recognised without listing the bucket or querying the
+    catalog again.
+    """
+
+    def __init__(self, folder: str):
+        self.folder = folder
+        self.index_path = os.path.join(folder, PACKAGE_INDEX_FILE)
+        self._lock = threading.Lock()
+        self._index = self._load()
+
+    def _load(self) -> Dict[str, Any]:
+        try:
+            with open(self.index_path, "r", encoding="utf-8") as f:
+                index = json.load(f)
+        except FileNotFoundError:
+            index = {}
+        except Exception as e:
+            logger.error(f"Could not read package index {self.index_path}: {e}")
+            index = {}
+        index.setdefault("packages", {})
+        index.setdefault("storage", {})
+        return index
+
+    def _save(self):
+        tmp_path = f"{self.index_path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(self._index, f, indent=2, default=str)
+        os.replace(tmp_path, self.index_path)
+
+    async def receive(self, upload) -> Tuple[str, str, int]:
+        """
+        Streams an upload into a temporary file in the publish folder, hashing the
+        chunks as they arrive. Returns (temp_path, sha256, size).
+        """
+        temp_path = os.path.join(self.folder, f".upload-{uuid.uuid4().hex}.part")
+        digest = hashlib.sha256()
+        size = 0
+        try:
+            async with aiofiles.open(temp_path, "wb") as out_file:
+                while content := await upload.read(PACKAGE_CHUNK_SIZE):
+                    digest.update(content)
+                    size += len(content)
+                    await out_file.write(content)
+        except Exception:
+            discard(temp_path)
+            raise
+        return temp_path, digest.hexdigest(), size
+
+    def lookup(self, sha256: str) -> Optional[Dict[str, Any]]:
+        """Returns the cached automations row for a package hash, if its file is still on disk."""
+        with self._lock:
+            entry = self._index["packages"].get(sha256)
+        if not entry or not os.path.exists(os.path.join(self.folder, entry["file_name"])):
+            return None
+        return entry.get("automation")
+
+    def remember(self, sha256: str, file_name: str, size: int, automation: Dict[str, Any]):
+        """Records the automations row created for a package."""
+        with self._lock:
+            # The file on disk now holds these bytes; older hashes under the same name are stale
+            packages = self._index["packages"]
+            for stale in [h for h, e in packages.items() if e["file_name"] == file_name and h != sha256]:
+                packages.pop(stale)
+            packages[sha256] = {
+                "file_name": file_name,
+                "size": size,
+                "automation": automation,
+                "recorded_at": datetime.now().isoformat(),
+            }
+            self._save()
+
+    def local_hash(self, file_name: str) -> Optional[str]:
+        """
+        Hash of the package on disk under `file_name`. Taken from the index when the
+        recorded size still matches the file, otherwise computed from the file.
+        """
+        path = os.path.join(self.folder, file_name)
+        if not os.path.exists(path):
+            return None
+        size = os.path.getsize(path)
+        with self._lock:
+            for sha256, entry in self._index["packages"].items():
+                if entry["file_name"] == file_name and entry.get("size") == size:
+                    return sha256
+        return hash_file(path)
+
+    def forget(self, file_name: str):
+        """Drops index entries for a package file that was removed from disk."""
+        with self._lock:
+            packages = self._index["packages"]
+            for stale in [h for h, e in packages.items() if e["file_name"] == file_name]:
+                packages.pop(stale)
+            self._save()
+
+    def is_stored(self, file_name: str, sha256: str) -> bool:
+        """True if Storage already holds exactly these bytes under `file_name`."""
+        with self._lock:
+            return self._index["storage"].get(file_name) == sha256
+
+    def stored_hash(self, file_name: str) -> Optional[str]:
+        with self._lock:
+            return self._index["storage"].get(file_name)
+
+    def mark_stored(self, file_name: str, sha256: str):
+        with self._lock:
+            self._index["storage"][file_name] = sha256
+            self._save()
+
+
+def hash_file(path: str) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        while chunk := f.read(PACKAGE_CHUNK_SIZE):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def discard(path: str):
+    try:
+        os.remove(path)
+    except FileNotFoundError:
+        pass
+    except Exception as e:
+        logger.warning(f"Could not remove {path}: {e}")
+
+
+_stores: Dict[str, PackageStore] = {}
+_stores_lock = threading.Lock()
+
+
+def get_package_store(folder: str) -> PackageStore:
+    """Returns the store for a publish folder, loading its index once."""
+    folder = os.path.abspath(folder)
+    with _stores_lock:
+        store = _stores.get(folder)
+        if store is None:
+            store = PackageStore(folder)
+            _stores[folder] = store
+        return store
@@ -0,0 +1,252 @@
+import os
+import time
+import uuid
+import asyncio
+import hashlib
+import logging
+from typing import Dict, Any, List, Optional
+from urllib.parse import quote
+import httpx
+from dotenv import load_dotenv
+from app.helper.package_store import get_package_store, discard, PACKAGE_CHUNK_SIZE
+from app.helper.package_cache import prepare_package, remove_prepared
+from app.helper.executors import run_in
+from app.helper.storage_upload import storage_url, storage_headers
+from app.helper.version import package_version, version_sort_key
+from app.helper.automation_index import fetch_catalog, load_catalog, latest_per_package
+
+load_dotenv()
+
+logger = logging.getLogger(__name__)
+
+PACKAGE_BUCKET = "automation"
+SYNC_ENABLED = os.getenv("PACKAGE_SYNC_ENABLED", "true").lower() in ("1", "true", "yes")
+SYNC_INTERVAL_SEC = float(os.getenv("PACKAGE_SYNC_INTERVAL_SEC", "300"))
+SYNC_CONCURRENCY = max(1, int(os.getenv("PACKAGE_SYNC_CONCURRENCY", "3")))
+# 0 disables eviction; otherwise old versions are removed until the folder fits
+DISK_BUDGET_BYTES = int(float(os.getenv("PACKAGE_DISK_BUDGET_MB", "0")) * 1024 * 1024)
+DOWNLOAD_TIMEOUT_SEC = float(os.getenv("PACKAGE_DOWNLOAD_TIMEOUT_SEC", "300"))
+
+
+class PackageIntegrityError(Exception):
+    """Raised when a downloaded package does not match the catalog's hash."""
+
+
+_status: Dict[str, Any] = {
+    "enabled": SYNC_ENABLED,
+    "running": False,
+    "last_started_at": None,
+    "last_finished_at": None,
+    "last_duration_seconds": None,
+    "downloaded": [],
+    "evicted": [],
+    "errors": {},
+    "local_bytes": 0,
+    "disk_budget_bytes": DISK_BUDGET_BYTES,
+}
+_sync_lock: Optional[asyncio.Lock] = None
+# Packages being fetched right now, so a run and the sync loop share one download
+_in_flight: Dict[str, asyncio.Task] = {}
+
+
+def get_sync_status() -> dict:
+    return dict(_status)
+
+
+def _publish_folder() -> Optional[str]:
+    folder = os.getenv("PUBLISH_AUTOMATION_FOLDER")
+    if folder:
+        os.makedirs(folder, exist_ok=True)
+    return folder
+
+
+def download_package(folder: str, file_name: str, expected_sha256: Optional[str] = None) -> str:
+    """
+    Downloads a package from Storage into `folder`. Blocking.
+    The file is written under a temporary name, checked against `expected_sha256`
+    and only then renamed into place, so a run never sees a partial package.
+    Returns the SHA-256 of the downloaded bytes.
+    """
+    temp_path = os.path.join(folder, f".download-{uuid.uuid4().hex}.part")
+    digest = hashlib.sha256()
+    try:
+        with httpx.Client(headers=storage_headers(), timeout=DOWNLOAD_TIMEOUT_SEC) as client:
+            url = f"{storage_url()}/object/{PACKAGE_BUCKET}/{quote(file_name)}"
+            with client.stream("GET", url) as response:
+                response.raise_for_status()
+                with open(temp_path, "wb") as out_file:
+                    for chunk in response.iter_bytes(PACKAGE_CHUNK_SIZE):
+                        digest.update(chunk)
+                        out_file.write(chunk)
+
+        sha256 = digest.hexdigest()
+        if expected_sha256 and sha256 != expected_sha256:
+            raise PackageIntegrityError(f"{file_name}: expected sha256 {expected_sha256}, got {sha256}")
+        os.replace(temp_path, os.path.join(folder, file_name))
+        return sha256
+    except Exception:
+        discard(temp_path)
+        raise
+
+
+def _remember(store, sha256: str, file_name: str, row: Dict[str, Any]):
+    store.remember(sha256, file_name, os.path.getsize(os.path.join(store.folder, file_name)), row)
+
+
+def _local_hash(store, file_name: str, row: Dict[str, Any]) -> Optional[str]:
+    """
+    Hash of the local copy of a package. Blocking. When the copy matches the row,
+    the hash is recorded even if the row has none (published before sha256
+    existed), so the next check is a size comparison instead of a full read.
+    """
+    local = store.local_hash(file_name)
+    expected = row.get("sha256")
+    if local is not None and (not expected or local == expected) and store.lookup(local) is None:
+        _remember(store, local, file_name, row)
+    return local
+
+
+async def ensure_local_package(row: Dict[str, Any]) -> bool:
+    """
+    Makes sure the package of an automations row is present (and intact) in the
+    publish folder, downloading it if needed. Concurrent callers for the same
+    package wait on a single download. Returns False if the catalog's package
+    is not on disk and could not be fetched (the reason is in the sync status
+    errors). Without a publish folder there is nothing to fetch into: True.
+    """
+    folder = _publish_folder()
+    file_name = row.get("file_name")
+    if not folder:
+        return True
+    if not file_name:
+        return False
+
+    store = get_package_store(folder)
+    expected = row.get("sha256")
+    local = await run_in("io", _local_hash, store, file_name, row)
+    if local is not None and (not expected or local == expected):
+        return True
+
+    task = _in_flight.get(file_name)
+    if task is None:
+        async def _fetch():
+            try:
+                sha256 = await run_in("io", download_package, folder, file_name, expected)
+                await run_in("io", _remember, store, sha256, file_name, row)
+                try:
+                    await run_in("io", prepare_package, os.path.join(folder, file_name), sha256)
+                except Exception as e:
+                    logger.warning(f"Fetched {file_name} but could not prepare it: {e}")
+                _status["downloaded"] = (_status["downloaded"] + [file_name])[-50:]
+                _status["errors"].pop(file_name, None)
+                logger.info(f"Fetched package {file_name} ({sha256[:12]})")
+            finally:
+                _in_flight.pop(file_name, None)
+
+        task = asyncio.create_task(_fetch())
+        _in_flight[file_name] = task
+
+    try:
+        await asyncio.shield(task)
+        return True
+    except Exception as e:
+        logger.error(f"Failed to fetch package {file_name}: {e}")
+        _status["errors"][file_name] = str(e)
+        return False
+
+
+def _evict(folder: str, rows: List[Dict[str, Any]], protected: set) -> List[str]:
+    """
+    Removes packages until the folder fits DISK_BUDGET_BYTES. Blocking.
+    Files not in the catalog go first, then older versions (oldest first); the
+    latest version of each package and anything in `protected` are never removed.
+    """
+    files = {
+        name: os.path.getsize(os.path.join(folder, name))
+        for name in os.listdir(folder)
+        if name.endswith(".nupkg") and os.path.isfile(os.path.join(folder, name))
+    }
+    total = sum(files.values())
+    _status["local_bytes"] = total
+    if not DISK_BUDGET_BYTES or total <= DISK_BUDGET_BYTES:
+        return []
+
+    catalog = {row.get("file_name") for row in rows}
+    candidates = [name for name in files if name not in protected]
+    candidates.sort(key=lambda name: (name in catalog, version_sort_key(package_version(name))))
+
+    store = get_package_store(folder)
+    evicted = []
+    for name in candidates:
+        if total <= DISK_BUDGET_BYTES:
+            break
+        discard(os.path.join(folder, name))
+        store.forget(name)
+        remove_prepared(name)
+        total -= files[name]
+        evicted.append(name)
+        logger.info(f"Evicted package {name} to stay under the disk budget")
+
+    _status["local_bytes"] = total
+    if total > DISK_BUDGET_BYTES:
+        logger.warning(f"Packages still use {total} bytes, over the {DISK_BUDGET_BYTES} byte budget")
+    return evicted
+
+
+async def sync_packages() -> dict:
+    """
+    One sync pass: fetches the latest version of every package in the catalog
+    that is missing or different locally (SYNC_CONCURRENCY at a time), then
+    evicts old versions if the folder is over its disk budget.
+    """
+    global _sync_lock
+    if _sync_lock is None:
+        _sync_lock = asyncio.Lock()
+
+    folder = _publish_folder()
+    if not folder:
+        return get_sync_status()
+
+    async with _sync_lock:
+        started = time.monotonic()
+        _status["running"] = True
+        _status["last_started_at"] = time.time()
+        try:
+            rows = await run_in("db", fetch_catalog)
+            # The same read keeps the latest-version index current
+            load_catalog(rows)
+            latest = list(latest_per_package(rows).values())
+
+            semaphore = asyncio.Semaphore(SYNC_CONCURRENCY)
+
+            async def _bounded(row):
+                async with semaphore:
+                    await ensure_local_package(row)
+
+            await asyncio.gather(*(_bounded(row) for row in latest))
+
+            # Don't pull a package out from under a robot that is running it
+            from app.helper.uipath import list_uipath_jobs
+            protected = {row.get("file_name") for row in latest}
+            protected |= {os.path.basename(job["automation"]) for job in list_uipath_jobs()}
+            evicted = await run_in("io", _evict, folder, rows, protected)
+            _status["evicted"] = (_status["evicted"] + evicted)[-50:]
+        except Exception as e:
+            logger.error(f"Package sync failed: {e}")
+            _status["errors"]["_sync"] = str(e)
+        finally:
+            _status["running"] = False
+            _status["last_finished_at"] = time.time()
+            _status["last_duration_seconds"] = round(time.monotonic() - started, 3)
+
+    return get_sync_status()
+
+
+async def run_package_sync_loop():
+    """Background task started with the server: syncs now and then every SYNC_INTERVAL_SEC."""
+    if not SYNC_ENABLED:
+        print("Package sync is disabled (PACKAGE_SYNC_ENABLED=false)")
+        return
+    while True:
+        await sync_packages()
+        await asyncio.sleep(SYNC_INTERVAL_SEC)
@@ -0,0 +1,140 @@
+import os
+import sys
+import json
+import signal
+import threading
+import subprocess
+import logging
+from datetime import datetime
+from app.helper.run_log import log_folder
+
+logger = logging.getLogger(__name__)
+
+IS_WINDOWS = sys.platform == "win32"
+
+_registry_lock = threading.Lock()
+
+
+def _registry_path() -> str:
+    """JSON file recording the robots this server has started and not yet reaped."""
+    return os.path.join(log_folder(), "running-processes.json")
+
+
+def process_group_kwargs() -> dict:
+    """
+    Popen keyword arguments that start the child as the root of its own process
+    group, so the whole tree can be killed together later.
+    """
+    if IS_WINDOWS:
+        return {"creationflags": subprocess.CREATE_NEW_PROCESS_GROUP}
+    return {"start_new_session": True}
+
+
+def kill_process_tree(pid: int) -> bool:
+    """
+    Force-kills a process and all of its descendants.
+    Note: executors launched by the UiPath Robot service are not children of
+    UiRobot.exe and are not reached by this; it stops what this server spawned.
+    """
+    try:
+        if IS_WINDOWS:
+            result = subprocess.run(
+                ["taskkill", "/PID", str(pid), "/T", "/F"],
+                capture_output=True, text=True, check=False
+            )
+            if result.returncode != 0:
+                logger.warning(f"taskkill for PID {pid} returned {result.returncode}: {result.stderr.strip()}")
+                return False
+        else:
+            # The child was started with start_new_session=True, so its PGID equals its PID
+            os.killpg(pid, signal.SIGKILL)
+        logger.info(f"Killed process tree rooted at PID {pid}")
+        return True
+    except ProcessLookupError:
+        return False
+    except Exception as e:
+        logger.error(f"Failed to kill process tree for PID {pid}: {e}")
+        return False
+
+
+def process_matches(pid: int, image: str) -> bool:
+    """True if `pid` is alive and running the executable named `image`."""
+    if not image:
+        return False
+    try:
+        if IS_WINDOWS:
+            result = subprocess.run(
+                ["tasklist", "/FI", f"PID eq {pid}", "/FO", "CSV", "/NH"],
+                capture_output=True, text=True, check=False
+            )
+            line = result.stdout.strip()
+            if not line.startswith('"'):
+                return False
+            return line.split('","')[0].strip('"').lower() == image.lower()
+
+        # Compare against every argv entry so interpreted stand-ins (sh script.exe) match too
+        with open(f"/proc/{pid}/cmdline", "rb") as f:
+            argv = f.read().decode("utf-8", errors="replace").split("\0")
+        return any(os.path.basename(arg) == image for arg in argv if arg)
+    except Exception:
+        return False
+
+
+def _load_registry() -> dict:
+    try:
+        with open(_registry_path(), "r", encoding="utf-8") as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return {}
+    except Exception as e:
+        logger.error(f"Could not read process registry: {e}")
+        return {}
+
+
+def _save_registry(registry: dict):
+    path = _registry_path()
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(registry, f, indent=2)
+    os.replace(tmp_path, path)
+
+
+def register_process(pid: int, executable: str, job_id: str = None):
+    """Records a spawned robot so it can be reaped if the server dies while it runs."""
+    with _registry_lock:
+        registry = _load_registry()
+        registry[str(pid)] = {
+            "image": os.path.basename(executable),
+            "job_id": job_id,
+            "started_at": datetime.now().isoformat(),
+        }
+        _save_registry(registry)
+
+
+def unregister_process(pid: int):
+    with _registry_lock:
+        registry = _load_registry()
+        if registry.pop(str(pid), None) is not None:
+            _save_registry(registry)
+
+
+def reap_orphaned_processes() -> list:
+    """
+    Kills robots left running by a previous server instance. Called on startup.
+    A recorded PID is only killed if it is still alive and still has the same
+    executable name, so a PID reused by an unrelated process is left alone.
+    """
+    with _registry_lock:
+        registry = _load_registry()
+        reaped = []
+        for pid_text, info in registry.items():
+            pid = int(pid_text)
+            image = info.get("image")
+            if process_matches(pid, image):
+                print(f"Found orphaned robot process {pid} ({image}) from job {info.get('job_id')}. Killing...")
+                kill_process_tree(pid)
+                reaped.append(pid)
+
+        if registry:
+            _save_registry({})
+        return reaped
@@ -0,0 +1,119 @@
+import os
+import uuid
+import asyncio
+import logging
+from collections import OrderedDict, deque
+from datetime import datetime
+from typing import Optional
+
+logger = logging.getLogger(__name__)
+
+# Lines kept in memory per run; everything else lives only in the log file
+RUN_LOG_MAX_LINES = int(os.getenv("RUN_LOG_MAX_LINES", "500"))
+# Longest single line kept in memory / sent to clients
+RUN_LOG_MAX_LINE_CHARS = int(os.getenv("RUN_LOG_MAX_LINE_CHARS", "4000"))
+# Finished runs kept around so clients can still fetch their tail
+RUN_LOG_HISTORY = int(os.getenv("RUN_LOG_HISTORY", "100"))
+
+
+def log_folder() -> str:
+    folder = os.getenv("UIROBOT_LOG_FOLDER") or os.path.join(os.getcwd(), "logs", "uipath")
+    os.makedirs(folder, exist_ok=True)
+    return folder
+
+
+class RunLog:
+    """
+    Output of one automation run: a bounded ring buffer of recent lines for live
+    viewers plus the complete output appended to a log file on disk.
+    Viewers that fall behind the ring buffer skip ahead instead of holding memory.
+    Must be used from a single event loop.
+    """
+
+    def __init__(self, job_id: str = None, label: str = None):
+        self.job_id = job_id or uuid.uuid4().hex
+        self.label = label
+        self.started_at = datetime.now()
+        self.lines = deque(maxlen=RUN_LOG_MAX_LINES)
+        self.line_count = 0
+        self.finished = False
+        self.result = None
+        self.task = None
+        self.log_path = os.path.join(log_folder(), f"{self.started_at:%Y%m%d-%H%M%S}-{self.job_id}.log")
+        self._file = open(self.log_path, "a", encoding="utf-8", errors="replace")
+        self._changed = asyncio.Event()
+
+    def append(self, stream: str, line: str):
+        """Records one output line and wakes up live viewers."""
+        line = line.rstrip("\r\n")
+        try:
+            self._file.write(f"[{stream}] {line}\n")
+        except Exception as e:
+            logger.error(f"Failed to write run log {self.log_path}: {e}")
+
+        if len(line) > RUN_LOG_MAX_LINE_CHARS:
+            line = line[:RUN_LOG_MAX_LINE_CHARS] + " …[truncated]"
+        self.line_count += 1
+        self.lines.append({"seq": self.line_count, "stream": stream, "line": line})
+        self._notify()
+
+    def tail(self, stream: str) -> str:
+        """The buffered lines of one stream, joined; older lines are only in the log file."""
+        return "\n".join(e["line"] for e in self.lines if e["stream"] == stream)
+
+    def finish(self, result: dict):
+        """Marks the run finished, closes the log file and wakes up live viewers."""
+        self.finished = True
+        self.result = result
+        try:
+            self._file.close()
+        except Exception:
+            pass
+        self._notify()
+
+    def _notify(self):
+        self._changed.set()
+        self._changed = asyncio.Event()
+
+    async def follow(self):
+        """
+        Yields ('line', event) for the buffered lines and then each new line,
+        followed by ('result', result) once the run is over. If the viewer falls
+        behind the ring buffer, a ('skipped', {"lines": n}) event marks the gap.
+        """
+        last_seq = 0
+        while True:
+            changed = self._changed
+            pending = [e for e in self.lines if e["seq"] > last_seq]
+            if pending and pending[0]["seq"] > last_seq + 1 and last_seq:
+                yield ("skipped", {"lines": pending[0]["seq"] - last_seq - 1})
+            for event in pending:
+                last_seq = event["seq"]
+                yield ("line", event)
+
+            if self.finished and last_seq >= self.line_count:
+                yield ("result", self.result)
+                return
+            if last_seq >= self.line_count:
+                await changed.wait()
+
+
+_run_logs: "OrderedDict[str, RunLog]" = OrderedDict()
+
+
+def create_run_log(label: str = None) -> RunLog:
+    """Creates and registers a RunLog, forgetting the oldest finished runs beyond RUN_LOG_HISTORY."""
+    run_log = RunLog(label=label)
+    _run_logs[run_log.job_id] = run_log
+
+    while len(_run_logs) > RUN_LOG_HISTORY:
+        oldest_id = next((job_id for job_id, log in _run_logs.items() if log.finished), None)
+        if oldest_id is None:
+            break
+        _run_logs.pop(oldest_id)
+
+    return run_log
+
+
+def get_run_log(job_id: str) -> Optional[RunLog]:
+    return _run_logs.get(job_id)
@@ -0,0 +1,232 @@
+import os
+import base64
+import time
+import threading
+import logging
+from typing import Callable, Dict, Optional
+from urllib.parse import quote
+import httpx
+from dotenv import load_dotenv
+
+load_dotenv()
+
+logger = logging.getLogger(__name__)
+
+# Supabase requires TUS chunks of exactly 6 MB (the last one may be shorter)
+TUS_CHUNK_SIZE = 6 * 1024 * 1024
+# Files at least this large use the resumable endpoint; smaller ones a single streamed POST
+RESUMABLE_THRESHOLD = int(float(os.getenv("STORAGE_RESUMABLE_THRESHOLD_MB", "6")) * 1024 * 1024)
+# Attempts per chunk before the upload is given up (it can still be resumed later)
+UPLOAD_RETRIES = int(os.getenv("STORAGE_UPLOAD_RETRIES", "3"))
+UPLOAD_TIMEOUT_SEC = float(os.getenv("STORAGE_UPLOAD_TIMEOUT_SEC", "120"))
+
+ProgressCallback = Callable[[int, int], None]
+
+
+class StorageUploadError(Exception):
+    """Raised when Storage rejects an upload."""
+
+    def __init__(self, status_code: int, message: str):
+        super().__init__(f"Storage upload failed ({status_code}): {message}")
+        self.status_code = status_code
+
+    @property
+    def is_duplicate(self) -> bool:
+        return self.status_code == 409 or "already exists" in str(self).lower()
+
+
+# --- Progress tracking ---
+_uploads: Dict[str, dict] = {}
+_progress_lock = threading.Lock()
+
+
+def _report(object_name: str, sent: int, total: int, state: str = "uploading"):
+    with _progress_lock:
+        _uploads[object_name] = {
+            "object": object_name,
+            "sent": sent,
+            "total": total,
+            "percent": round(100.0 * sent / total, 1) if total else 100.0,
+            "state": state,
+            "updated_at": time.time(),
+        }
+
+
+def get_upload_progress() -> list:
+    """Uploads in progress and recently finished, for the uploads endpoint."""
+    with _progress_lock:
+        return list(_uploads.values())
+
+
+# Resumable upload URLs by (bucket, object, size), so a failed upload picks up where it stopped
+_pending_uploads: Dict[tuple, str] = {}
+
+
+def storage_url() -> str:
+    return os.getenv("PUBLIC_SUPABASE_URL", "").rstrip("/") + "/storage/v1"
+
+
+def storage_headers() -> dict:
+    key = os.getenv("SUPABASE_SERVICE_SECRET_KEY", "")
+    return {"apikey": key, "Authorization": f"Bearer {key}"}
+
+
+def _read_chunks(path: str, start: int = 0, chunk_size: int = 1024 * 1024, on_chunk: Callable[[int], None] = None):
+    with open(path, "rb") as f:
+        f.seek(start)
+        while chunk := f.read(chunk_size):
+            if on_chunk:
+                on_chunk(len(chunk))
+            yield chunk
+
+
+def _upload_simple(client: httpx.Client, path: str, bucket: str, object_name: str,
+                   size: int, upsert: bool, progress: ProgressCallback):
+    """Streams the file as the body of one request; memory use stays at one chunk."""
+    sent = 0
+
+    def _on_chunk(n):
+        nonlocal sent
+        sent += n
+        progress(sent, size)
+
+    response = client.post(
+        f"{storage_url()}/object/{bucket}/{quote(object_name)}",
+        content=_read_chunks(path, on_chunk=_on_chunk),
+        headers={
+            "Content-Type": "application/octet-stream",
+            "Content-Length": str(size),
+            "x-upsert": "true" if upsert else "false",
+        },
+    )
+    if response.status_code >= 300:
+        raise StorageUploadError(response.status_code, response.text)
+
+
+def _tus_create(client: httpx.Client, bucket: str, object_name: str, size: int, upsert: bool) -> str:
+    def _b64(value: str) -> str:
+        return base64.b64encode(value.encode("utf-8")).decode("ascii")
+
+    metadata = ",".join([
+        f"bucketName {_b64(bucket)}",
+        f"objectName {_b64(object_name)}",
+        f"contentType {_b64('application/octet-stream')}",
+    ])
+    response = client.post(
+        f"{storage_url()}/upload/resumable",
+        headers={
+            "Tus-Resumable": "1.0.0",
+            "Upload-Length": str(size),
+            "Upload-Metadata": metadata,
+            "x-upsert": "true" if upsert else "false",
+        },
+    )
+    if response.status_code != 201:
+        raise StorageUploadError(response.status_code, response.text)
+    location = response.headers["Location"]
+    return location if location.startswith("http") else str(httpx.URL(storage_url()).join(location))
+
+
+def _tus_offset(client: httpx.Client, location: str) -> Optional[int]:
+    """Server-side offset of an upload, or None if the server no longer knows it."""
+    response = client.head(location, headers={"Tus-Resumable": "1.0.0"})
+    if response.status_code != 200:
+        return None
+    return int(response.headers.get("Upload-Offset", "0"))
+
+
+def _upload_resumable(client: httpx.Client, path: str, bucket: str, object_name: str,
+                      size: int, upsert: bool, progress: ProgressCallback):
+    """Uploads with the TUS protocol in 6 MB chunks, resuming from the server's offset after errors."""
+    pending_key = (bucket, object_name, size)
+    location = _pending_uploads.get(pending_key)
+    offset = _tus_offset(client, location) if location else None
+    if offset is None:
+        location = _tus_create(client, bucket, object_name, size, upsert)
+        offset = 0
+    else:
+        logger.info(f"Resuming upload of {object_name} at {offset}/{size} bytes")
+    _pending_uploads[pending_key] = location
+    progress(offset, size)
+
+    with open(path, "rb") as f:
+        attempts = 0
+        resync = False
+        while offset < size:
+            try:
+                if resync:
+                    # The dropped request may have stored part of the chunk
+                    resync = False
+                    server_offset = _tus_offset(client, location)
+                    if server_offset is not None and server_offset != offset:
+                        offset = server_offset
+                        continue
+                f.seek(offset)
+                chunk = f.read(TUS_CHUNK_SIZE)
+                response = client.patch(
+                    location,
+                    content=chunk,
+                    headers={
+                        "Tus-Resumable": "1.0.0",
+                        "Upload-Offset": str(offset),
+                        "Content-Type": "application/offset+octet-stream",
+                    },
+                )
+                if response.status_code == 409 and "already exists" not in response.text.lower():
+                    # Offset mismatch: ask the server where it actually is
+                    server_offset = _tus_offset(client, location)
+                    if server_offset is None or server_offset == offset:
+                        raise StorageUploadError(response.status_code, response.text)
+                    offset = server_offset
+                    continue
+                if response.status_code != 204:
+                    raise StorageUploadError(response.status_code, response.text)
+            except httpx.TransportError as e:
+                attempts += 1
+                if attempts >= UPLOAD_RETRIES:
+                    raise
+                logger.warning(f"Chunk upload of {object_name} failed ({e}); retrying")
+                time.sleep(min(2 ** attempts, 10))
+                resync = True
+                continue
+
+            attempts = 0
+            offset = int(response.headers.get("Upload-Offset", offset + len(chunk)))
+            progress(offset, size)
+
+    _pending_uploads.pop(pending_key, None)
+
+
+def upload_package(path: str, bucket: str, object_name: str, upsert: bool = False,
+                   progress: ProgressCallback = None):
+    """
+    Uploads a local file to Supabase Storage without loading it into memory.
+    Blocking: call it from a worker thread. Large files go through the resumable
+    (TUS) endpoint, so a dropped connection only costs the current chunk.
+    Raises StorageUploadError if Storage rejects the upload.
+    """
+    size = os.path.getsize(path)
+    last_logged = [-1]
+
+    def _progress(sent: int, total: int):
+        _report(object_name, sent, total)
+        if progress:
+            progress(sent, total)
+        decile = int(10 * sent / total) if total else 10
+        if decile != last_logged[0]:
+            last_logged[0] = decile
+            logger.info(f"Uploading {object_name}: {sent}/{total} bytes")
+
+    headers = storage_headers()
+    try:
+        with httpx.Client(headers=headers, timeout=UPLOAD_TIMEOUT_SEC) as client:
+            if size >= RESUMABLE_THRESHOLD:
+                _upload_resumable(client, path, bucket, object_name, size, upsert, _progress)
+            else:
+                _upload_simple(client, path, bucket, object_name, size, upsert, _progress)
+    except Exception:
+        with _progress_lock:
+            sent = _uploads.get(object_name, {}).get("sent", 0)
+        _report(object_name, sent, size, state="failed")
+        raise
+    _report(object_name, size, size, state="done")
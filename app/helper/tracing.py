@@ -0,0 +1,181 @@
+import os
+import json
+import time
+import uuid
+import threading
+import contextlib
+import contextvars
+import functools
+import logging
+from typing import Any, Dict, List, Optional
+from dotenv import load_dotenv
+from app.helper.metrics import DRIVER_STEP_SECONDS
+
+load_dotenv()
+
+logger = logging.getLogger(__name__)
+
+SERVICE_NAME = os.getenv("TRACE_SERVICE_NAME", "harmony-orchestrator")
+# When set, every finished trace is appended to this file as one OTLP/JSON line
+EXPORT_FILE = os.getenv("TRACE_EXPORT_FILE")
+
+_current_span: contextvars.ContextVar[Optional["Span"]] = contextvars.ContextVar("current_span", default=None)
+_export_lock = threading.Lock()
+
+
+class Span:
+    """
+    One timed step. Children are appended by whichever thread runs them, so a
+    span opened in a route sees the steps a driver ran on its browser thread.
+    """
+
+    def __init__(self, name: str, parent: Optional["Span"] = None, attributes: Dict[str, Any] = None):
+        self.name = name
+        self.trace_id = parent.trace_id if parent else uuid.uuid4().hex
+        self.span_id = uuid.uuid4().hex[:16]
+        self.parent_id = parent.span_id if parent else None
+        self.attributes = {k: v for k, v in (attributes or {}).items() if v is not None}
+        self.children: List["Span"] = []
+        self.start_unix_ns = time.time_ns()
+        self._start = time.perf_counter_ns()
+        self.duration_ns: Optional[int] = None
+        self.error: Optional[str] = None
+        if parent:
+            parent.children.append(self)
+
+    def end(self):
+        if self.duration_ns is None:
+            self.duration_ns = time.perf_counter_ns() - self._start
+
+    @property
+    def duration_ms(self) -> float:
+        duration = self.duration_ns if self.duration_ns is not None else time.perf_counter_ns() - self._start
+        return round(duration / 1e6, 1)
+
+    def breakdown(self) -> Dict[str, Any]:
+        """Nested per-step timings, as returned to API callers."""
+        entry = {"name": self.name, "duration_ms": self.duration_ms, "status": "error" if self.error else "ok"}
+        if self.error:
+            entry["error"] = self.error
+        if "wait_saved_ms" in self.attributes:
+            entry["wait_saved_ms"] = self.attributes["wait_saved_ms"]
+        if self.children:
+            entry["steps"] = [child.breakdown() for child in list(self.children)]
+        return entry
+
+    def walk(self):
+        yield self
+        for child in list(self.children):
+            yield from child.walk()
+
+
+def current_span() -> Optional[Span]:
+    return _current_span.get()
+
+
+@contextlib.contextmanager
+def span(name: str, **attributes):
+    """Times the `with` block as a child of the current span (or as a new trace)."""
+    current = Span(name, _current_span.get(), attributes)
+    token = _current_span.set(current)
+    try:
+        yield current
+    except BaseException as e:
+        current.error = f"{type(e).__name__}: {e}"
+        raise
+    finally:
+        current.end()
+        _current_span.reset(token)
+
+
+@contextlib.contextmanager
+def start_trace(name: str, **attributes):
+    """Opens a root span, detached from any span the caller might be in."""
+    token = _current_span.set(None)
+    try:
+        with span(name, **attributes) as root:
+            yield root
+    finally:
+        _current_span.reset(token)
+
+
+@contextlib.contextmanager
+def trace_step(platform: str, step: str, **attributes):
+    """A driver step: a span that is also recorded in driver_step_duration_seconds."""
+    started = time.perf_counter()
+    try:
+        with span(step, platform=platform, **attributes) as current:
+            yield current
+    finally:
+        DRIVER_STEP_SECONDS.observe(time.perf_counter() - started, platform=platform, step=step)
+
+
+def traced(name: str):
+    """Decorator form of span() for step functions."""
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            with span(name):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+# --- OTLP/JSON file export ---
+
+def _otlp_value(value) -> Dict[str, Any]:
+    if isinstance(value, bool):
+        return {"boolValue": value}
+    if isinstance(value, int):
+        return {"intValue": str(value)}
+    if isinstance(value, float):
+        return {"doubleValue": value}
+    return {"stringValue": str(value)}
+
+
+def _otlp_span(item: Span) -> Dict[str, Any]:
+    duration = item.duration_ns or 0
+    otlp = {
+        "traceId": item.trace_id,
+        "spanId": item.span_id,
+        "name": item.name,
+        "kind": 1,  # SPAN_KIND_INTERNAL
+        "startTimeUnixNano": str(item.start_unix_ns),
+        "endTimeUnixNano": str(item.start_unix_ns + duration),
+        "attributes": [{"key": k, "value": _otlp_value(v)} for k, v in item.attributes.items()],
+        # STATUS_CODE_OK / STATUS_CODE_ERROR
+        "status": {"code": 2, "message": item.error} if item.error else {"code": 1},
+    }
+    if item.parent_id:
+        otlp["parentSpanId"] = item.parent_id
+    return otlp
+
+
+def export_enabled() -> bool:
+    return bool(EXPORT_FILE)
+
+
+def export_trace(root: Span):
+    """
+    Appends a finished trace to TRACE_EXPORT_FILE as one OTLP/JSON
+    ExportTraceServiceRequest per line. Blocking.
+    """
+    if not EXPORT_FILE:
+        return
+    payload = {
+        "resourceSpans": [{
+            "resource": {"attributes": [{"key": "service.name", "value": {"stringValue": SERVICE_NAME}}]},
+            "scopeSpans": [{
+                "scope": {"name": __name__},
+                "spans": [_otlp_span(item) for item in root.walk()],
+            }],
+        }]
+    }
+    try:
+        folder = os.path.dirname(EXPORT_FILE)
+        if folder:
+            os.makedirs(folder, exist_ok=True)
+        with _export_lock, open(EXPORT_FILE, "a", encoding="utf-8") as f:
+            f.write(json.dumps(payload) + "\n")
+    except Exception as e:
+        logger.error(f"Could not export trace {root.trace_id}: {e}")
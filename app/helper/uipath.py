@@ -1,67 +1,459 @@
 import os
 import subprocess
 import json
+import time
+import uuid
+import asyncio
+import threading
 import logging
-import anyio
+from typing import Dict, Optional
+from app.helper.uipath_scheduler import scheduler, QueueTimeoutError
+from app.helper.executors import run_in
+from app.helper.metrics import UIROBOT_RUN_SECONDS
+from app.helper.run_log import RunLog
+from app.helper.package_cache import resolve_run_target
+from app.helper.uipath_worker import (
+    get_worker,
+    discard_worker,
+    worker_enabled_for,
+    WorkerUnavailableError,
+    WorkerExitedError
+)
+from app.helper.process_tree import (
+    process_group_kwargs,
+    kill_process_tree,
+    register_process,
+    unregister_process
+)
 
 logger = logging.getLogger(__name__)
 
-async def run_uipath_automation(process_name_or_path: str, arguments: dict = None, is_file: bool = False):
+# StreamReader line limit; longer lines are passed on in chunks of about this size
+STREAM_READ_LIMIT = 1024 * 1024
+
+# Runs longer than this are killed, along with their process tree
+DEFAULT_RUN_TIMEOUT_SEC = float(os.getenv("UIROBOT_TIMEOUT_SEC", "1800"))
+
+def _load_run_timeouts() -> Dict[str, float]:
+    """Per-automation timeouts from UIROBOT_AUTOMATION_TIMEOUTS, e.g. {"Report.1.0.2.nupkg": 600}."""
+    raw = os.getenv("UIROBOT_AUTOMATION_TIMEOUTS")
+    if not raw:
+        return {}
+    try:
+        return {str(k): float(v) for k, v in json.loads(raw).items()}
+    except Exception as e:
+        logger.error(f"Ignoring invalid UIROBOT_AUTOMATION_TIMEOUTS: {e}")
+        return {}
+
+RUN_TIMEOUTS = _load_run_timeouts()
+
+def run_timeout_for(process_name_or_path: str) -> float:
+    return RUN_TIMEOUTS.get(process_name_or_path, DEFAULT_RUN_TIMEOUT_SEC)
+
+class UiPathJob:
+    """A queued or running robot, tracked so it can be inspected and cancelled."""
+
+    def __init__(self, key: str, job_id: str = None):
+        self.job_id = job_id or uuid.uuid4().hex
+        self.key = key
+        self.state = "queued"
+        self.submitted_at = time.time()
+        self.started_at = None
+        self.pid = None
+        self.timeout = run_timeout_for(key)
+        self.cancel_requested = False
+        self.timed_out = False
+        self.task = None
+
+    def to_dict(self) -> dict:
+        return {
+            "job_id": self.job_id,
+            "automation": self.key,
+            "state": self.state,
+            "pid": self.pid,
+            "submitted_at": self.submitted_at,
+            "started_at": self.started_at,
+            "timeout_seconds": self.timeout,
+            "cancel_requested": self.cancel_requested,
+        }
+
+    def attach_process(self, pid: int, executable: str):
+        """
+        Records the job's process. Blocking (registry file I/O, and the kill of
+        a job whose cancellation arrived before it had a process to kill).
+        """
+        self.pid = pid
+        register_process(pid, executable, self.job_id)
+        if self.cancel_requested:
+            logger.info(f"Job {self.job_id} was cancelled while starting; killing PID {pid}")
+            kill_process_tree(pid)
+
+    def detach_process(self):
+        if self.pid:
+            unregister_process(self.pid)
+
+    def outcome(self, exit_code: int, stderr: str) -> dict:
+        """Status fields for a finished process, accounting for timeout and cancellation."""
+        if self.timed_out:
+            return {"status": "timeout", "message": f"Automation timed out after {self.timeout:.0f}s and was killed", "exit_code": exit_code}
+        if self.cancel_requested:
+            return {"status": "cancelled", "message": "Automation was cancelled", "exit_code": exit_code}
+        if exit_code == 0:
+            return {"status": "success"}
+        return {"status": "error", "message": stderr or f"UiRobot exited with code {exit_code}", "exit_code": exit_code}
+
+_jobs: Dict[str, UiPathJob] = {}
+
+def list_uipath_jobs() -> list:
+    return [job.to_dict() for job in _jobs.values()]
+
+def get_uipath_job(job_id: str) -> Optional[UiPathJob]:
+    return _jobs.get(job_id)
+
+async def cancel_uipath_job(job_id: str) -> bool:
+    """
+    Cancels a queued or running job. Queued jobs leave the queue; running jobs
+    have their process tree killed so the executor slot is freed. A job that is
+    running but has no process yet is killed as soon as its process is attached.
+    """
+    job = _jobs.get(job_id)
+    if not job or job.state == "finished":
+        return False
+
+    job.cancel_requested = True
+    if job.state == "queued" and job.task:
+        job.task.cancel()
+    elif job.pid:
+        await run_in("subprocess", kill_process_tree, job.pid)
+    logger.info(f"Cancellation requested for job {job_id} ({job.key})")
+    return True
+
+def _job_finished(job: UiPathJob, task: asyncio.Task):
+    """
+    Takes a job out of the registry once its task is done. Tied to the task
+    rather than to the caller, which can be cancelled (client disconnect,
+    shutdown) while the shielded task keeps running and holding its slot.
+    """
+    job.state = "finished"
+    _jobs.pop(job.job_id, None)
+    if not job.started_at:
+        return
+    if task.cancelled():
+        status = "cancelled"
+    elif task.exception() is not None:
+        status = "error"
+    else:
+        status = task.result().get("status", "unknown")
+    UIROBOT_RUN_SECONDS.observe(time.time() - job.started_at, status=status)
+
+async def _run_job(job: UiPathJob, work, priority: int) -> dict:
+    """Queues `work(job)` on the scheduler and tracks it in the job registry until it finishes."""
+    async def _admitted():
+        job.state = "running"
+        job.started_at = time.time()
+        return await work(job)
+
+    _jobs[job.job_id] = job
+    job.task = asyncio.create_task(scheduler.run(job.key, _admitted, priority=priority))
+    job.task.add_done_callback(lambda task: _job_finished(job, task))
+    try:
+        result = await asyncio.shield(job.task)
+    except QueueTimeoutError as e:
+        logger.error(str(e))
+        result = {"status": "rejected", "message": str(e)}
+    except asyncio.CancelledError:
+        if not (job.cancel_requested and job.task.cancelled()):
+            raise
+        result = {"status": "cancelled", "message": "Automation was cancelled before it started"}
+
+    result["job_id"] = job.job_id
+    return result
+
+
+def resolve_package_path(process_name_or_path: str) -> str:
+    """
+    Full path of what the robot should run for a package file: the prepared
+    project.json when UIROBOT_RUN_EXTRACTED is on, else the .nupkg. Blocking.
+    """
+    publish_folder = os.getenv("PUBLISH_AUTOMATION_FOLDER")
+    logger.info(f"Using PUBLISH_AUTOMATION_FOLDER: {publish_folder}")
+    if publish_folder and not os.path.isabs(process_name_or_path):
+        process_name_or_path = os.path.join(publish_folder, process_name_or_path)
+    return resolve_run_target(process_name_or_path)
+
+async def _run_on_worker(job: UiPathJob, target: str, arguments: dict, on_line=None) -> Optional[dict]:
+    """
+    Runs a job on the automation's warm worker. Returns None if no worker could
+    take the run, in which case the caller spawns UiRobot as usual.
+    """
+    try:
+        worker = await get_worker(job.key, target)
+    except WorkerUnavailableError as e:
+        logger.warning(f"{e}; spawning UiRobot instead")
+        return None
+
+    output = {"stdout": [], "stderr": []}
+
+    def _collect(stream: str, line: str):
+        output.setdefault(stream, []).append(line)
+        if on_line:
+            on_line(stream, line)
+
+    # Cancellation kills the worker's tree, which ends the run
+    job.pid = worker.pid
+    if job.cancel_requested:
+        # Cancelled while the worker was being fetched; don't hand it the run
+        return job.outcome(-1, None)
+    message = {}
+    try:
+        message = await worker.run(arguments, _collect, timeout=job.timeout)
+        exit_code = int(message.get("exit_code", 1))
+    except WorkerUnavailableError as e:
+        logger.warning(f"{e}; spawning UiRobot instead")
+        await discard_worker(job.key)
+        job.pid = None
+        return None
+    except asyncio.TimeoutError:
+        logger.error(f"UiPath automation '{job.key}' exceeded {job.timeout:.0f}s on its worker. Killing worker...")
+        job.timed_out = True
+        await discard_worker(job.key)
+        exit_code = -1
+    except WorkerExitedError as e:
+        logger.error(str(e))
+        await discard_worker(job.key)
+        exit_code = -1
+        message = {"message": str(e)}
+
+    stdout = "\n".join(output["stdout"])
+    stderr = "\n".join(output["stderr"])
+    result = job.outcome(exit_code, stderr or message.get("message"))
+    result.update({"stdout": stdout, "stderr": stderr, "exit_code": exit_code, "worker_pid": worker.pid})
+    return result
+
+def build_uipath_command(process_name_or_path: str, arguments: dict = None, is_file: bool = False):
+    """
+    Builds the UiRobot.exe command line. May extract the package on a cache miss,
+    so call it off the event loop.
+    Returns (command, None) on success or (None, error_result) if UiRobot is not configured.
+    """
+    ui_robot_path = os.getenv("UI_ROBOT_PATH")
+
+    if not ui_robot_path:
+        error_msg = "UI_ROBOT_PATH not found in environment variables."
+        logger.error(error_msg)
+        return None, {"status": "error", "message": error_msg}
+
+    if not os.path.exists(ui_robot_path):
+        error_msg = f"UiRobot.exe not found at path: {ui_robot_path}"
+        logger.error(error_msg)
+        return None, {"status": "error", "message": error_msg}
+
+    # Construct the command
+    command = [ui_robot_path, "execute"]
+
+    if is_file:
+        command.extend(["--file", resolve_package_path(process_name_or_path)])
+    else:
+        command.extend(["--process", process_name_or_path])
+
+    if arguments:
+        command.extend(["--input", json.dumps(arguments)])
+
+    return command, None
+
+async def run_uipath_automation(process_name_or_path: str, arguments: dict = None, is_file: bool = False, priority: int = 0):
     """
     Runs a UiPath automation using UiRobot.exe asynchronously.
+    Runs are admitted through the shared scheduler, which caps concurrent robots
+    globally and per automation; higher `priority` jobs leave the queue first.
+    A run that exceeds its timeout, or is cancelled, has its process tree killed.
     """
+    job = UiPathJob(process_name_or_path)
+
     def _run_sync():
-        nonlocal process_name_or_path
-        ui_robot_path = os.getenv("UI_ROBOT_PATH")
-        
-        if not ui_robot_path:
-            error_msg = "UI_ROBOT_PATH not found in environment variables."
-            logger.error(error_msg)
-            return {"status": "error", "message": error_msg}
-
-        if not os.path.exists(ui_robot_path):
-            error_msg = f"UiRobot.exe not found at path: {ui_robot_path}"
-            logger.error(error_msg)
-            return {"status": "error", "message": error_msg}
-
-        # Construct the command
-        command = [ui_robot_path, "execute"]
-        
-        if is_file:
-            publish_folder = os.getenv("PUBLISH_AUTOMATION_FOLDER")
-            logger.info(f"Using PUBLISH_AUTOMATION_FOLDER: {publish_folder}")
-            if publish_folder and not os.path.isabs(process_name_or_path):
-                process_name_or_path = os.path.join(publish_folder, process_name_or_path)
-            command.extend(["--file", process_name_or_path])
-        else:
-            command.extend(["--process", process_name_or_path])
-            
-        if arguments:
-            command.extend(["--input", json.dumps(arguments)])
+        command, error = build_uipath_command(process_name_or_path, arguments, is_file)
+        if error:
+            return error
 
         try:
             logger.info(f"Executing UiPath command: {' '.join(command)}")
             # This is the blocking call we run in a thread
-            result = subprocess.run(command, capture_output=True, text=True, check=False)
-            logger.info(f"Subprocess finished with return code: {result.returncode}")
-            
-            if result.returncode == 0:
+            process = subprocess.Popen(
+                command,
+                stdout=subprocess.PIPE,
+                stderr=subprocess.PIPE,
+                text=True,
+                **process_group_kwargs()
+            )
+            job.attach_process(process.pid, command[0])
+            try:
+                stdout, stderr = process.communicate(timeout=job.timeout)
+            except subprocess.TimeoutExpired:
+                logger.error(f"UiPath automation '{job.key}' exceeded {job.timeout:.0f}s. Killing process tree...")
+                job.timed_out = True
+                kill_process_tree(process.pid)
+                stdout, stderr = process.communicate()
+            finally:
+                job.detach_process()
+            logger.info(f"Subprocess finished with return code: {process.returncode}")
+
+            result = job.outcome(process.returncode, stderr)
+            if result["status"] == "success":
                 logger.info("UiPath automation executed successfully.")
-                return {
-                    "status": "success", 
-                    "stdout": result.stdout,
-                    "stderr": result.stderr
-                }
+                result.update({"stdout": stdout, "stderr": stderr})
             else:
-                logger.error(f"UiPath automation failed with exit code {result.returncode}: {result.stderr}")
-                return {
-                    "status": "error", 
-                    "message": result.stderr,
-                    "exit_code": result.returncode
-                }
+                logger.error(f"UiPath automation {result['status']} with exit code {process.returncode}: {stderr}")
+            return result
         except Exception as e:
             logger.error(f"Exception while running UiPath automation: {e}")
             return {"status": "error", "message": str(e)}
 
-    # Run the sync function in a separate thread to keep the event loop free
-    return await anyio.to_thread.run_sync(_run_sync)
+    async def _run_in_thread(_job):
+        if is_file and worker_enabled_for(process_name_or_path):
+            target = await run_in("io", resolve_package_path, process_name_or_path)
+            result = await _run_on_worker(job, target, arguments)
+            if result is not None:
+                return result
+        # Run the sync function in a separate thread to keep the event loop free
+        return await run_in("subprocess", _run_sync)
+
+    return await _run_job(job, _run_in_thread, priority)
+
+async def _pump_stream(reader: asyncio.StreamReader, stream: str, run_log: RunLog):
+    """Copies a child's output into the run log line by line."""
+    while True:
+        try:
+            line = await reader.readuntil(b"\n")
+        except asyncio.IncompleteReadError as e:
+            # End of output: whatever followed the last newline, or nothing
+            line = e.partial
+        except asyncio.LimitOverrunError as e:
+            # A line longer than the buffer limit. readuntil() left it buffered, so
+            # hand it on in limit-sized chunks; the rest of the line follows
+            line = await reader.readexactly(e.consumed)
+        if not line:
+            return
+        run_log.append(stream, line.decode("utf-8", errors="replace"))
+
+def _pump_pipe_threaded(pipe, stream: str, run_log: RunLog, loop: asyncio.AbstractEventLoop):
+    """Thread-side equivalent of _pump_stream for event loops without subprocess support."""
+    for line in iter(pipe.readline, b""):
+        loop.call_soon_threadsafe(run_log.append, stream, line.decode("utf-8", errors="replace"))
+    pipe.close()
+
+async def _spawn_and_stream(command: list, run_log: RunLog, job: UiPathJob) -> int:
+    """
+    Runs the command, streaming stdout/stderr into the run log. Returns the exit code.
+    If the job's timeout elapses first, the process tree is killed and the remaining
+    output is still drained.
+    """
+    try:
+        process = await asyncio.create_subprocess_exec(
+            *command,
+            stdout=asyncio.subprocess.PIPE,
+            stderr=asyncio.subprocess.PIPE,
+            limit=STREAM_READ_LIMIT,
+            **process_group_kwargs()
+        )
+    except NotImplementedError:
+        # Windows SelectorEventLoop (used by uvicorn --reload) can't spawn subprocesses;
+        # fall back to a Popen whose pipes are drained by reader threads.
+        loop = asyncio.get_running_loop()
+        process = subprocess.Popen(command, stdout=subprocess.PIPE, stderr=subprocess.PIPE, **process_group_kwargs())
+        await run_in("io", job.attach_process, process.pid, command[0])
+        readers = [
+            threading.Thread(target=_pump_pipe_threaded, args=(process.stdout, "stdout", run_log, loop), daemon=True),
+            threading.Thread(target=_pump_pipe_threaded, args=(process.stderr, "stderr", run_log, loop), daemon=True),
+        ]
+        for reader in readers:
+            reader.start()
+
+        def _wait():
+            try:
+                exit_code = process.wait(timeout=job.timeout)
+            except subprocess.TimeoutExpired:
+                job.timed_out = True
+                kill_process_tree(process.pid)
+                exit_code = process.wait()
+            for reader in readers:
+                reader.join()
+            return exit_code
+
+        try:
+            exit_code = await run_in("subprocess", _wait)
+        finally:
+            await run_in("io", job.detach_process)
+        # Let the last call_soon_threadsafe appends run before the caller reads the tail
+        await asyncio.sleep(0)
+        return exit_code
+
+    await run_in("io", job.attach_process, process.pid, command[0])
+
+    async def _drain():
+        await asyncio.gather(
+            _pump_stream(process.stdout, "stdout", run_log),
+            _pump_stream(process.stderr, "stderr", run_log)
+        )
+        return await process.wait()
+
+    drain = asyncio.ensure_future(_drain())
+    try:
+        return await asyncio.wait_for(asyncio.shield(drain), job.timeout)
+    except asyncio.TimeoutError:
+        job.timed_out = True
+        await run_in("subprocess", kill_process_tree, process.pid)
+        return await drain
+    finally:
+        await run_in("io", job.detach_process)
+
+async def stream_uipath_automation(run_log: RunLog, process_name_or_path: str, arguments: dict = None, is_file: bool = False, priority: int = 0):
+    """
+    Runs a UiPath automation like run_uipath_automation, but streams its output
+    into `run_log` as it is produced instead of buffering it.
+    The returned result only carries the buffered tail of each stream and the
+    path of the full log file. The run log is finished with the same result.
+    The job shares the run log's job_id, so it can be cancelled by that id.
+    """
+    job = UiPathJob(process_name_or_path, job_id=run_log.job_id)
+
+    async def _run_streaming(_job):
+        if is_file and worker_enabled_for(process_name_or_path):
+            target = await run_in("io", resolve_package_path, process_name_or_path)
+            result = await _run_on_worker(job, target, arguments, on_line=run_log.append)
+            if result is not None:
+                result["stdout"] = run_log.tail("stdout")
+                result["stderr"] = run_log.tail("stderr")
+                result["log_file"] = run_log.log_path
+                return result
+
+        command, error = await run_in("io", build_uipath_command, process_name_or_path, arguments, is_file)
+        if error:
+            return error
+
+        try:
+            logger.info(f"Executing UiPath command (streaming): {' '.join(command)}")
+            exit_code = await _spawn_and_stream(command, run_log, job)
+            logger.info(f"Subprocess finished with return code: {exit_code}")
+        except Exception as e:
+            logger.error(f"Exception while running UiPath automation: {e}")
+            return {"status": "error", "message": str(e), "log_file": run_log.log_path}
+
+        stderr = run_log.tail("stderr")
+        result = job.outcome(exit_code, stderr)
+        result.update({
+            "stdout": run_log.tail("stdout"),
+            "stderr": stderr,
+            "exit_code": exit_code,
+            "log_file": run_log.log_path
+        })
+        if result["status"] != "success":
+            logger.error(f"UiPath automation {result['status']} with exit code {exit_code}")
+        return result
+
+    # Followers wait for finish(), so it must happen however the run ends
+    result = {"status": "error", "message": "Automation run was interrupted", "log_file": run_log.log_path}
+    try:
+        result = await _run_job(job, _run_streaming, priority)
+        return result
+    finally:
+        run_log.finish(result)
@@ -0,0 +1,195 @@
+import os
+import json
+import time
+import asyncio
+import bisect
+import itertools
+import logging
+from collections import defaultdict
+from dotenv import load_dotenv
+
+load_dotenv()
+
+logger = logging.getLogger(__name__)
+
+
+class QueueTimeoutError(Exception):
+    """Raised when a job waited longer than the queue timeout for a free slot."""
+
+    def __init__(self, key: str, waited: float):
+        super().__init__(f"Automation '{key}' was rejected after waiting {waited:.1f}s in the run queue")
+        self.key = key
+        self.waited = waited
+
+
+class _Waiter:
+    __slots__ = ("sort_key", "key", "future", "enqueued_at")
+
+    def __init__(self, sort_key, key, future):
+        self.sort_key = sort_key
+        self.key = key
+        self.future = future
+        self.enqueued_at = time.monotonic()
+
+    def __lt__(self, other):
+        return self.sort_key < other.sort_key
+
+
+class JobScheduler:
+    """
+    Admits jobs under a global concurrency cap and a per-key cap.
+
+    Waiting jobs are ordered by priority (higher first) and then FIFO. A job that is
+    blocked only by its own key's cap does not hold back jobs for other keys.
+    Must be used from a single event loop.
+    """
+
+    def __init__(self, max_concurrency: int = 1, default_key_limit: int = 1,
+                 key_limits: dict = None, queue_timeout: float = None):
+        self.max_concurrency = max(1, max_concurrency)
+        self.default_key_limit = max(1, default_key_limit)
+        self.key_limits = dict(key_limits or {})
+        self.queue_timeout = queue_timeout
+
+        self._waiters = []  # kept sorted by (-priority, seq)
+        self._seq = itertools.count()
+        self._running = 0
+        self._running_by_key = defaultdict(int)
+
+        self._submitted = 0
+        self._completed = 0
+        self._rejected = 0
+        self._total_wait = 0.0
+        self._max_wait = 0.0
+
+    def key_limit(self, key: str) -> int:
+        return max(1, self.key_limits.get(key, self.default_key_limit))
+
+    def _can_start(self, key: str) -> bool:
+        return self._running < self.max_concurrency and self._running_by_key.get(key, 0) < self.key_limit(key)
+
+    def _start(self, key: str):
+        self._running += 1
+        self._running_by_key[key] += 1
+
+    def _dispatch(self):
+        """Grants free slots to waiting jobs in priority/FIFO order."""
+        index = 0
+        while index < len(self._waiters) and self._running < self.max_concurrency:
+            waiter = self._waiters[index]
+            if waiter.future.done():
+                self._waiters.pop(index)
+                continue
+            if self._can_start(waiter.key):
+                self._waiters.pop(index)
+                self._start(waiter.key)
+                waiter.future.set_result(None)
+                continue
+            index += 1
+
+    def _record_wait(self, waited: float):
+        self._total_wait += waited
+        self._max_wait = max(self._max_wait, waited)
+
+    async def acquire(self, key: str, priority: int = 0, timeout: float = None):
+        """Waits for a run slot for `key`. Raises QueueTimeoutError if none frees up in time."""
+        self._submitted += 1
+        timeout = self.queue_timeout if timeout is None else timeout
+
+        # Start immediately only if nobody eligible is already waiting ahead of us
+        if not self._waiters and self._can_start(key):
+            self._start(key)
+            self._record_wait(0.0)
+            return
+
+        future = asyncio.get_running_loop().create_future()
+        waiter = _Waiter((-priority, next(self._seq)), key, future)
+        bisect.insort(self._waiters, waiter)
+        self._dispatch()
+
+        try:
+            await asyncio.wait_for(asyncio.shield(future), timeout)
+        except (asyncio.TimeoutError, asyncio.CancelledError) as e:
+            if future.done() and not future.cancelled():
+                # The slot was granted while we were giving up; hand it back
+                self.release(key, completed=False)
+            else:
+                future.cancel()
+                self._dispatch()
+            if isinstance(e, asyncio.CancelledError):
+                raise
+            waited = time.monotonic() - waiter.enqueued_at
+            self._rejected += 1
+            logger.warning(f"Queue timeout for '{key}' after {waited:.1f}s")
+            raise QueueTimeoutError(key, waited)
+
+        self._record_wait(time.monotonic() - waiter.enqueued_at)
+
+    def release(self, key: str, completed: bool = True):
+        """Frees the slot held by a job for `key` and starts the next eligible waiters."""
+        self._running = max(0, self._running - 1)
+        remaining = self._running_by_key.get(key, 0) - 1
+        if remaining > 0:
+            self._running_by_key[key] = remaining
+        else:
+            self._running_by_key.pop(key, None)
+        if completed:
+            self._completed += 1
+        self._dispatch()
+
+    async def run(self, key: str, func, priority: int = 0, timeout: float = None):
+        """Runs `await func()` once a slot for `key` is available."""
+        await self.acquire(key, priority=priority, timeout=timeout)
+        try:
+            return await func()
+        finally:
+            self.release(key)
+
+    def snapshot(self) -> dict:
+        """Returns queue depth and throughput counters for monitoring."""
+        queued_by_key = defaultdict(int)
+        for waiter in self._waiters:
+            if not waiter.future.done():
+                queued_by_key[waiter.key] += 1
+
+        keys = set(queued_by_key) | set(self._running_by_key)
+        admitted = self._submitted - self._rejected
+        return {
+            "max_concurrency": self.max_concurrency,
+            "running": self._running,
+            "queued": sum(queued_by_key.values()),
+            "submitted": self._submitted,
+            "completed": self._completed,
+            "rejected": self._rejected,
+            "avg_wait_seconds": round(self._total_wait / admitted, 3) if admitted else 0.0,
+            "max_wait_seconds": round(self._max_wait, 3),
+            "automations": {
+                key: {
+                    "running": self._running_by_key.get(key, 0),
+                    "queued": queued_by_key.get(key, 0),
+                    "limit": self.key_limit(key),
+                }
+                for key in sorted(keys)
+            },
+        }
+
+
+def _load_key_limits() -> dict:
+    """Per-automation caps from UIROBOT_AUTOMATION_LIMITS, e.g. {"Report.1.0.2.nupkg": 2}."""
+    raw = os.getenv("UIROBOT_AUTOMATION_LIMITS")
+    if not raw:
+        return {}
+    try:
+        return {str(k): int(v) for k, v in json.loads(raw).items()}
+    except Exception as e:
+        logger.error(f"Ignoring invalid UIROBOT_AUTOMATION_LIMITS: {e}")
+        return {}
+
+
+# Robots share one interactive desktop session, so by default only one runs at a time
+scheduler = JobScheduler(
+    max_concurrency=int(os.getenv("UIROBOT_MAX_CONCURRENCY", "1")),
+    default_key_limit=int(os.getenv("UIROBOT_MAX_PER_AUTOMATION", "1")),
+    key_limits=_load_key_limits(),
+    queue_timeout=float(os.getenv("UIROBOT_QUEUE_TIMEOUT_SEC", "300")),
+)
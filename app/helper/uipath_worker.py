@@ -0,0 +1,265 @@
+import os
+import json
+import time
+import uuid
+import asyncio
+import threading
+import subprocess
+import logging
+from typing import Callable, Dict, Optional
+from dotenv import load_dotenv
+from app.helper.process_tree import process_group_kwargs, kill_process_tree, register_process, unregister_process
+from app.helper.version import package_base_name
+from app.helper.executors import run_in
+
+load_dotenv()
+
+logger = logging.getLogger(__name__)
+
+# Executable that hosts one automation and runs it once per request line on stdin
+WORKER_PATH = os.getenv("UIROBOT_WORKER_PATH")
+# Package base names that use warm workers, comma separated, or '*' for all
+WORKER_AUTOMATIONS = {
+    name.strip().lower() for name in os.getenv("UIROBOT_WORKER_AUTOMATIONS", "").split(",") if name.strip()
+}
+WORKER_IDLE_SEC = float(os.getenv("UIROBOT_WORKER_IDLE_SEC", "600"))
+WORKER_READY_TIMEOUT_SEC = float(os.getenv("UIROBOT_WORKER_READY_TIMEOUT_SEC", "60"))
+
+LineCallback = Callable[[str, str], None]
+
+
+class WorkerUnavailableError(Exception):
+    """Raised when a worker can't be started or won't accept a run; callers fall back to spawning."""
+
+
+class WorkerExitedError(Exception):
+    """Raised when a worker died in the middle of a run."""
+
+
+class UiPathWorker:
+    """
+    A long-lived worker process for one automation, driven over a JSON-lines pipe.
+
+    Protocol (one JSON object per line):
+      worker -> server  {"event": "ready"}                       once, after start-up
+      server -> worker  {"id": "<run id>", "input": {...}}       one run
+      worker -> server  {"id": ..., "event": "line", "stream": "stdout"|"stderr", "line": "..."}
+      worker -> server  {"id": ..., "event": "result", "exit_code": 0, "message": "..."}
+
+    Runs are strictly one at a time. The pipes are read by a thread, so this
+    works on event loops without subprocess support.
+    """
+
+    def __init__(self, key: str, target: str):
+        self.key = key
+        self.target = target
+        self.process: Optional[subprocess.Popen] = None
+        self.loop: Optional[asyncio.AbstractEventLoop] = None
+        self.ready: Optional[asyncio.Future] = None
+        self.lock = asyncio.Lock()
+        self.started_at = None
+        self.last_used = time.monotonic()
+        self.runs = 0
+        self._current_id = None
+        self._current_future: Optional[asyncio.Future] = None
+        self._on_line: Optional[LineCallback] = None
+
+    @property
+    def pid(self) -> Optional[int]:
+        return self.process.pid if self.process else None
+
+    @property
+    def alive(self) -> bool:
+        return self.process is not None and self.process.poll() is None
+
+    async def start(self):
+        command = [WORKER_PATH, "--file", self.target]
+        self.loop = asyncio.get_running_loop()
+        self.ready = self.loop.create_future()
+        try:
+            self.process = subprocess.Popen(
+                command,
+                stdin=subprocess.PIPE,
+                stdout=subprocess.PIPE,
+                stderr=subprocess.PIPE,
+                text=True,
+                encoding="utf-8",
+                errors="replace",
+                bufsize=1,
+                **process_group_kwargs()
+            )
+        except Exception as e:
+            raise WorkerUnavailableError(f"Could not start worker for {self.key}: {e}")
+
+        await run_in("io", register_process, self.process.pid, WORKER_PATH, f"worker:{self.key}")
+        threading.Thread(target=self._read_stdout, daemon=True).start()
+        threading.Thread(target=self._read_stderr, daemon=True).start()
+
+        try:
+            await asyncio.wait_for(asyncio.shield(self.ready), WORKER_READY_TIMEOUT_SEC)
+        except Exception as e:
+            await self.stop()
+            raise WorkerUnavailableError(f"Worker for {self.key} did not become ready: {e}")
+        self.started_at = time.time()
+        logger.info(f"Started warm worker for {self.key} (PID {self.process.pid})")
+
+    # --- Reader threads: hand everything over to the event loop ---
+
+    def _post(self, callback, *args):
+        try:
+            self.loop.call_soon_threadsafe(callback, *args)
+        except RuntimeError:
+            # The loop was closed (server shutdown) while the pipe was still draining
+            pass
+
+    def _read_stdout(self):
+        for raw in iter(self.process.stdout.readline, ""):
+            try:
+                message = json.loads(raw)
+            except ValueError:
+                # Stray non-protocol output is treated as a log line of the current run
+                message = {"event": "line", "stream": "stdout", "line": raw.rstrip("\r\n")}
+            self._post(self._dispatch, message)
+        # Off the event loop already, so the registry file is updated here
+        unregister_process(self.process.pid)
+        self._post(self._exited)
+
+    def _read_stderr(self):
+        for raw in iter(self.process.stderr.readline, ""):
+            self._post(self._dispatch, {"event": "line", "stream": "stderr", "line": raw.rstrip("\r\n")})
+
+    def _dispatch(self, message: dict):
+        event = message.get("event")
+        if event == "ready":
+            if not self.ready.done():
+                self.ready.set_result(None)
+            return
+        if message.get("id") not in (None, self._current_id):
+            return
+        if event == "line" and self._on_line:
+            self._on_line(message.get("stream", "stdout"), message.get("line", ""))
+        elif event == "result" and self._current_future and not self._current_future.done():
+            self._current_future.set_result(message)
+
+    def _exited(self):
+        if not self.ready.done():
+            self.ready.set_exception(WorkerUnavailableError(f"Worker for {self.key} exited during start-up"))
+        if self._current_future and not self._current_future.done():
+            self._current_future.set_exception(WorkerExitedError(f"Worker for {self.key} exited during the run"))
+
+    async def run(self, arguments: dict, on_line: LineCallback = None, timeout: float = None) -> dict:
+        """
+        Sends one run to the worker and waits for its result message.
+        Raises WorkerUnavailableError if the run could not be handed over,
+        WorkerExitedError if the worker died mid-run and asyncio.TimeoutError on timeout.
+        """
+        async with self.lock:
+            if not self.alive:
+                raise WorkerUnavailableError(f"Worker for {self.key} is not running")
+
+            self._current_id = uuid.uuid4().hex
+            self._current_future = self.loop.create_future()
+            self._on_line = on_line
+            self.last_used = time.monotonic()
+            try:
+                request = json.dumps({"id": self._current_id, "input": arguments or {}}) + "\n"
+                try:
+                    self.process.stdin.write(request)
+                    self.process.stdin.flush()
+                except (BrokenPipeError, OSError) as e:
+                    raise WorkerUnavailableError(f"Worker for {self.key} is not accepting runs: {e}")
+                return await asyncio.wait_for(asyncio.shield(self._current_future), timeout)
+            finally:
+                self.runs += 1
+                self.last_used = time.monotonic()
+                self._current_id = None
+                self._current_future = None
+                self._on_line = None
+
+    async def stop(self):
+        if self.process and self.process.poll() is None:
+            await run_in("subprocess", kill_process_tree, self.process.pid)
+        if self.process:
+            await run_in("io", unregister_process, self.process.pid)
+
+    def to_dict(self) -> dict:
+        return {
+            "automation": self.key,
+            "pid": self.pid,
+            "alive": self.alive,
+            "busy": self.lock.locked(),
+            "runs": self.runs,
+            "started_at": self.started_at,
+            "idle_seconds": round(time.monotonic() - self.last_used, 1),
+        }
+
+
+_workers: Dict[str, UiPathWorker] = {}
+_starting: Dict[str, asyncio.Task] = {}
+_reaper: Optional[asyncio.Task] = None
+
+
+def worker_enabled_for(process_name_or_path: str) -> bool:
+    if not WORKER_PATH or not WORKER_AUTOMATIONS:
+        return False
+    if not os.path.exists(WORKER_PATH):
+        return False
+    name = package_base_name(os.path.basename(process_name_or_path)).lower()
+    return "*" in WORKER_AUTOMATIONS or name in WORKER_AUTOMATIONS
+
+
+def list_workers() -> list:
+    return [worker.to_dict() for worker in _workers.values()]
+
+
+async def get_worker(key: str, target: str) -> UiPathWorker:
+    """Returns the warm worker for an automation, starting one if needed (once, even if called concurrently)."""
+    worker = _workers.get(key)
+    if worker and worker.alive and worker.target == target:
+        return worker
+    if worker:
+        await discard_worker(key)
+
+    task = _starting.get(key)
+    if task is None:
+        async def _start():
+            try:
+                new_worker = UiPathWorker(key, target)
+                await new_worker.start()
+                _workers[key] = new_worker
+                return new_worker
+            finally:
+                _starting.pop(key, None)
+
+        task = asyncio.create_task(_start())
+        _starting[key] = task
+        _ensure_reaper()
+    return await asyncio.shield(task)
+
+
+async def discard_worker(key: str):
+    worker = _workers.pop(key, None)
+    if worker:
+        await worker.stop()
+
+
+def _ensure_reaper():
+    global _reaper
+    if _reaper is None or _reaper.done():
+        _reaper = asyncio.create_task(_reap_idle_workers())
+
+
+async def _reap_idle_workers():
+    """Stops workers that have not run anything for UIROBOT_WORKER_IDLE_SEC."""
+    while _workers or _starting:
+        await asyncio.sleep(min(60.0, WORKER_IDLE_SEC))
+        now = time.monotonic()
+        for key, worker in list(_workers.items()):
+            if not worker.lock.locked() and (not worker.alive or now - worker.last_used > WORKER_IDLE_SEC):
+                logger.info(f"Stopping idle worker for {key}")
+                await discard_worker(key)
+
+
+async def stop_all_workers():
+    for key in list(_workers):
+        await discard_worker(key)
@@ -0,0 +1,61 @@
+import re
+from typing import Optional, Tuple
+
+# Matches versions like 1.0.5, 1.0.10-beta.2 or 2.3.1+build.7 (build metadata is ignored)
+_SEMVER_PATTERN = re.compile(
+    r"^v?(\d+)(?:\.(\d+))?(?:\.(\d+))?(?:-([0-9A-Za-z\-\.]+))?(?:\+[0-9A-Za-z\-\.]+)?$"
+)
+
+# Extracts the version part of a published package name, e.g. 'Robot.1.0.5.nupkg' -> '1.0.5'
+_PACKAGE_VERSION_PATTERN = re.compile(r"\.(\d+\.\d+\.\d+(?:-[\w\.]*)?)\.nupkg$")
+
+
+def parse_version(version: Optional[str]) -> Optional[Tuple[int, int, int, Optional[str]]]:
+    """
+    Parses a version string into (major, minor, patch, prerelease).
+    Returns None if the string is not a recognizable version.
+    """
+    if not version:
+        return None
+
+    match = _SEMVER_PATTERN.match(version.strip())
+    if not match:
+        return None
+
+    major, minor, patch, prerelease = match.groups()
+    return int(major), int(minor or 0), int(patch or 0), prerelease
+
+
+def version_sort_key(version: Optional[str]) -> tuple:
+    """
+    Returns a key that orders versions by semantic versioning rules:
+    numeric parts compare numerically (1.0.10 > 1.0.9), a release ranks above its
+    prereleases (1.0.0 > 1.0.0-rc.1) and unparseable versions rank below everything.
+    """
+    parsed = parse_version(version)
+    if parsed is None:
+        return (0,)
+
+    major, minor, patch, prerelease = parsed
+    if prerelease is None:
+        return (1, major, minor, patch, 1, ())
+
+    # Prerelease identifiers: numeric ones compare numerically and rank below alphanumeric ones
+    identifiers = tuple(
+        (0, int(part), "") if part.isdigit() else (1, 0, part)
+        for part in prerelease.split(".")
+    )
+    return (1, major, minor, patch, 0, identifiers)
+
+
+def package_version(file_name: Optional[str]) -> Optional[str]:
+    """Extracts the version from a package file name like 'Robot.1.0.5.nupkg'."""
+    if not file_name:
+        return None
+    match = _PACKAGE_VERSION_PATTERN.search(file_name)
+    return match.group(1) if match else None
+
+
+def package_base_name(file_name: Optional[str]) -> str:
+    """Returns the package name without version and extension ('Robot.1.0.5.nupkg' -> 'Robot')."""
+    return (file_name or "").split(".")[0]
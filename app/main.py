@@ -1,23 +1,59 @@
-from fastapi import FastAPI
+from fastapi import FastAPI, Request, Response
 import os
+import time
 from dotenv import load_dotenv
 
 from app.routes.automation_route import router as automation_router
 from app.routes.dashboard_route import router as dashboard_router
 from app.routes.runner_route import router as runner_router
 from app.routes.trade_route import router as trade_router
+from app.helper.executors import executor_stats
+from app.helper.metrics import (
+    render_metrics, register_server_gauges, CONTENT_TYPE, HTTP_REQUESTS, HTTP_REQUEST_SECONDS
+)
 
 # Load environment variables
 load_dotenv()
 
 app = FastAPI(title="UiPath Automation Server")
 
+register_server_gauges(executor_stats().keys())
+
+@app.middleware("http")
+async def record_request_metrics(request: Request, call_next):
+    """Counts requests and times them per route template (not per raw path, to keep label sets small)."""
+    started = time.perf_counter()
+    status = 500
+    try:
+        response = await call_next(request)
+        status = response.status_code
+        return response
+    finally:
+        route = request.scope.get("route")
+        route_path = getattr(route, "path", None) or "unmatched"
+        HTTP_REQUESTS.inc(method=request.method, route=route_path, status=status)
+        HTTP_REQUEST_SECONDS.observe(time.perf_counter() - started, method=request.method, route=route_path)
+
 @app.on_event("startup")
 async def startup_event():
     import asyncio
     from app.controller.unit_controller import register_unit
+    from app.helper.process_tree import reap_orphaned_processes
+    from app.helper.package_sync import run_package_sync_loop
+    from app.helper.executors import run_in
     # Run registration in the background so it doesn't block startup
     asyncio.create_task(register_unit())
+    # Prefetch packages from Storage so runs on this unit start without a download
+    app.state.package_sync_task = asyncio.create_task(run_package_sync_loop())
+    # Kill robots orphaned by a previous crash before new runs are admitted
+    await run_in("subprocess", reap_orphaned_processes)
+
+@app.on_event("shutdown")
+async def shutdown_event():
+    from app.helper.uipath_worker import stop_all_workers
+    from app.helper.executors import shutdown_executors
+    await stop_all_workers()
+    shutdown_executors()
 
 # Include the routes
 app.include_router(automation_router, prefix="/api/v1")
@@ -31,6 +67,16 @@ async def health_check():
     """Health check endpoint."""
     return {"status": "ok", "message": "Server is running", "env": os.getenv("ENV", "unknown")}
 
+@app.get("/api/executors")
+async def get_executor_stats():
+    """Per-executor thread-pool utilization, queue depth and queue wait times."""
+    return executor_stats()
+
+@app.get("/metrics")
+async def get_metrics():
+    """Server metrics in the Prometheus text format."""
+    return Response(content=render_metrics(), media_type=CONTENT_TYPE)
+
 if __name__ == "__main__":
     import uvicorn
     uvicorn.run("app.main:app", host="0.0.0.0", port=8000, reload=True)
@@ -1,4 +1,5 @@
-from fastapi import APIRouter, Body, UploadFile, File, Form
+from fastapi import APIRouter, Body, UploadFile, File, Form, Query, Response
+from datetime import datetime
 from typing import List, Dict, Any, Optional
 from app.controller.automation_controller import (
     Automation, 
@@ -9,8 +10,14 @@ from app.controller.automation_controller import (
     get_automation_by_id,
     run_automation_process,
     get_execution_history,
-    ExecutionHistory
+    get_execution_output,
+    ExecutionHistory,
+    ExecutionOutput
 )
+from app.helper.storage_upload import get_upload_progress
+from app.helper.package_sync import get_sync_status, sync_packages
+from app.helper.package_cache import get_cache_stats
+from app.helper.executors import run_in
 
 router = APIRouter()
 
@@ -30,6 +37,60 @@ async def create_automation(
     """
     return await create_new_automation(file=file, version=version)
 
+@router.get("/automation/uploads")
+async def list_package_uploads():
+    """Progress of package uploads to Supabase Storage (bytes sent, percent, state)."""
+    return get_upload_progress()
+
+@router.get("/automation/sync")
+async def get_package_sync_status():
+    """Status of the background package sync (last pass, downloads, evictions, errors)."""
+    return get_sync_status()
+
+@router.get("/automation/cache")
+async def get_package_cache_stats():
+    """Extracted-package cache hit/miss counters."""
+    return await run_in("io", get_cache_stats)
+
+@router.post("/automation/sync")
+async def run_package_sync():
+    """Run a package sync pass now instead of waiting for the next interval."""
+    return await sync_packages()
+
+# Registered before /automation/{automation_id} so "history" is not taken as an ID
+@router.get("/automation/history", response_model=List[ExecutionHistory])
+async def list_execution_history(
+    response: Response,
+    limit: int = Query(50, ge=1, le=200),
+    cursor: Optional[str] = Query(None, description="Cursor from the previous page's X-Next-Cursor header"),
+    automation_id: Optional[str] = None,
+    status: Optional[str] = None,
+    since: Optional[datetime] = None,
+    until: Optional[datetime] = None,
+    include_output: bool = Query(False, description="Include full stdout/stderr in each row")
+):
+    """
+    Get the history of automation executions, newest first.
+    The cursor for the next page is returned in the X-Next-Cursor header.
+    """
+    rows, next_cursor = await get_execution_history(
+        limit=limit,
+        cursor=cursor,
+        automation_id=automation_id,
+        status=status,
+        since=since,
+        until=until,
+        include_output=include_output
+    )
+    if next_cursor:
+        response.headers["X-Next-Cursor"] = next_cursor
+    return rows
+
+@router.get("/automation/history/{execution_id}/output", response_model=ExecutionOutput)
+async def get_execution_history_output(execution_id: int):
+    """Get the full stdout/stderr of a single execution."""
+    return await get_execution_output(execution_id)
+
 @router.get("/automation/{automation_id}", response_model=Automation)
 async def get_automation(automation_id: str):
     """Get a specific automation by ID."""
@@ -45,7 +106,4 @@ async def run_automation(
     Pass JSON body as arguments for the process.
     """
     return await run_automation_process(automation_id, arguments)
-@router.get("/automation/history", response_model=List[ExecutionHistory])
-async def list_execution_history():
-    """Get the recent history of automation executions."""
-    return await get_execution_history()
+
@@ -1,24 +1,116 @@
-from fastapi import APIRouter, Request, HTTPException
+from fastapi import APIRouter, Request, Response, HTTPException, Header, Query
+from fastapi.responses import StreamingResponse
 from typing import Dict, Any, Optional
-from pydantic import BaseModel
+from pydantic import BaseModel, Field
+import json
 import logging
-from app.controller.automation_controller import RunResponse, run_automation_by_identifier
+from app.controller.automation_controller import RunResponse, run_automation_by_identifier, start_automation_stream
+from app.helper.uipath_scheduler import scheduler
+from app.helper.run_log import RunLog, get_run_log
+from app.helper.uipath import list_uipath_jobs, cancel_uipath_job
+from app.helper.uipath_worker import list_workers
+from app.helper.idempotency import run_idempotent, idempotency_cache, IDEMPOTENCY_HEADER, REPLAYED_HEADER
+from app.helper.admission import admission, client_id
 
 router = APIRouter()
 logger = logging.getLogger(__name__)
 
+# Run priorities callers may ask for; outside this range a request is refused (422)
+# rather than letting one caller jump every queued run
+MAX_RUN_PRIORITY = 10
+
 class RunAutomationRequest(BaseModel):
     identifier: Optional[str] = None
     file_name: Optional[str] = None  # Alias for backward compatibility/consistency
     arguments: Dict[str, Any] = {}
+    priority: int = Field(0, ge=-MAX_RUN_PRIORITY, le=MAX_RUN_PRIORITY)  # Higher runs first when robots are queued
+
+def _raise_for_error(result: Dict[str, Any]):
+    """Maps failed or rejected automation results to HTTP errors."""
+    if result.get("status") == "rejected":
+        # Queue was saturated; tell the caller to retry later instead of holding the request
+        raise HTTPException(
+            status_code=503,
+            detail=result.get("message", "Run queue is full"),
+            headers={"Retry-After": "30"}
+        )
+
+    if result.get("status") == "timeout":
+        raise HTTPException(status_code=504, detail=result.get("message", "Automation timed out"))
+
+    if result.get("status") == "cancelled":
+        raise HTTPException(status_code=409, detail=result.get("message", "Automation was cancelled"))
+
+    if result.get("status") == "error":
+        msg = result.get("message", "Unknown error")
+        status_code = 404 if "not found" in msg.lower() else 400
+        raise HTTPException(status_code=status_code, detail=msg)
+
+def _admit(request: Request, identifier: str):
+    """Refuses the run with 503/429 if the robot queue is full or the caller/automation is over its rate."""
+    admission.admit(client_id(request), f"automation:{identifier.lower()}", "runner")
+
+async def _run_checked(request: Request, identifier: str, arguments: Dict[str, Any], priority: int):
+    _admit(request, identifier)
+    result = await run_automation_by_identifier(identifier, arguments, priority=priority)
+    # Check if there was an error
+    _raise_for_error(result)
+    return result
+
+async def _extract_arguments(request: Request) -> Dict[str, Any]:
+    """
+    Reads automation arguments from the request body.
+    If the body has an 'arguments' key its contents are used, otherwise the whole body.
+    """
+    # Capture the entire JSON body
+    try:
+        body = await request.json()
+    except Exception:
+        body = {}
+
+    # Logic: if body has an 'arguments' key, extract its contents (the sample payload).
+    # Otherwise, use the whole body as arguments.
+    automation_args = body.get("arguments", body) if isinstance(body, dict) else body
+    
+    if not isinstance(automation_args, dict):
+        automation_args = {}
+
+    return automation_args
+
+async def _start_checked_stream(request: Request, identifier: str, arguments: Dict[str, Any], priority: int):
+    _admit(request, identifier)
+    return await start_automation_stream(identifier, arguments, priority=priority)
+
+def _sse(event: str, data: Any) -> str:
+    return f"event: {event}\ndata: {json.dumps(data, default=str)}\n\n"
+
+async def _stream_run_log(run_log: RunLog):
+    """Server-sent events: 'job' first, then one 'line' per output line, then 'result'."""
+    yield _sse("job", {"job_id": run_log.job_id, "automation": run_log.label, "log_file": run_log.log_path})
+    async for event, data in run_log.follow():
+        yield _sse(event, data)
+
+def _event_stream_response(run_log: RunLog) -> StreamingResponse:
+    return StreamingResponse(
+        _stream_run_log(run_log),
+        media_type="text/event-stream",
+        headers={
+            "Cache-Control": "no-cache",
+            "X-Accel-Buffering": "no",
+            "X-Job-Id": run_log.job_id
+        }
+    )
 
 @router.post("/runner", response_model=RunResponse)
 async def run_automation_base(
     request: Request,
-    run_request: RunAutomationRequest
+    response: Response,
+    run_request: RunAutomationRequest,
+    idempotency_key: Optional[str] = Header(None, alias=IDEMPOTENCY_HEADER)
 ):
     """
     Run an automation by providing the identifier in the JSON body.
+    A retry with the same Idempotency-Key attaches to the first run instead of starting another.
     """
     identifier = run_request.identifier or run_request.file_name
     if not identifier:
@@ -27,61 +119,122 @@ async def run_automation_base(
     logger.info(f"Running automation: {identifier}")
     
     # Execute automation using controller
-    result = await run_automation_by_identifier(identifier, run_request.arguments)
-    
-    # Check if there was an error
-    if result.get("status") == "error":
-        msg = result.get("message", "Unknown error")
-        status_code = 404 if "not found" in msg.lower() else 400
-        raise HTTPException(status_code=status_code, detail=msg)
+    result, replayed = await run_idempotent(
+        request, idempotency_key,
+        lambda: _run_checked(request, identifier, run_request.arguments, run_request.priority)
+    )
+    if replayed:
+        response.headers[REPLAYED_HEADER] = "true"
     
     return result
 
+@router.get("/runner/queue")
+async def get_runner_queue():
+    """Current UiRobot queue depth, running jobs and wait-time counters."""
+    return scheduler.snapshot()
+
 @router.post("/runner/{identifier}", response_model=RunResponse)
 async def run_automation_by_identifier_path(
     request: Request,
-    identifier: str
+    response: Response,
+    identifier: str,
+    priority: int = Query(0, ge=-MAX_RUN_PRIORITY, le=MAX_RUN_PRIORITY),
+    idempotency_key: Optional[str] = Header(None, alias=IDEMPOTENCY_HEADER)
 ):
     """
     Run an automation by its ID or filename provided in the URL path.
     The 'arguments' from the request body are used if present, otherwise the entire body is used.
     """
-    # Capture the entire JSON body
-    try:
-        body = await request.json()
-    except Exception:
-        body = {}
-
-    # Logic: if body has an 'arguments' key, extract its contents (the sample payload).
-    # Otherwise, use the whole body as arguments.
-    automation_args = body.get("arguments", body) if isinstance(body, dict) else body
-    
-    if not isinstance(automation_args, dict):
-        automation_args = {}
+    automation_args = await _extract_arguments(request)
 
     logger.info(f"Running automation via path: {identifier}")
     
     # Execute automation using controller
-    result = await run_automation_by_identifier(identifier, automation_args)
-    
-    # Check if there was an error
-    if result.get("status") == "error":
-        msg = result.get("message", "Unknown error")
-        status_code = 404 if "not found" in msg.lower() else 400
-        raise HTTPException(status_code=status_code, detail=msg)
+    result, replayed = await run_idempotent(
+        request, idempotency_key,
+        lambda: _run_checked(request, identifier, automation_args, priority)
+    )
+    if replayed:
+        response.headers[REPLAYED_HEADER] = "true"
     
     return result
 
+@router.post("/runner/{identifier}/stream")
+async def stream_automation_by_identifier_path(
+    request: Request,
+    identifier: str,
+    priority: int = Query(0, ge=-MAX_RUN_PRIORITY, le=MAX_RUN_PRIORITY),
+    idempotency_key: Optional[str] = Header(None, alias=IDEMPOTENCY_HEADER)
+):
+    """
+    Run an automation and stream its stdout/stderr live as server-sent events.
+    The run keeps going if the client disconnects; reattach via /runner/jobs/{job_id}/stream,
+    or by repeating the request with the same Idempotency-Key.
+    """
+    automation_args = await _extract_arguments(request)
+
+    logger.info(f"Running automation via path (streaming): {identifier}")
+
+    run_log, replayed = await run_idempotent(
+        request, idempotency_key,
+        lambda: _start_checked_stream(request, identifier, automation_args, priority)
+    )
+    stream = _event_stream_response(run_log)
+    if replayed:
+        stream.headers[REPLAYED_HEADER] = "true"
+    return stream
+
+@router.get("/runner/jobs")
+async def get_runner_jobs():
+    """Queued and running UiRobot jobs, with their PIDs and timeouts."""
+    return list_uipath_jobs()
+
+@router.get("/runner/idempotency")
+async def get_idempotency_stats():
+    """Idempotency-Key cache size, in-flight keys and replay counters."""
+    return idempotency_cache.snapshot()
+
+@router.get("/runner/admission")
+async def get_admission_stats():
+    """Admitted and refused trade/run requests, by reason, and the configured limits."""
+    return admission.snapshot()
+
+@router.get("/runner/workers")
+async def get_runner_workers():
+    """Warm workers currently kept alive, with their run counts and idle time."""
+    return list_workers()
+
+@router.post("/runner/jobs/{job_id}/cancel")
+async def cancel_automation_job(job_id: str):
+    """
+    Cancel a queued or running job. A running robot has its whole process tree
+    killed; the original request then completes with status 'cancelled'.
+    """
+    if not await cancel_uipath_job(job_id):
+        raise HTTPException(status_code=404, detail=f"Job '{job_id}' not found or already finished")
+    return {"job_id": job_id, "status": "cancelling"}
+
+@router.get("/runner/jobs/{job_id}/stream")
+async def follow_automation_job(job_id: str):
+    """Replay the buffered output of a streaming run and follow it until it finishes."""
+    run_log = get_run_log(job_id)
+    if not run_log:
+        raise HTTPException(status_code=404, detail=f"Job '{job_id}' not found")
+    return _event_stream_response(run_log)
+
 @router.get("/runner/{identifier}", response_model=RunResponse)
-async def run_automation_by_identifier_get(identifier: str):
+async def run_automation_by_identifier_get(
+    request: Request,
+    response: Response,
+    identifier: str,
+    priority: int = Query(0, ge=-MAX_RUN_PRIORITY, le=MAX_RUN_PRIORITY),
+    idempotency_key: Optional[str] = Header(None, alias=IDEMPOTENCY_HEADER)
+):
     """
     Run an automation by its ID or filename via GET (no arguments).
     """
-    result = await run_automation_by_identifier(identifier, {})
-    
-    if result.get("status") == "error":
-        msg = result.get("message", "Unknown error")
-        status_code = 404 if "not found" in msg.lower() else 400
-        raise HTTPException(status_code=status_code, detail=msg)
+    result, replayed = await run_idempotent(request, idempotency_key, lambda: _run_checked(request, identifier, {}, priority))
+    if replayed:
+        response.headers[REPLAYED_HEADER] = "true"
         
     return result
@@ -1,9 +1,15 @@
-import asyncio
-from fastapi import APIRouter, HTTPException
+from fastapi import APIRouter, HTTPException, Header, Request, Response
 from pydantic import BaseModel, Field
 from typing import Literal, Optional
 from app.automation.ctrader.main import run as run_ctrader
 from app.automation.tradelocker.main import run as run_tradelocker
+from app.helper.executors import run_in, db_execute
+from app.helper.idempotency import run_idempotent, IDEMPOTENCY_HEADER, REPLAYED_HEADER
+from app.helper.admission import admission, client_id
+from app.helper.tracing import start_trace, export_enabled, export_trace
+from app.helper.deadline import Deadline, BudgetExhausted, DEFAULT_BUDGET_SECONDS
+from app.helper.humanization import resolve_profile_name
+from app.automation.selector_memory import selector_memory_stats
 
 router = APIRouter()
 
@@ -34,6 +40,8 @@ class CTraderTradeRequest(BaseModel):
         "default", 
         description="The operation to perform"
     )
+    budget_seconds: Optional[float] = Field(None, gt=0, description="Time budget for the whole request; defaults to TRADE_BUDGET_SECONDS")
+    humanization: Optional[Literal["off", "light", "realistic"]] = Field(None, description="Humanization profile; defaults to the account's, then HUMANIZATION_PROFILE")
 
 
 class TradeLockerTradeRequest(BaseModel):
@@ -51,6 +59,8 @@ class TradeLockerTradeRequest(BaseModel):
         "default",
         description="The operation to perform"
     )
+    budget_seconds: Optional[float] = Field(None, gt=0, description="Time budget for the whole request; defaults to TRADE_BUDGET_SECONDS")
+    humanization: Optional[Literal["off", "light", "realistic"]] = Field(None, description="Humanization profile; defaults to the account's, then HUMANIZATION_PROFILE")
 
 @router.get("/trade/credentials")
 async def get_ctrader_credentials():
@@ -58,7 +68,7 @@ async def get_ctrader_credentials():
     from app.core.supabase import get_supabase
     
     supabase = get_supabase()
-    response = supabase.table("credentials").select("*").eq("platform", "cTrader").execute()
+    response = await db_execute(supabase.table("credentials").select("*").eq("platform", "cTrader"))
     
     return response.data
 
@@ -69,31 +79,43 @@ async def get_platform_credentials(platform: str):
     from app.core.supabase import get_supabase
 
     supabase = get_supabase()
-    response = supabase.table("credentials").select("*").eq("platform", platform).execute()
+    response = await db_execute(supabase.table("credentials").select("*").eq("platform", platform))
 
     return response.data
 
-@router.post("/trade/ctrader")
-async def run_ctrader_automation(trade_data: CTraderTradeRequest):
+@router.get("/trade/selectors")
+async def get_selector_stats():
+    """Per-platform selector memory: remembered winners and first-try hit rates per UI element."""
+    return selector_memory_stats()
+
+async def _run_trade(request: Request, runner: str, run_func, budget_seconds: Optional[float] = None, **kwargs):
     """
-    Run cTrader automation using Playwright with validated trading parameters.
+    Runs a trading driver on its browser thread and maps its result to HTTP errors.
+    Refused with 503/429 up front if the browser is saturated or the caller/account is over its rate.
+    Every wait in the run is clamped to the request's time budget; running out is a 504.
+    Successful results carry a per-step `timings` breakdown of the run.
     """
+    platform = runner.split("-", 1)[-1]
+    admission.admit(client_id(request), f"{platform}:{kwargs['username'].lower()}", runner)
+
+    # Starts now, so time spent queued for the browser counts against the budget
+    budget_seconds = budget_seconds or DEFAULT_BUDGET_SECONDS
+    deadline = Deadline(budget_seconds) if budget_seconds > 0 else None
+    kwargs["humanization"] = resolve_profile_name(kwargs.get("humanization"), kwargs["username"], kwargs.get("account_id"))
+
+    trace = None
     try:
-        # Run the synchronous Playwright automation in a thread pool
-        # so it doesn't block the async event loop
-        result = await asyncio.to_thread(
-            run_ctrader,
-            username=trade_data.username,
-            password=trade_data.password,
-            purchase_type=trade_data.purchase_type,
-            order_amount=trade_data.order_amount,
-            take_profit=trade_data.take_profit,
-            stop_loss=trade_data.stop_loss,
-            account_id=trade_data.account_id,
-            db_account_id=trade_data.db_account_id,
-            symbol=trade_data.symbol,
-            operation=trade_data.operation,
-        )
+        with start_trace("trade", platform=platform, operation=kwargs.get("operation"), symbol=kwargs.get("symbol"),
+                         humanization=kwargs["humanization"]) as trace:
+            # Run the synchronous Playwright automation on the platform's browser thread
+            # so it doesn't block the async event loop (the trace follows it there)
+            result = await run_in(runner, run_func, deadline=deadline, **kwargs)
+
+        if deadline and deadline.exhausted_at and result.get("status") != "success":
+            raise HTTPException(
+                status_code=504,
+                detail=f"Budget exhausted at step {deadline.exhausted_at} ({budget_seconds:g}s budget)"
+            )
 
         if result.get("status") == "error":
             raise HTTPException(
@@ -101,44 +123,84 @@ async def run_ctrader_automation(trade_data: CTraderTradeRequest):
                 detail=result.get("message", "Automation failed to execute")
             )
 
+        result["timings"] = trace.breakdown()
         return result
 
     except HTTPException as e:
         raise e
+    except BudgetExhausted as e:
+        raise HTTPException(status_code=504, detail=f"Budget exhausted at step {e.step} ({e.budget_seconds:g}s budget)")
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Unexpected error: {str(e)}")
+    finally:
+        if trace and export_enabled():
+            await run_in("io", export_trace, trace)
 
 
-@router.post("/trade/tradelocker")
-async def run_tradelocker_automation(trade_data: TradeLockerTradeRequest):
+@router.post("/trade/ctrader")
+async def run_ctrader_automation(
+    request: Request,
+    response: Response,
+    trade_data: CTraderTradeRequest,
+    idempotency_key: Optional[str] = Header(None, alias=IDEMPOTENCY_HEADER)
+):
     """
-    Run TradeLocker automation using Playwright with validated trading parameters.
+    Run cTrader automation using Playwright with validated trading parameters.
+    Retries carrying the same Idempotency-Key get the first attempt's result
+    instead of placing another order.
     """
-    try:
-        result = await asyncio.to_thread(
-            run_tradelocker,
-            username=trade_data.username,
-            password=trade_data.password,
-            server=trade_data.server,
-            purchase_type=trade_data.purchase_type,
-            order_amount=trade_data.order_amount,
-            take_profit=trade_data.take_profit,
-            stop_loss=trade_data.stop_loss,
-            account_id=trade_data.account_id,
-            db_account_id=trade_data.db_account_id,
-            symbol=trade_data.symbol,
-            operation=trade_data.operation,
-        )
+    result, replayed = await run_idempotent(request, idempotency_key, lambda: _run_trade(
+        request,
+        "browser-ctrader",
+        run_ctrader,
+        username=trade_data.username,
+        password=trade_data.password,
+        purchase_type=trade_data.purchase_type,
+        order_amount=trade_data.order_amount,
+        take_profit=trade_data.take_profit,
+        stop_loss=trade_data.stop_loss,
+        account_id=trade_data.account_id,
+        db_account_id=trade_data.db_account_id,
+        symbol=trade_data.symbol,
+        operation=trade_data.operation,
+        budget_seconds=trade_data.budget_seconds,
+        humanization=trade_data.humanization,
+    ))
+    if replayed:
+        response.headers[REPLAYED_HEADER] = "true"
+    return result
 
-        if result.get("status") == "error":
-            raise HTTPException(
-                status_code=400,
-                detail=result.get("message", "Automation failed to execute")
-            )
 
-        return result
-
-    except HTTPException as e:
-        raise e
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=f"Unexpected error: {str(e)}")
+@router.post("/trade/tradelocker")
+async def run_tradelocker_automation(
+    request: Request,
+    response: Response,
+    trade_data: TradeLockerTradeRequest,
+    idempotency_key: Optional[str] = Header(None, alias=IDEMPOTENCY_HEADER)
+):
+    """
+    Run TradeLocker automation using Playwright with validated trading parameters.
+    Retries carrying the same Idempotency-Key get the first attempt's result
+    instead of placing another order.
+    """
+    result, replayed = await run_idempotent(request, idempotency_key, lambda: _run_trade(
+        request,
+        "browser-tradelocker",
+        run_tradelocker,
+        username=trade_data.username,
+        password=trade_data.password,
+        server=trade_data.server,
+        purchase_type=trade_data.purchase_type,
+        order_amount=trade_data.order_amount,
+        take_profit=trade_data.take_profit,
+        stop_loss=trade_data.stop_loss,
+        account_id=trade_data.account_id,
+        db_account_id=trade_data.db_account_id,
+        symbol=trade_data.symbol,
+        operation=trade_data.operation,
+        budget_seconds=trade_data.budget_seconds,
+        humanization=trade_data.humanization,
+    ))
+    if replayed:
+        response.headers[REPLAYED_HEADER] = "true"
+    return result
@@ -0,0 +1,88 @@
+"""
+Human mouse moves: the original point-by-point loop against the NumPy path in
+Human._human_mouse_move, on a fake page that counts Playwright calls.
+
+    python bench/mouse_path.py [seconds per Playwright call]
+
+With no call latency this measures the Python side only; pass e.g. 0.0005 to
+see how the number of round-trips shows up in wall time.
+"""
+import os
+import sys
+import math
+import time
+import random
+import importlib
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+Human = importlib.import_module("app.helper.humanize-automation-helper").Human
+
+CALL_SECONDS = float(sys.argv[1]) if len(sys.argv) > 1 else 0.0
+
+
+class FakeMouse:
+    def __init__(self, counters):
+        self.counters = counters
+
+    def move(self, x, y, steps=1):
+        self.counters["calls"] += 1
+        self.counters["points"] += steps
+        if CALL_SECONDS:
+            time.sleep(CALL_SECONDS)
+
+
+class FakePage:
+    def __init__(self):
+        self.counters = {"calls": 0, "points": 0}
+        self.mouse = FakeMouse(self.counters)
+        self.viewport_size = {"width": 1280, "height": 720}
+
+    def wait_for_timeout(self, ms):
+        self.counters["calls"] += 1
+        if CALL_SECONDS:
+            time.sleep(CALL_SECONDS)
+
+
+def loop_move(self, target_x, target_y):
+    """The implementation before the NumPy path: one move and one wait per point."""
+    steps = random.randint(15, 35)
+    start_x, start_y = self._last_x, self._last_y
+    ctrl_x = (start_x + target_x) / 2 + random.randint(-100, 100)
+    ctrl_y = (start_y + target_y) / 2 + random.randint(-80, 80)
+    for i in range(steps + 1):
+        t = i / steps
+        x = (1 - t) ** 2 * start_x + 2 * (1 - t) * t * ctrl_x + t ** 2 * target_x
+        y = (1 - t) ** 2 * start_y + 2 * (1 - t) * t * ctrl_y + t ** 2 * target_y
+        x += random.uniform(-1.5, 1.5)
+        y += random.uniform(-1.5, 1.5)
+        self.page.mouse.move(x, y)
+        speed_factor = math.sin(t * math.pi)
+        step_delay = max(1, random.randint(3, 12) - int(speed_factor * 5))
+        self.page.wait_for_timeout(step_delay)
+    self._last_x = target_x
+    self._last_y = target_y
+
+
+def bench(move, moves):
+    page = FakePage()
+    human = Human(page, profile="realistic")
+    targets = [(random.randint(80, 1200), random.randint(80, 640)) for _ in range(moves)]
+    cpu_started, wall_started = time.process_time(), time.perf_counter()
+    for x, y in targets:
+        move(human, x, y)
+    cpu = (time.process_time() - cpu_started) / moves * 1e6
+    wall = (time.perf_counter() - wall_started) / moves * 1e6
+    return cpu, wall, page.counters["calls"] / moves, page.counters["points"] / moves
+
+
+def main():
+    moves = 100 if CALL_SECONDS else 2000
+    for name, move in (("loop", loop_move), ("numpy", Human._human_mouse_move)):
+        cpu, wall, calls, points = bench(move, moves)
+        print(f"{name:6} cpu {cpu:8.1f} us/move  wall {wall:9.1f} us/move  "
+              f"playwright calls {calls:5.1f}/move  points sent {points:5.1f}/move")
+
+
+if __name__ == "__main__":
+    main()
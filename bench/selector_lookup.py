@@ -0,0 +1,79 @@
+"""
+Selector lookup latency on fixture pages: the old per-candidate is_visible()
+loop against toolkit.first_visible (one raced wait), for hits, late hits and
+misses, with and without `optional`.
+
+    python bench/selector_lookup.py [iterations]
+
+Needs a Playwright Chromium (`playwright install chromium`).
+"""
+import os
+import sys
+import time
+import statistics
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from playwright.sync_api import sync_playwright
+from app.automation.toolkit import first_visible
+
+CANDIDATES = [
+    'button[aria-label*="account" i]',
+    '[data-testid*="account-switcher" i]',
+    'button:has-text("Trading account")',
+    'button:has-text("Account")',
+]
+
+# The target matches the third candidate, so a loop has to get past two misses
+TARGET = '<button>Trading account</button>'
+FIXTURES = {
+    "hit": f"<body>{TARGET}</body>",
+    "late hit (200 ms)": f"""<body><script>
+        setTimeout(() => document.body.insertAdjacentHTML('beforeend', '{TARGET}'), 200);
+    </script></body>""",
+    "miss": "<body><button>Something else</button></body>",
+}
+
+
+def old_first_visible(page, selectors):
+    """The per-driver helper before the shared engine: is_visible() never waits."""
+    for selector in selectors:
+        try:
+            locator = page.locator(selector).first
+            if locator.is_visible():
+                return locator
+        except Exception:
+            continue
+    return None
+
+
+def measure(page, html, lookup, iterations):
+    samples, found = [], 0
+    for _ in range(iterations):
+        page.set_content(html)
+        started = time.perf_counter()
+        found += lookup(page) is not None
+        samples.append((time.perf_counter() - started) * 1000)
+    samples.sort()
+    return statistics.median(samples), samples[int(len(samples) * 0.95) - 1], found / iterations
+
+
+def main(iterations: int):
+    lookups = {
+        "old loop": lambda page: old_first_visible(page, CANDIDATES),
+        "first_visible": lambda page: first_visible(page, CANDIDATES, timeout=2000),
+        "first_visible optional": lambda page: first_visible(page, CANDIDATES, timeout=2000, optional=True),
+    }
+    with sync_playwright() as p:
+        browser = p.chromium.launch()
+        page = browser.new_page()
+        print(f"{'fixture':<18} {'lookup':<24} {'median ms':>10} {'p95 ms':>8} {'found':>6}")
+        for fixture, html in FIXTURES.items():
+            for name, lookup in lookups.items():
+                median, p95, found = measure(page, html, lookup, iterations)
+                print(f"{fixture:<18} {name:<24} {median:>10.1f} {p95:>8.1f} {found:>6.0%}")
+        browser.close()
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 20)
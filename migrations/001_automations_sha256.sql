@@ -0,0 +1,10 @@
+-- Content hash of each published package, used to skip re-publishing identical bytes.
+-- Safe to run more than once.
+alter table public.automations add column if not exists sha256 text;
+
+-- One row per package content; a concurrent duplicate upload fails with 23505
+-- and adopts the existing row instead. Rows published before this column
+-- existed keep a null hash and are not constrained.
+create unique index if not exists automations_sha256_key
+    on public.automations (sha256)
+    where sha256 is not null;
@@ -0,0 +1,20 @@
+import os
+import sys
+import tempfile
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+STUBS = os.path.join(ROOT, "tests", "stubs")
+
+if ROOT not in sys.path:
+    sys.path.insert(0, ROOT)
+
+# The Supabase client is created on import; the tests never reach it
+os.environ.setdefault("PUBLIC_SUPABASE_URL", "http://127.0.0.1:9")
+os.environ.setdefault("SUPABASE_SERVICE_SECRET_KEY", "test-key")
+# Run logs and the process registry go to a throwaway folder
+os.environ.setdefault("UIROBOT_LOG_FOLDER", tempfile.mkdtemp(prefix="uirobot-logs-"))
+
+
+def stub(name: str) -> str:
+    """Path of an executable stand-in from tests/stubs."""
+    return os.path.join(STUBS, name)
@@ -0,0 +1,62 @@
+"""A page stand-in for selector lookups, so the driver helpers can be tested without a browser."""
+import time
+
+from playwright.sync_api import Error as PlaywrightError, TimeoutError as PlaywrightTimeoutError
+
+
+class FakePage:
+    """
+    Just enough of a Playwright page for selector lookups: `appear` maps selector
+    -> seconds until visible; clicks on `unclickable` selectors fail, and any
+    query that includes an `invalid` selector raises like an unparseable one.
+    """
+
+    def __init__(self, appear, unclickable=(), invalid=()):
+        self.appear = appear
+        self.unclickable = set(unclickable)
+        self.invalid = set(invalid)
+        self.loaded_at = time.monotonic()
+
+    def visible(self, selector):
+        return selector in self.appear and time.monotonic() - self.loaded_at >= self.appear[selector]
+
+    def locator(self, selector):
+        return FakeLocator(self, [selector])
+
+
+class FakeLocator:
+    def __init__(self, page, selectors):
+        self.page = page
+        self.selectors = selectors
+
+    def or_(self, other):
+        return FakeLocator(self.page, self.selectors + other.selectors)
+
+    def filter(self, visible=None):
+        return self
+
+    @property
+    def first(self):
+        return self
+
+    def _check(self):
+        bad = self.page.invalid.intersection(self.selectors)
+        if bad:
+            raise PlaywrightError(f"Unexpected token in selector {bad.pop()!r}")
+
+    def is_visible(self):
+        self._check()
+        return any(self.page.visible(selector) for selector in self.selectors)
+
+    def wait_for(self, state, timeout):
+        self._check()
+        deadline = time.monotonic() + timeout / 1000
+        while time.monotonic() < deadline:
+            if self.is_visible():
+                return
+            time.sleep(0.005)
+        raise PlaywrightTimeoutError("timeout")
+
+    def click(self, timeout=None):
+        if self.page.unclickable.intersection(self.selectors):
+            raise PlaywrightTimeoutError("element is covered")
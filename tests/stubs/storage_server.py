@@ -0,0 +1,123 @@
+"""
+Stand-in for the Supabase Storage endpoints the server uses: simple object
+uploads, the TUS resumable upload protocol and object downloads.
+
+Failures can be injected to exercise the retry paths:
+  drop_patches  PATCH requests (after the first chunk) that store 1000 bytes
+                and then drop the connection without answering
+  drop_heads    HEAD (offset) requests that drop the connection
+"""
+import base64
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+class StorageState:
+    def __init__(self):
+        self.objects = {}
+        self.uploads = {}
+        self.drop_patches = 0
+        self.drop_heads = 0
+        self.requests = []
+        self.lock = threading.Lock()
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    @property
+    def state(self) -> StorageState:
+        return self.server.state
+
+    def log_message(self, *args):
+        pass
+
+    def _body(self) -> bytes:
+        if self.headers.get("Transfer-Encoding") == "chunked":
+            data = b""
+            while True:
+                size = int(self.rfile.readline().strip(), 16)
+                if size == 0:
+                    self.rfile.readline()
+                    return data
+                data += self.rfile.read(size)
+                self.rfile.readline()
+        return self.rfile.read(int(self.headers.get("Content-Length", 0)))
+
+    def _send(self, code: int, headers: dict = None, body: bytes = b""):
+        self.send_response(code)
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _drop(self):
+        self.close_connection = True
+        self.connection.close()
+
+    def _upload(self):
+        return self.state.uploads.get(self.path.rsplit("/", 1)[1])
+
+    def do_POST(self):
+        self.state.requests.append(("POST", self.path))
+        if self.path.startswith("/storage/v1/object/"):
+            name = self.path.split("/", 5)[5]
+            data = self._body()
+            if name in self.state.objects and self.headers.get("x-upsert") != "true":
+                return self._send(409, body=b'{"error":"Duplicate","message":"The resource already exists"}')
+            self.state.objects[name] = data
+            return self._send(200, body=b"{}")
+
+        metadata = dict(item.split(" ") for item in self.headers["Upload-Metadata"].split(","))
+        with self.state.lock:
+            upload_id = str(len(self.state.uploads))
+            self.state.uploads[upload_id] = {
+                "length": int(self.headers["Upload-Length"]),
+                "data": b"",
+                "name": base64.b64decode(metadata["objectName"]).decode("utf-8"),
+            }
+        self._send(201, {"Location": f"/storage/v1/upload/resumable/{upload_id}"})
+
+    def do_HEAD(self):
+        self.state.requests.append(("HEAD", self.path))
+        if self.state.drop_heads > 0:
+            self.state.drop_heads -= 1
+            return self._drop()
+        upload = self._upload()
+        if upload is None:
+            return self._send(404)
+        self._send(200, {"Upload-Offset": str(len(upload["data"]))})
+
+    def do_PATCH(self):
+        self.state.requests.append(("PATCH", self.path))
+        upload = self._upload()
+        data = self._body()
+        if upload is None:
+            return self._send(404)
+        if int(self.headers["Upload-Offset"]) != len(upload["data"]):
+            return self._send(409, body=b"offset mismatch")
+        if upload["data"] and self.state.drop_patches > 0:
+            # The server keeps part of the chunk, the client never hears back
+            self.state.drop_patches -= 1
+            upload["data"] += data[:1000]
+            return self._drop()
+        upload["data"] += data
+        if len(upload["data"]) == upload["length"]:
+            self.state.objects[upload["name"]] = upload["data"]
+        self._send(204, {"Upload-Offset": str(len(upload["data"]))})
+
+    def do_GET(self):
+        self.state.requests.append(("GET", self.path))
+        name = self.path.split("/", 5)[5]
+        if name not in self.state.objects:
+            return self._send(404, body=b"not found")
+        self._send(200, {"Content-Type": "application/octet-stream"}, self.state.objects[name])
+
+
+def start_storage_server():
+    """Starts the stub on a free local port. Returns (server, state, base_url); call server.shutdown() when done."""
+    server = ThreadingHTTPServer(("127.0.0.1", 0), _Handler)
+    server.state = StorageState()
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, server.state, f"http://127.0.0.1:{server.server_address[1]}"
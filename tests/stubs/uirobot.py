@@ -0,0 +1,36 @@
+#!/usr/bin/env python3
+"""
+Stand-in for UiRobot.exe: `uirobot.py execute (--process NAME | --file PATH) [--input JSON]`.
+
+The input arguments drive what it does:
+  sleep      seconds to run before exiting
+  lines      number of "line N" lines to print to stdout
+  long_line  length of one extra stdout line (no newline inside)
+  stderr     text to print to stderr
+  exit_code  process exit code (default 0)
+"""
+import sys
+import json
+import time
+
+
+def main(argv):
+    arguments = {}
+    if "--input" in argv:
+        arguments = json.loads(argv[argv.index("--input") + 1])
+
+    print(f"started {' '.join(argv[1:3])}", flush=True)
+    for i in range(int(arguments.get("lines", 0))):
+        print(f"line {i}")
+    if arguments.get("long_line"):
+        print("x" * int(arguments["long_line"]))
+    sys.stdout.flush()
+    if arguments.get("stderr"):
+        print(arguments["stderr"], file=sys.stderr, flush=True)
+    time.sleep(float(arguments.get("sleep", 0)))
+    print("finished", flush=True)
+    return int(arguments.get("exit_code", 0))
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
@@ -0,0 +1,37 @@
+#!/usr/bin/env python3
+"""
+Stand-in for the warm worker (`worker.py --file PATH`), speaking the JSON-lines
+protocol described in app/helper/uipath_worker.py.
+
+Each run echoes its input as one "line" event, prints a stray non-JSON line and
+then reports its result. The input arguments drive what it does:
+  sleep      seconds to work before answering
+  exit_code  exit code to report (default 0)
+  crash      exit the whole worker without answering
+"""
+import os
+import sys
+import json
+import time
+
+
+def send(message: dict):
+    print(json.dumps(message), flush=True)
+
+
+def main():
+    send({"event": "ready"})
+    for raw in sys.stdin:
+        request = json.loads(raw)
+        arguments = request.get("input") or {}
+        if arguments.get("crash"):
+            os._exit(9)
+        time.sleep(float(arguments.get("sleep", 0)))
+        send({"id": request["id"], "event": "line", "stream": "stdout",
+              "line": f"pid {os.getpid()} got {json.dumps(arguments, sort_keys=True)}"})
+        print("stray text", flush=True)
+        send({"id": request["id"], "event": "result", "exit_code": int(arguments.get("exit_code", 0))})
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,32 @@
+import pytest
+from fastapi import HTTPException, Request
+
+from app.helper import admission as admission_module
+from app.helper.admission import AdmissionController, client_id
+
+
+def _request(peer, forwarded=None):
+    headers = [(b"cf-connecting-ip", forwarded.encode())] if forwarded else []
+    return Request({"type": "http", "headers": headers, "client": (peer, 50000)})
+
+
+def test_client_header_is_only_trusted_from_configured_proxies(monkeypatch):
+    monkeypatch.setattr(admission_module, "TRUSTED_PROXIES", {"127.0.0.1"})
+
+    assert client_id(_request("127.0.0.1", "203.0.113.7, 10.0.0.1")) == "203.0.113.7"
+    assert client_id(_request("198.51.100.2", "203.0.113.7")) == "198.51.100.2"
+    assert client_id(_request("127.0.0.1")) == "127.0.0.1"
+
+
+def test_disabled_admission_lets_a_fan_out_through(monkeypatch):
+    monkeypatch.setattr(admission_module, "ADMISSION_ENABLED", False)
+    controller = AdmissionController()
+    for _ in range(50):
+        controller.admit("198.51.100.2", "ctrader:alice", "runner")
+
+    monkeypatch.setattr(admission_module, "ADMISSION_ENABLED", True)
+    with pytest.raises(HTTPException) as error:
+        for _ in range(50):
+            controller.admit("198.51.100.2", "ctrader:alice", "runner")
+    assert error.value.status_code == 429
+    assert "Retry-After" in error.value.headers
@@ -0,0 +1,77 @@
+import asyncio
+
+import pytest
+from postgrest.exceptions import APIError
+
+from app.helper import automation_index
+
+
+class FakeCatalog:
+    """`automations` table that records which columns each read selected."""
+
+    def __init__(self, rows, has_sha256=True):
+        self.rows = rows
+        self.has_sha256 = has_sha256
+        self.selects = []
+
+    def table(self, name):
+        assert name == "automations"
+        return self
+
+    def select(self, columns):
+        self.selects.append(columns)
+        self.columns = [column.strip() for column in columns.split(",")]
+        return self
+
+    def execute(self):
+        if "sha256" in self.columns and not self.has_sha256:
+            raise APIError({"code": "42703", "message": "column automations.sha256 does not exist"})
+        rows = [{column: row.get(column) for column in self.columns} for row in self.rows]
+        return type("Response", (), {"data": rows})()
+
+
+def _row(id, file_name, version):
+    return {"id": id, "file_name": file_name, "version": version, "created_at": "2026-01-01", "notes": "x" * 1000}
+
+
+@pytest.fixture
+def catalog(monkeypatch):
+    table = FakeCatalog([_row("1", "Report.1.0.9.nupkg", "1.0.9"), _row("2", "Report.1.0.10.nupkg", "1.0.10")])
+    monkeypatch.setattr(automation_index, "get_supabase", lambda: table)
+    monkeypatch.setattr(automation_index, "_index", {})
+    monkeypatch.setattr(automation_index, "_loaded_at", None)
+    monkeypatch.setattr(automation_index, "_refresh_lock", None)
+    return table
+
+
+def test_lookup_reads_only_the_catalog_columns(catalog):
+    latest = asyncio.run(automation_index.latest_automation("report"))
+
+    assert latest["id"] == "2"
+    assert catalog.selects == [automation_index.CATALOG_COLUMNS]
+    assert "notes" not in latest
+
+
+def test_miss_reloads_once_within_the_refresh_interval(catalog, monkeypatch):
+    asyncio.run(automation_index.latest_automation("report"))
+    # Published on another unit a while after the index was loaded
+    catalog.rows.append(_row("3", "Invoice.1.0.0.nupkg", "1.0.0"))
+    monkeypatch.setattr(automation_index, "_loaded_at", automation_index._loaded_at - automation_index.MISS_REFRESH_SEC)
+
+    found = asyncio.run(automation_index.latest_automation("Invoice.1.0.0.nupkg"))
+    missing = asyncio.run(automation_index.latest_automation("unknown"))
+
+    assert found["id"] == "3"
+    assert missing is None
+    # The first lookup loaded the index and the Invoice miss reloaded it; the
+    # "unknown" miss came within MISS_REFRESH_SEC of that and did not
+    assert len(catalog.selects) == 2
+
+
+def test_catalog_without_sha256_is_read_without_it(catalog):
+    catalog.has_sha256 = False
+
+    rows = automation_index.fetch_catalog()
+
+    assert catalog.selects == [automation_index.CATALOG_COLUMNS, automation_index.LEGACY_CATALOG_COLUMNS]
+    assert {row["id"] for row in rows} == {"1", "2"}
@@ -0,0 +1,111 @@
+import io
+import asyncio
+import hashlib
+import zipfile
+
+import pytest
+from fastapi import UploadFile
+from postgrest.exceptions import APIError
+
+from app.controller import automation_controller as controller
+
+
+class FakeAutomations:
+    """In-memory `automations` table that answers like PostgREST does."""
+
+    def __init__(self, has_sha256=True):
+        self.has_sha256 = has_sha256
+        self.rows = []
+        self.inserts = []
+        # Row another unit inserts between our lookup and our insert
+        self.racing_row = None
+
+    def table(self, name):
+        assert name == "automations"
+        return FakeQuery(self)
+
+
+class FakeQuery:
+    def __init__(self, table):
+        self.table = table
+        self.filters = []
+        self.data = None
+
+    def select(self, *_):
+        return self
+
+    def eq(self, column, value):
+        self.filters.append((column, value))
+        return self
+
+    def limit(self, _):
+        return self
+
+    def insert(self, data):
+        self.data = dict(data)
+        return self
+
+    def execute(self):
+        table = self.table
+        if self.data is not None:
+            table.inserts.append(self.data)
+            if "sha256" in self.data and not table.has_sha256:
+                raise APIError({"code": "PGRST204", "message": "Could not find the 'sha256' column of 'automations' in the schema cache"})
+            if table.racing_row:
+                table.rows.append(table.racing_row)
+                table.racing_row = None
+            if any(row.get("sha256") == self.data.get("sha256") for row in table.rows if row.get("sha256")):
+                raise APIError({"code": "23505", "message": 'duplicate key value violates unique constraint "automations_sha256_key"'})
+            row = {"id": f"row-{len(table.rows) + 1}", **self.data}
+            table.rows.append(row)
+            return type("Response", (), {"data": [row]})()
+        if any(column == "sha256" for column, _ in self.filters) and not table.has_sha256:
+            raise APIError({"code": "42703", "message": "column automations.sha256 does not exist"})
+        rows = [row for row in table.rows if all(row.get(column) == value for column, value in self.filters)]
+        return type("Response", (), {"data": rows})()
+
+
+def _package(name):
+    buffer = io.BytesIO()
+    with zipfile.ZipFile(buffer, "w") as archive:
+        archive.writestr("content/project.json", '{"name": "%s"}' % name)
+    return buffer.getvalue()
+
+
+@pytest.fixture
+def upload(tmp_path, monkeypatch):
+    monkeypatch.setenv("PUBLISH_AUTOMATION_FOLDER", str(tmp_path))
+    monkeypatch.setattr(controller, "_sha256_column", None)
+    monkeypatch.setattr(controller, "upload_package", lambda *args, **kwargs: None)
+
+    def _upload(table, file_name, content):
+        monkeypatch.setattr(controller, "get_supabase", lambda: table)
+        file = UploadFile(file=io.BytesIO(content), filename=file_name)
+        return asyncio.run(controller.create_new_automation(file))
+    return _upload
+
+
+def test_upload_without_sha256_column_falls_back_to_plain_insert(upload):
+    table = FakeAutomations(has_sha256=False)
+    row = upload(table, "Report.1.0.0.nupkg", _package("Report"))
+
+    assert row["file_name"] == "Report.1.0.0.nupkg"
+    assert "sha256" not in row
+    # Later uploads skip the hash lookup and insert without the column straight away
+    upload(table, "Other.1.0.0.nupkg", _package("Other"))
+    assert "sha256" not in table.inserts[-1]
+    assert len(table.inserts) == 2
+
+
+def test_concurrent_upload_of_same_bytes_adopts_the_winning_row(upload, tmp_path):
+    content = _package("Report")
+    table = FakeAutomations()
+    winner = {"id": "row-winner", "file_name": "Report.1.0.0.nupkg", "version": "1.0.0"}
+    winner["sha256"] = hashlib.sha256(content).hexdigest()
+    table.racing_row = winner
+
+    row = upload(table, "Report.1.0.0.nupkg", content)
+
+    assert row["id"] == "row-winner"
+    assert [r["id"] for r in table.rows] == ["row-winner"]
+    assert (tmp_path / "Report.1.0.0.nupkg").exists()
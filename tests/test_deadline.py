@@ -0,0 +1,29 @@
+import pytest
+
+from app.helper import deadline as deadline_module
+from app.helper.deadline import Deadline, BudgetExhausted, budget, with_deadline
+
+
+def test_budget_never_hands_playwright_a_zero_timeout():
+    @with_deadline
+    def run():
+        return budget(0), budget(5000)
+
+    zero, clamped = run(deadline=Deadline(10))
+    assert zero == 1.0
+    assert 1.0 <= clamped <= 5000
+
+
+def test_budget_raises_once_less_than_a_millisecond_is_left(monkeypatch):
+    @with_deadline
+    def run():
+        return budget(5000)
+
+    deadline = Deadline(10)
+    monkeypatch.setattr(deadline, "remaining_ms", lambda: 0.5)
+    with pytest.raises(BudgetExhausted):
+        run(deadline=deadline)
+
+    # Outside a deadline, waits are left alone
+    assert budget(0) == 0
+    assert deadline_module.current_deadline() is None
@@ -0,0 +1,63 @@
+import io
+import os
+import sys
+import json
+import asyncio
+import zipfile
+import hashlib
+
+import pytest
+
+from conftest import stub
+from app.helper import package_cache, uipath
+
+
+def _nupkg(path):
+    buffer = io.BytesIO()
+    with zipfile.ZipFile(buffer, "w") as archive:
+        archive.writestr("Bot.nuspec", "<package/>")
+        archive.writestr("lib/net45/project.json", json.dumps({"name": "Bot", "main": "Main.xaml"}))
+        archive.writestr("lib/net45/Main.xaml", "<Activity/>")
+    path.write_bytes(buffer.getvalue())
+    return str(path), hashlib.sha256(buffer.getvalue()).hexdigest()
+
+
+@pytest.fixture
+def publish_folder(tmp_path, monkeypatch):
+    monkeypatch.setenv("PUBLISH_AUTOMATION_FOLDER", str(tmp_path))
+    monkeypatch.setenv("PACKAGE_CACHE_FOLDER", str(tmp_path / ".extracted"))
+    monkeypatch.setattr(package_cache, "RUN_EXTRACTED", True)
+    package_cache._resolved.clear()
+    return tmp_path
+
+
+@pytest.mark.skipif(sys.platform == "win32", reason="the stub robot is a POSIX script")
+def test_robot_runs_the_extracted_project(publish_folder, monkeypatch):
+    monkeypatch.setenv("UI_ROBOT_PATH", stub("uirobot.py"))
+    package, sha256 = _nupkg(publish_folder / "Bot.1.0.1.nupkg")
+
+    result = asyncio.run(uipath.run_uipath_automation("Bot.1.0.1.nupkg", {}, is_file=True))
+
+    target = package_cache._cache_dir("Bot.1.0.1.nupkg", sha256)
+    with open(os.path.join(target, package_cache.PREPARED_MARKER), encoding="utf-8") as f:
+        marker = json.load(f)
+    assert marker["sha256"] == sha256
+    assert marker["project_json"] == os.path.join(target, "lib", "net45", "project.json")
+    assert result["status"] == "success"
+    assert f"--file {marker['project_json']}" in result["stdout"]
+    assert package_cache.get_cache_stats()["entries"] == 1
+
+
+def test_prepare_replaces_a_target_left_without_its_marker(publish_folder):
+    package, sha256 = _nupkg(publish_folder / "Bot.1.0.1.nupkg")
+    # What an interrupted removal leaves behind
+    target = package_cache._cache_dir("Bot.1.0.1.nupkg", sha256)
+    os.makedirs(os.path.join(target, "lib"))
+
+    info = package_cache.prepare_package(package, sha256)
+
+    assert os.path.exists(os.path.join(target, package_cache.PREPARED_MARKER))
+    assert os.path.exists(info["project_json"])
+
+    package_cache.remove_prepared("Bot.1.0.1.nupkg")
+    assert os.listdir(os.path.dirname(target)) == []
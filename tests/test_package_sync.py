@@ -0,0 +1,43 @@
+import asyncio
+
+import pytest
+from fastapi import HTTPException
+
+from stubs.storage_server import start_storage_server
+from app.controller import automation_controller as controller
+from app.helper import package_store, package_sync
+
+
+@pytest.fixture
+def storage(tmp_path, monkeypatch):
+    server, state, base_url = start_storage_server()
+    monkeypatch.setenv("PUBLIC_SUPABASE_URL", base_url)
+    monkeypatch.setenv("PUBLISH_AUTOMATION_FOLDER", str(tmp_path))
+    monkeypatch.setenv("PACKAGE_CACHE_FOLDER", str(tmp_path / ".extracted"))
+    yield state
+    server.shutdown()
+
+
+def test_legacy_row_is_hashed_once(storage, tmp_path, monkeypatch):
+    (tmp_path / "Report.1.0.0.nupkg").write_bytes(b"package bytes")
+    row = {"id": "1", "file_name": "Report.1.0.0.nupkg"}
+    hashed = []
+    real_hash_file = package_store.hash_file
+    monkeypatch.setattr(package_store, "hash_file", lambda path: hashed.append(path) or real_hash_file(path))
+
+    assert asyncio.run(package_sync.ensure_local_package(row))
+    assert asyncio.run(package_sync.ensure_local_package(row))
+
+    # The row has no sha256, so the first check hashes the file and records it
+    assert len(hashed) == 1
+    assert storage.requests == []
+
+
+def test_run_answers_503_when_the_package_cannot_be_fetched(storage):
+    row = {"id": "2", "file_name": "Missing.1.0.0.nupkg", "sha256": "0" * 64}
+
+    assert not asyncio.run(package_sync.ensure_local_package(row))
+    with pytest.raises(HTTPException) as error:
+        asyncio.run(controller._require_local_package(row))
+    assert error.value.status_code == 503
+    assert "404" in error.value.detail
@@ -0,0 +1,22 @@
+import logging
+
+from stubs.fake_page import FakePage
+from app.automation.selector_engine import resolve
+
+
+def test_unparseable_candidate_is_dropped_and_the_rest_still_waited_for(caplog):
+    page = FakePage({"#late": 0.2}, invalid={"button:has-text("})
+
+    with caplog.at_level(logging.WARNING):
+        match = resolve(page, ["button:has-text(", "#late"], timeout=2000)
+
+    assert match is not None and match.selector == "#late"
+    assert "button:has-text(" in caplog.text
+
+
+def test_match_index_is_the_position_in_the_callers_list():
+    page = FakePage({"#b": 0})
+
+    match = resolve(page, ["", "#a", "#b"], timeout=500)
+
+    assert match.index == 2
@@ -0,0 +1,46 @@
+import pytest
+
+from stubs.fake_page import FakePage
+from app.automation import selector_memory, toolkit
+
+SELECTORS = ["#codegen", "#fallback-a", "#fallback-b"]
+
+
+@pytest.fixture
+def memory(tmp_path, monkeypatch):
+    monkeypatch.setenv("SELECTOR_MEMORY_FOLDER", str(tmp_path))
+    monkeypatch.setattr(selector_memory, "_memories", {})
+    monkeypatch.setattr(toolkit, "RETRY_DELAY_MS", 0)
+    return selector_memory.get_selector_memory("test")
+
+
+def test_remembered_fallback_never_outranks_the_codegen_selector(memory):
+    # The codegen selector was missing once, so a fallback got remembered
+    memory.resolve(FakePage({"#fallback-b": 0}), "button", SELECTORS, timeout=100)
+    assert memory.winner("button") == "#fallback-b"
+
+    # Among fallbacks, the remembered one goes first
+    match = memory.resolve(FakePage({"#fallback-a": 0, "#fallback-b": 0}), "button", SELECTORS, timeout=100)
+    assert match.selector == "#fallback-b"
+
+    # Whenever the codegen selector is visible, it wins
+    match = memory.resolve(FakePage({"#codegen": 0, "#fallback-b": 0}), "button", SELECTORS, timeout=100)
+    assert match.selector == "#codegen"
+
+
+def test_winner_is_dropped_after_repeated_misses(memory, monkeypatch):
+    monkeypatch.setattr(selector_memory, "DEMOTE_AFTER", 2)
+    memory.resolve(FakePage({"#fallback-a": 0}), "button", SELECTORS, timeout=100)
+
+    memory.resolve(FakePage({}), "button", SELECTORS, timeout=50)
+    assert memory.winner("button") == "#fallback-a"
+    memory.resolve(FakePage({}), "button", SELECTORS, timeout=50)
+    assert memory.winner("button") is None
+
+
+def test_failed_click_demotes_the_winner(memory):
+    memory.resolve(FakePage({"#fallback-a": 0}), "button", SELECTORS, timeout=100)
+
+    page = FakePage({"#fallback-a": 0}, unclickable={"#fallback-a"})
+    assert not toolkit.click_first(page, SELECTORS, timeout=100, element="button", platform="test")
+    assert memory.winner("button") is None
@@ -0,0 +1,50 @@
+import os
+
+import pytest
+
+from stubs.storage_server import start_storage_server
+from app.helper import storage_upload
+
+
+@pytest.fixture
+def storage(monkeypatch):
+    server, state, base_url = start_storage_server()
+    monkeypatch.setenv("PUBLIC_SUPABASE_URL", base_url)
+    # Small chunks and no backoff keep the resumable path fast
+    monkeypatch.setattr(storage_upload, "TUS_CHUNK_SIZE", 64 * 1024)
+    monkeypatch.setattr(storage_upload, "RESUMABLE_THRESHOLD", 128 * 1024)
+    monkeypatch.setattr(storage_upload.time, "sleep", lambda _: None)
+    storage_upload._pending_uploads.clear()
+    yield state
+    server.shutdown()
+
+
+def _package(tmp_path, name, size):
+    path = tmp_path / name
+    path.write_bytes(os.urandom(size))
+    return str(path)
+
+
+def test_small_package_is_posted_once_and_duplicates_are_reported(storage, tmp_path):
+    path = _package(tmp_path, "Small.1.0.0.nupkg", 50_000)
+
+    storage_upload.upload_package(path, "automation", "Small.1.0.0.nupkg")
+    assert storage.objects["Small.1.0.0.nupkg"] == open(path, "rb").read()
+
+    with pytest.raises(storage_upload.StorageUploadError) as error:
+        storage_upload.upload_package(path, "automation", "Small.1.0.0.nupkg")
+    assert error.value.is_duplicate
+
+
+def test_resumable_upload_survives_dropped_chunk_and_offset_query(storage, tmp_path):
+    path = _package(tmp_path, "Big.1.0.0.nupkg", 300_000)
+    storage.drop_patches = 1
+    # The offset re-query after the dropped chunk fails too; it is retried like the chunk
+    storage.drop_heads = 1
+
+    storage_upload.upload_package(path, "automation", "Big.1.0.0.nupkg")
+
+    assert storage.objects["Big.1.0.0.nupkg"] == open(path, "rb").read()
+    assert storage.drop_patches == 0 and storage.drop_heads == 0
+    progress = {entry["object"]: entry for entry in storage_upload.get_upload_progress()}
+    assert progress["Big.1.0.0.nupkg"]["state"] == "done"
@@ -0,0 +1,92 @@
+import time
+
+from stubs.fake_page import FakePage
+from app.automation import toolkit
+from app.helper.humanization import use_profile
+
+
+def _timed(func):
+    started = time.monotonic()
+    result = func()
+    return result, time.monotonic() - started
+
+
+def test_optional_miss_is_capped(monkeypatch):
+    monkeypatch.setattr(toolkit, "OPTIONAL_PROBE_MS", 100)
+    page = FakePage({})
+
+    found, elapsed = _timed(lambda: toolkit.first_visible(page, ["#a", "#b"], timeout=2000, optional=True))
+
+    assert found is None
+    assert 0.08 <= elapsed < 0.5
+
+
+def test_required_lookup_still_waits_for_a_late_element(monkeypatch):
+    monkeypatch.setattr(toolkit, "OPTIONAL_PROBE_MS", 100)
+    page = FakePage({"#b": 0.3})
+
+    found, elapsed = _timed(lambda: toolkit.first_visible(page, ["#a", "#b"], timeout=2000))
+
+    assert found is not None and found.selectors == ["#b"]
+    assert elapsed < 1.0
+
+
+class RecordingPage:
+    """Records keyboard and mouse calls, and the pauses between them."""
+
+    def __init__(self):
+        self.calls = []
+        self.keyboard = self.mouse = self
+        self.viewport_size = {"width": 1280, "height": 720}
+
+    def type(self, text, delay=0):
+        self.calls.append(("type", text))
+
+    def move(self, x, y, steps=1):
+        self.calls.append(("move", round(x), round(y), steps))
+
+    def click(self, x, y):
+        self.calls.append(("click", x, y))
+
+    def wait_for_timeout(self, ms):
+        self.calls.append(("pause", ms))
+
+
+def test_typing_follows_the_humanization_profile():
+    page = RecordingPage()
+    with use_profile("off"):
+        toolkit.type_keys(page, "EURUSD", 100, 200)
+    assert page.calls == [("type", "EURUSD")]
+
+    page = RecordingPage()
+    with use_profile("realistic"):
+        toolkit.type_keys(page, "EURUSD", 100, 200)
+    assert [call[1] for call in page.calls if call[0] == "type"] == list("EURUSD")
+    assert all(100 <= call[1] <= 200 for call in page.calls if call[0] == "pause")
+
+
+def test_click_at_moves_along_a_path_unless_mouse_humanization_is_off():
+    page = RecordingPage()
+    with use_profile("off"):
+        toolkit.click_at(page, 500, 15)
+    assert page.calls == [("click", 500, 15)]
+
+    page = RecordingPage()
+    with use_profile("realistic"):
+        toolkit.click_at(page, 500, 15)
+    moves = [call for call in page.calls if call[0] == "move"]
+    assert len(moves) > 1 and page.calls[-1] == ("click", 500, 15)
+
+
+def test_mouse_moves_send_every_point_of_the_curve():
+    page = RecordingPage()
+    with use_profile("realistic"):
+        human = toolkit.human(page)
+        human._human_mouse_move(900, 500)
+    moves = [call for call in page.calls if call[0] == "move"]
+
+    # One move per computed point; Playwright never interpolates a straight segment
+    assert all(call[3] == 1 for call in moves)
+    assert len(moves) > human.points_per_segment
+    # The last point is the target, give or take the tremor
+    assert abs(moves[-1][1] - 900) <= 2 and abs(moves[-1][2] - 500) <= 2
@@ -0,0 +1,99 @@
+import sys
+import asyncio
+
+import httpx
+import pytest
+from fastapi import FastAPI
+
+from conftest import stub
+from app.helper import uipath
+from app.helper.uipath_scheduler import JobScheduler
+from app.routes import runner_route
+
+pytestmark = pytest.mark.skipif(sys.platform == "win32", reason="the stub robot is a POSIX script")
+
+
+@pytest.fixture
+def runner_app(monkeypatch):
+    monkeypatch.setenv("UI_ROBOT_PATH", stub("uirobot.py"))
+    monkeypatch.setattr(uipath, "scheduler", JobScheduler(max_concurrency=1, queue_timeout=0.3))
+
+    # Skip the automation lookup in Supabase: run the identifier as a process name
+    async def _run(identifier, arguments, priority=0):
+        return await uipath.run_uipath_automation(identifier, arguments, priority=priority)
+
+    monkeypatch.setattr(runner_route, "run_automation_by_identifier", _run)
+    app = FastAPI()
+    app.include_router(runner_route.router, prefix="/api/v1")
+    return app
+
+
+def _post_runs(app, *bodies):
+    async def _main():
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+            return await asyncio.gather(*(client.post("/api/v1/runner", json=body) for body in bodies))
+    return asyncio.run(_main())
+
+
+def test_run_succeeds_with_stub_robot(runner_app):
+    (response,) = _post_runs(runner_app, {"identifier": "Report", "arguments": {"lines": 2}})
+
+    assert response.status_code == 200
+    body = response.json()
+    assert body["status"] == "success"
+    assert "line 1" in body["stdout"]
+
+
+def test_queue_timeout_returns_503_with_retry_after(runner_app):
+    slow = {"identifier": "Report", "arguments": {"sleep": 1.5}}
+    queued = {"identifier": "Report", "arguments": {}}
+
+    first, second = _post_runs(runner_app, slow, queued)
+
+    assert first.status_code == 200
+    assert second.status_code == 503
+    assert second.headers["Retry-After"] == "30"
+    assert "run queue" in second.json()["detail"]
+
+
+def test_job_outlives_a_cancelled_caller(monkeypatch):
+    monkeypatch.setenv("UI_ROBOT_PATH", stub("uirobot.py"))
+    monkeypatch.setattr(uipath, "scheduler", JobScheduler(max_concurrency=1, queue_timeout=5))
+
+    async def _main():
+        caller = asyncio.create_task(uipath.run_uipath_automation("Report", {"sleep": 30}))
+        while not any(job["pid"] for job in uipath.list_uipath_jobs()):
+            await asyncio.sleep(0.05)
+        (job,) = uipath.list_uipath_jobs()
+
+        # A client disconnect cancels the caller, not the robot
+        caller.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await caller
+        listed = [j["job_id"] for j in uipath.list_uipath_jobs()]
+
+        cancelled = await uipath.cancel_uipath_job(job["job_id"])
+        result = await uipath.get_uipath_job(job["job_id"]).task
+        return job, listed, cancelled, result, uipath.list_uipath_jobs()
+
+    job, listed, cancelled, result, remaining = asyncio.run(_main())
+
+    assert listed == [job["job_id"]]
+    assert cancelled
+    assert result["status"] == "cancelled"
+    assert remaining == []
+
+
+def test_priority_outside_the_allowed_range_is_refused(runner_app):
+    async def _main():
+        transport = httpx.ASGITransport(app=runner_app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+            body = await client.post("/api/v1/runner", json={"identifier": "Report", "priority": 1000})
+            query = await client.post("/api/v1/runner/Report?priority=1000", json={})
+            return body, query
+
+    body, query = asyncio.run(_main())
+
+    assert body.status_code == 422
+    assert query.status_code == 422
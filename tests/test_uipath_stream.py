@@ -0,0 +1,80 @@
+import sys
+import time
+import asyncio
+
+import pytest
+
+from conftest import stub
+from app.helper import uipath
+from app.helper.run_log import create_run_log
+from app.helper.uipath_scheduler import JobScheduler
+
+pytestmark = pytest.mark.skipif(sys.platform == "win32", reason="the stub robot is a POSIX script")
+
+
+@pytest.fixture(autouse=True)
+def stub_robot(monkeypatch):
+    monkeypatch.setenv("UI_ROBOT_PATH", stub("uirobot.py"))
+    monkeypatch.setattr(uipath, "scheduler", JobScheduler(max_concurrency=1, queue_timeout=5))
+
+
+def test_line_longer_than_stream_limit_is_kept_whole():
+    long_line = 3 * uipath.STREAM_READ_LIMIT + 17
+
+    async def _main():
+        run_log = create_run_log("Report")
+        result = await uipath.stream_uipath_automation(run_log, "Report", {"long_line": long_line, "lines": 2})
+        return run_log, result
+
+    run_log, result = asyncio.run(_main())
+
+    assert result["status"] == "success"
+    with open(run_log.log_path, encoding="utf-8") as f:
+        stdout = [line[len("[stdout] "):].rstrip("\n") for line in f if line.startswith("[stdout] ")]
+    assert sum(line.count("x") for line in stdout) == long_line
+    assert stdout[-1] == "finished"
+
+
+def test_run_log_finishes_when_the_run_is_cancelled():
+    async def _main():
+        run_log = create_run_log("Report")
+        task = asyncio.create_task(uipath.stream_uipath_automation(run_log, "Report", {"sleep": 5}))
+        await asyncio.sleep(0.5)
+        task.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await task
+
+        events = [event async for event, _ in run_log.follow()]
+        return run_log, events
+
+    run_log, events = asyncio.run(asyncio.wait_for(_main(), 10))
+
+    assert run_log.finished
+    assert run_log._file.closed
+    assert events[-1] == "result"
+
+
+def test_cancel_before_the_process_starts_kills_it_once_attached(monkeypatch):
+    build = uipath.build_uipath_command
+
+    def _slow_build(*args, **kwargs):
+        # Leaves the job "running" without a process for a while, like a package extraction
+        time.sleep(0.5)
+        return build(*args, **kwargs)
+
+    monkeypatch.setattr(uipath, "build_uipath_command", _slow_build)
+
+    async def _main():
+        run_log = create_run_log("Report")
+        task = asyncio.create_task(uipath.stream_uipath_automation(run_log, "Report", {"sleep": 5}))
+        await asyncio.sleep(0.2)
+        job = uipath.get_uipath_job(run_log.job_id)
+        assert job.state == "running" and job.pid is None
+        assert await uipath.cancel_uipath_job(run_log.job_id)
+        return await task
+
+    started = time.monotonic()
+    result = asyncio.run(asyncio.wait_for(_main(), 10))
+
+    assert result["status"] == "cancelled"
+    assert time.monotonic() - started < 3
@@ -0,0 +1,59 @@
+import sys
+import asyncio
+
+import pytest
+
+from conftest import stub
+from app.helper import uipath, uipath_worker
+from app.helper.uipath_scheduler import JobScheduler
+
+pytestmark = pytest.mark.skipif(sys.platform == "win32", reason="the stub worker is a POSIX script")
+
+
+@pytest.fixture
+def warm_bot(tmp_path, monkeypatch):
+    (tmp_path / "Bot.1.0.0.nupkg").write_bytes(b"package")
+    monkeypatch.setenv("PUBLISH_AUTOMATION_FOLDER", str(tmp_path))
+    # Runs the worker can't take would spawn the stub robot
+    monkeypatch.setenv("UI_ROBOT_PATH", stub("uirobot.py"))
+    monkeypatch.setattr(uipath_worker, "WORKER_PATH", stub("worker.py"))
+    monkeypatch.setattr(uipath_worker, "WORKER_AUTOMATIONS", {"bot"})
+    monkeypatch.setattr(uipath, "scheduler", JobScheduler(max_concurrency=1, queue_timeout=5))
+
+
+def test_runs_round_trip_through_one_warm_worker(warm_bot):
+    async def _main():
+        try:
+            first = await uipath.run_uipath_automation("Bot.1.0.0.nupkg", {"n": 1}, is_file=True)
+            second = await uipath.run_uipath_automation("Bot.1.0.0.nupkg", {"n": 2, "exit_code": 3}, is_file=True)
+            workers = uipath_worker.list_workers()
+        finally:
+            await uipath_worker.stop_all_workers()
+        return first, second, workers
+
+    first, second, workers = asyncio.run(_main())
+
+    assert first["status"] == "success"
+    assert 'got {"n": 1}' in first["stdout"]
+    # Non-protocol output still reaches the run's log
+    assert "stray text" in first["stdout"]
+    assert second["status"] == "error" and second["exit_code"] == 3
+    assert first["worker_pid"] == second["worker_pid"]
+    assert [(w["automation"], w["runs"]) for w in workers] == [("Bot.1.0.0.nupkg", 2)]
+
+
+def test_worker_crash_fails_the_run_and_is_replaced(warm_bot):
+    async def _main():
+        try:
+            crashed = await uipath.run_uipath_automation("Bot.1.0.0.nupkg", {"crash": True}, is_file=True)
+            after = await uipath.run_uipath_automation("Bot.1.0.0.nupkg", {}, is_file=True)
+        finally:
+            await uipath_worker.stop_all_workers()
+        return crashed, after
+
+    crashed, after = asyncio.run(_main())
+
+    assert crashed["status"] == "error"
+    assert "exited during the run" in crashed["message"]
+    assert after["status"] == "success"
+    assert after["worker_pid"] != crashed["worker_pid"]